@@ -1,20 +1,79 @@
 # app/main.py
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from fastapi import FastAPI, Request
 from app.services.router import router_service
+from app.services import log
 from app.routers import suggestions
+from app.routers import metrics
+
+logger = log.get_logger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop logging, background services and shared HTTP clients with the app."""
+    log.start_logging()
+    await asyncio.to_thread(suggestions.connect_clients)
+    if suggestions.precompute_enabled:
+        await suggestions.suggestion_precomputer.start()
+    if suggestions.mirror_sync is not None:
+        await suggestions.mirror_sync.start()
+    try:
+        yield
+    finally:
+        await suggestions.suggestion_precomputer.stop()
+        if suggestions.mirror_sync is not None:
+            await suggestions.mirror_sync.stop()
+            await suggestions.memory_service.cancel_mirror_loads()
+        await suggestions.suggestion_batcher.stop()
+        await suggestions.http_clients.aclose()
+        log.stop_logging()
 
 app = FastAPI(
     title="ME App Suggestions API",
     description="API for personalized suggestions based on user memory and conversations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+@app.middleware("http")
+async def request_id(request: Request, call_next):
+    """
+    Log everything a request logs with its ID, taken from the client or generated.
+
+    Every request is logged once it is answered, with when it arrived and the
+    user and number of suggestions it asked for, so the logs can be replayed
+    (see benchmarks/replay.py).
+    """
+    received = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    request_id = log.set_request_id(request.headers.get(log.REQUEST_ID_HEADER))
+    response = await call_next(request)
+    response.headers[log.REQUEST_ID_HEADER] = request_id
+    logger.info(
+        "Handled request",
+        method=request.method,
+        path=request.url.path,
+        user_id=request.query_params.get("user_id"),
+        n=request.query_params.get("n"),
+        status=response.status_code,
+        received=received.isoformat(timespec="milliseconds"),
+        duration_ms=round(1000 * (time.perf_counter() - started), 1)
+    )
+    return response
+
 # Register routers
 router_service.register_router(
     suggestions.router,
     prefix="/api/v1",
     tags=["suggestions"]
 )
+router_service.register_router(
+    metrics.router,
+    tags=["metrics"]
+)
 
 # Include the main router
 app.include_router(router_service.router)
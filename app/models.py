@@ -1,5 +1,5 @@
 from enum import Enum
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, model_validator
 from typing import List, Optional
 
 class ModelType(str, Enum):
@@ -14,6 +14,22 @@ class Suggestion(BaseModel):
     model_type: str  # code, text, image
     selected_model: str  # The model to use for this suggestion
 
+    @model_validator(mode="after")
+    def check_selected_model(self) -> "Suggestion":
+        """Make sure the selected model is in the catalogue and serves the model type."""
+        # Imported here, the catalogue itself depends on ModelType
+        from app.services.catalogue import model_registry
+        if self.selected_model not in model_registry:
+            raise ValueError(f"Unknown model: {self.selected_model}")
+        if not model_registry.supports(self.selected_model, self.model_type):
+            raise ValueError(f"Model {self.selected_model} does not serve {self.model_type} suggestions")
+        return self
+
+class SuggestionResult(BaseModel):
+    """The suggestions of one generation, and whether they are fallback suggestions."""
+    suggestions: List[Suggestion]
+    is_fallback: bool = False  # Picked by FallbackSuggester, never to be cached or precomputed
+
 class Memory(BaseModel):
     """A memory from the user's conversation history."""
     content: str
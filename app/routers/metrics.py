@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.services import metrics
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    """
+    Expose the service metrics in the Prometheus text format.
+    
+    Includes per-stage latency histograms of suggestion generation (mem0
+    fetch, selection, prompt build, LLM call, parsing, fallback and total),
+    prompt and completion token counts, the fallback rate and cache hit rates.
+    """
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+__all__ = ["router"]
@@ -1,22 +1,190 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from typing import List
+from fastapi.responses import StreamingResponse
+from typing import List, AsyncIterator
+import json
 import os
+import time
 from dotenv import load_dotenv
 
-from app.models import Suggestion
-from app.services.memory import MemoryService
+from app.models import Suggestion, SuggestionResult
+from app.services.memory import MemoryService, add_write_listener
 from app.services.generator import SuggestionGenerator
+from app.services.selection import select_memories
+from app.services.dedup import collapse_embedded_near_duplicates
+from app.services.singleflight import SingleFlight
+from app.services.records import MemoryRecord, as_records
+from app.services import cache
+from app.services import precompute
+from app.services import http
+from app.services import batching
+from app.services import metrics
+from app.services import log
 
 load_dotenv()
 
+logger = log.get_logger(__name__)
+
 router = APIRouter()
 memory_service = MemoryService()
+
+# Local SQLite mirror of users' memories, so reads skip the mem0 round trip.
+# Off unless enabled, its delta syncs run with the app lifespan in app/main.py.
+mirror_enabled = os.getenv("MEMORY_MIRROR", "").lower() in ("1", "true", "yes")
+memory_mirror = None
+mirror_sync = None
+if mirror_enabled:
+    # Imported only when enabled, SQLAlchemy is a fifth of the app's import time
+    from app.services import mirror
+    memory_mirror = mirror.MemoryMirror(
+        url=os.getenv("MEMORY_MIRROR_URL", mirror.DEFAULT_MIRROR_URL),
+        sync_interval=float(os.getenv("MEMORY_MIRROR_SYNC_INTERVAL", mirror.DEFAULT_SYNC_INTERVAL)),
+        reload_interval=float(os.getenv("MEMORY_MIRROR_RELOAD_INTERVAL", mirror.DEFAULT_RELOAD_INTERVAL)),
+        max_idle=float(os.getenv("MEMORY_MIRROR_MAX_IDLE", mirror.DEFAULT_MAX_IDLE)),
+        max_users=int(os.getenv("MEMORY_MIRROR_MAX_USERS", mirror.DEFAULT_MAX_USERS))
+    )
+    mirror_sync = mirror.MirrorSync(
+        sync=memory_service.sync_mirror,
+        interval=memory_mirror.background_interval
+    )
+memory_service.use_mirror(memory_mirror)
+suggestion_cache = cache.SuggestionCache(
+    backend=cache.InMemoryCacheBackend(
+        max_entries=int(os.getenv("SUGGESTION_CACHE_MAX_ENTRIES", cache.DEFAULT_MAX_ENTRIES))
+    ),
+    ttl=float(os.getenv("SUGGESTION_CACHE_TTL", cache.DEFAULT_TTL))
+)
+# Cached suggestions are dropped as soon as new memories are written for the user
+add_write_listener(suggestion_cache.invalidate)
+# Suggestions kept per memory, so a refresh only generates for new or edited memories
+suggestion_store = cache.MemorySuggestionStore(
+    backend=cache.InMemoryCacheBackend(
+        max_entries=int(os.getenv("SUGGESTION_STORE_MAX_ENTRIES", cache.DEFAULT_STORE_MAX_ENTRIES))
+    ),
+    ttl=float(os.getenv("SUGGESTION_STORE_TTL", cache.DEFAULT_STORE_TTL))
+)
 suggestion_generator = SuggestionGenerator(
     openai_api_key=os.getenv("OPENAI_API_KEY"),
-    mem0_api_key=os.getenv("MEM0_API_KEY"),
-    proxy_url=os.getenv("OPENAI_PROXY")
+    proxy_url=os.getenv("OPENAI_PROXY"),
+    cache=suggestion_cache,
+    store=suggestion_store
 )
 
+# Cross-user micro-batching, packs LLM requests arriving within a short window
+# into one completion. Off unless enabled.
+batching_enabled = os.getenv("SUGGESTIONS_BATCHING", "").lower() in ("1", "true", "yes")
+suggestion_batcher = batching.SuggestionBatcher(
+    complete=suggestion_generator.complete_batch,
+    window=float(os.getenv("BATCH_WINDOW", batching.DEFAULT_WINDOW)),
+    max_batch_size=int(os.getenv("BATCH_MAX_SIZE", batching.DEFAULT_MAX_BATCH_SIZE))
+)
+if batching_enabled:
+    suggestion_generator.use_batcher(suggestion_batcher)
+
+metrics.registry.gauge(
+    "suggestion_cache_hit_ratio",
+    "Share of suggestion cache lookups that hit",
+    lambda: metrics.ratio(suggestion_cache.hits, suggestion_cache.hits + suggestion_cache.misses)
+)
+metrics.registry.gauge(
+    "suggestion_store_hit_ratio",
+    "Share of memories whose stored suggestions were reused",
+    lambda: metrics.ratio(suggestion_store.hits, suggestion_store.hits + suggestion_store.misses)
+)
+if memory_mirror is not None:
+    metrics.registry.gauge(
+        "memory_mirror_hit_ratio",
+        "Share of memory reads served by a user already in the mirror",
+        lambda: metrics.ratio(memory_mirror.hits, memory_mirror.hits + memory_mirror.misses)
+    )
+
+# Pooled HTTP clients for mem0 and the LLM provider, bound to the services
+# when the app starts, see use_http_clients and the app lifespan in app/main.py
+http_clients = http.HTTPClientPool(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", http.DEFAULT_MAX_CONNECTIONS)),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", http.DEFAULT_MAX_KEEPALIVE_CONNECTIONS)),
+    keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", http.DEFAULT_KEEPALIVE_EXPIRY)),
+    timeout=float(os.getenv("HTTP_TIMEOUT", http.DEFAULT_TIMEOUT)),
+    connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", http.DEFAULT_CONNECT_TIMEOUT)),
+    http2=os.getenv("HTTP2", "true").lower() in ("1", "true", "yes")
+)
+
+def use_http_clients() -> None:
+    """Send mem0 and LLM requests through the pooled HTTP clients."""
+    memory_service.use_http_client(http_clients.get("mem0"))
+    suggestion_generator.use_http_client(
+        http_clients.get("openai", proxy_url=os.getenv("OPENAI_PROXY"))
+    )
+
+def connect_clients() -> None:
+    """
+    Create the one mem0 client and the one LLM client of the app, on the pooled HTTP clients.
+
+    Both are created lazily so importing the app stays fast. This creates them
+    while the app starts instead of on the first request. It blocks on imports
+    and on mem0's API key check, so the app lifespan runs it in a thread.
+    """
+    use_http_clients()
+    memory_service.connect()
+    suggestion_generator.connect()
+
+# Concurrent requests for the same user share one memory fetch, and one
+# generation when an in-flight one makes at least as many suggestions
+memory_flights = SingleFlight()
+suggestion_flights = SingleFlight()
+
+async def fetch_memories(user_id: str) -> List[MemoryRecord]:
+    """Fetch the user's recent memories, shared with concurrent requests for the same user."""
+    with metrics.STAGE_SECONDS.time(stage="mem0_fetch"):
+        return await memory_flights.do(
+            user_id,
+            lambda: memory_service.get_recent_conversations(user_id)
+        )
+
+def prepare_memories(conversations: List[MemoryRecord], n: int) -> List[MemoryRecord]:
+    """Merge near-duplicate memories, then select the ones to prompt with for n suggestions."""
+    with metrics.STAGE_SECONDS.time(stage="select"):
+        # Embedded once, selection ranks with the vectors deduplication used
+        memories, vectors, merged = collapse_embedded_near_duplicates(as_records(conversations))
+        if merged:
+            logger.debug("Merged near-duplicate memories", merged=merged, left=len(memories))
+        return select_memories(memories, n, vectors=vectors)
+
+async def _compute_suggestions(user_id: str, n: int) -> SuggestionResult:
+    # Get user data from memory service
+    conversations = await fetch_memories(user_id)
+    
+    # Only prompt with the memories worth suggesting from, scaled to n
+    memories = prepare_memories(conversations, n)
+    
+    # Generate suggestions
+    return await suggestion_generator.generate(
+        conversations=[],  # Empty list since we're using memories
+        user_id=user_id,
+        memories=memories,
+        num_suggestions=n
+    )
+
+async def compute_suggestions(user_id: str, n: int) -> SuggestionResult:
+    """Fetch the user's memories and generate n suggestions from them."""
+    result = await suggestion_flights.do(
+        user_id,
+        lambda: _compute_suggestions(user_id, n),
+        size=n
+    )
+    return SuggestionResult(suggestions=result.suggestions[:n], is_fallback=result.is_fallback)
+
+# Background precomputation, serves the last computed suggestions and refreshes
+# them when they get stale or the user's memories change. Its workers only run
+# when enabled, see the app lifespan in app/main.py.
+precompute_enabled = os.getenv("SUGGESTIONS_PRECOMPUTE", "").lower() in ("1", "true", "yes")
+suggestion_precomputer = precompute.SuggestionPrecomputer(
+    compute=compute_suggestions,
+    num_suggestions=int(os.getenv("PRECOMPUTE_NUM_SUGGESTIONS", precompute.DEFAULT_NUM_SUGGESTIONS)),
+    max_age=float(os.getenv("PRECOMPUTE_MAX_AGE", precompute.DEFAULT_MAX_AGE)),
+    concurrency=int(os.getenv("PRECOMPUTE_CONCURRENCY", precompute.DEFAULT_CONCURRENCY))
+)
+add_write_listener(suggestion_precomputer.on_memory_added)
+
 @router.get("/suggestions", response_model=List[Suggestion])
 async def get_suggestions(
     user_id: str,
@@ -40,6 +208,7 @@ async def get_suggestions(
         HTTPException: If there's an error retrieving memories or generating suggestions
         HTTPException: If n is not between 1 and 10
     """
+    started = time.perf_counter()
     try:
         # Validate n parameter
         if n < 1 or n > 20:
@@ -48,15 +217,17 @@ async def get_suggestions(
                 detail="Number of suggestions (n) must be between 1 and 20"
             )
         
-        # Get user data from memory service
-        conversations = await memory_service.get_recent_conversations(user_id)
+        # Serve precomputed suggestions right away when there are any
+        if suggestion_precomputer.running:
+            precomputed = suggestion_precomputer.get(user_id, n)
+            if precomputed:
+                return precomputed
         
-        # Generate suggestions
-        suggestions = await suggestion_generator.generate_from_conversations(
-            conversations=[],  # Empty list since we're using memories
-            user_id=user_id,
-            memories=conversations
-        )
+        result = await compute_suggestions(user_id, n)
+        suggestions = result.suggestions
+        
+        if suggestion_precomputer.running and suggestions:
+            suggestion_precomputer.store(user_id, suggestions, is_fallback=result.is_fallback, keep_larger=True)
         
         # Ensure we have at least one suggestion
         if not suggestions:
@@ -75,5 +246,95 @@ async def get_suggestions(
             status_code=500,
             detail=f"Error generating suggestions: {str(e)}"
         )
+    finally:
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage="total")
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream"
+}
+
+def _encode_stream_event(event: str, data: str, format: str) -> str:
+    if format == "sse":
+        return f"event: {event}\ndata: {data}\n\n"
+    return f"{data}\n"
+
+async def _iterate(suggestions: List[Suggestion]) -> AsyncIterator[Suggestion]:
+    for suggestion in suggestions:
+        yield suggestion
+
+async def _stream_suggestions(
+    suggestions: AsyncIterator[Suggestion],
+    n: int,
+    format: str
+) -> AsyncIterator[str]:
+    count = 0
+    try:
+        async for suggestion in suggestions:
+            yield _encode_stream_event("suggestion", suggestion.model_dump_json(), format)
+            count += 1
+            if count >= n:
+                break
+    except Exception as e:
+        # The status code is already sent, report the error in the stream instead
+        error = json.dumps({"detail": f"Error generating suggestions: {str(e)}"})
+        yield _encode_stream_event("error", error, format)
+        return
+    finally:
+        # Stopping early or a client disconnecting releases the LLM stream right away
+        await suggestions.aclose()
+    if format == "sse":
+        yield _encode_stream_event("done", "{}", format)
+
+@router.get("/suggestions/stream", response_class=StreamingResponse)
+async def stream_suggestions(
+    user_id: str,
+    n: int = Query(default=3, description="Number of suggestions to return", ge=1, le=20),
+    format: str = Query(default="ndjson", description="Stream format, 'ndjson' or 'sse'", pattern="^(ndjson|sse)$")
+):
+    """
+    Stream personalized suggestions as they are generated.
+    
+    Every suggestion is sent as soon as the LLM has finished writing it, either as
+    one JSON object per line (``ndjson``) or as ``suggestion`` Server-Sent Events
+    followed by a ``done`` event (``sse``).
+    
+    Args:
+        user_id: The ID of the user to get suggestions for
+        n: Number of suggestions to return (1-20, default 3)
+        format: The stream format, 'ndjson' (default) or 'sse'
+        
+    Returns:
+        StreamingResponse: The suggestions, streamed one by one
+        
+    Raises:
+        HTTPException: If there's an error retrieving memories
+    """
+    try:
+        precomputed = None
+        if suggestion_precomputer.running:
+            precomputed = suggestion_precomputer.get(user_id, n)
+        
+        if precomputed:
+            suggestions = _iterate(precomputed)
+        else:
+            # Fetch memories before streaming starts so failures still get a proper status code
+            conversations = await fetch_memories(user_id)
+            suggestions = suggestion_generator.stream_from_conversations(
+                conversations=[],  # Empty list since we're using memories
+                user_id=user_id,
+                memories=prepare_memories(conversations, n),
+                num_suggestions=n
+            )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating suggestions: {str(e)}"
+        )
+    
+    return StreamingResponse(
+        _stream_suggestions(suggestions, n, format),
+        media_type=STREAM_MEDIA_TYPES[format]
+    )
 
 __all__ = ["router"]
\ No newline at end of file
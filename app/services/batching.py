@@ -0,0 +1,143 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+from app.services import log, metrics
+
+# Seconds to wait for more requests before a batch is sent
+DEFAULT_WINDOW = 0.02
+
+# Most requests sent in one batch
+DEFAULT_MAX_BATCH_SIZE = 8
+
+logger = log.get_logger(__name__)
+
+
+class BatchItem:
+    """A request waiting in, or sent with, a batch."""
+
+    __slots__ = ("request", "future", "queued_at", "sent_at", "done_at")
+
+    def __init__(self, request: Any, future: asyncio.Future):
+        self.request = request
+        self.future = future
+        self.queued_at = time.perf_counter()
+        self.sent_at: Optional[float] = None
+        self.done_at: Optional[float] = None
+
+    @property
+    def wait(self) -> float:
+        """Seconds the request waited for its batch to be sent."""
+        return (self.sent_at or self.queued_at) - self.queued_at
+
+    @property
+    def latency(self) -> float:
+        """Seconds from submitting the request to its result."""
+        return (self.done_at or time.perf_counter()) - self.queued_at
+
+
+class SuggestionBatcher:
+    """
+    Micro-batching scheduler for LLM requests from different users.
+
+    Requests submitted within a short window are collected and handed to
+    ``complete`` together, which returns one result per request, e.g. by
+    packing them into a single multi-user completion or by sending them to a
+    provider's batch endpoint. The results are fanned back out to the callers.
+    A batch is sent when the window since its first request has passed or
+    when it is full, whichever comes first. Every request's wait and total
+    latency are observed in ``suggestion_batch_request_seconds`` on /metrics.
+
+    Args:
+        complete: Async function taking a list of requests and returning a list with the
+            result for each request, in order, or an exception for requests that failed
+        window: Seconds to wait for more requests before a batch is sent
+        max_batch_size: Most requests sent in one batch
+    """
+
+    def __init__(
+        self,
+        complete: Callable[[List[Any]], Awaitable[List[Any]]],
+        window: float = DEFAULT_WINDOW,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE
+    ):
+        self.complete = complete
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: List[BatchItem] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.batches = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of requests waiting for their batch to be sent."""
+        return len(self._pending)
+
+    async def submit(self, request: Any) -> Any:
+        """
+        Add a request to the next batch and wait for its result.
+
+        Returns:
+            The result ``complete`` returned for the request
+
+        Raises:
+            Exception: The error ``complete`` raised or returned for the request
+        """
+        loop = asyncio.get_running_loop()
+        item = BatchItem(request, loop.create_future())
+        self._pending.append(item)
+        self.requests += 1
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await item.future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._send(batch))
+        # Keep a reference until the batch is done
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[BatchItem]) -> None:
+        self.batches += 1
+        sent_at = time.perf_counter()
+        for item in batch:
+            item.sent_at = sent_at
+        try:
+            results = await self.complete([item.request for item in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Expected {len(batch)} batch results, got {len(results)}")
+        except Exception as e:
+            results = [e] * len(batch)
+
+        done_at = time.perf_counter()
+        for item, result in zip(batch, results):
+            item.done_at = done_at
+            metrics.BATCH_REQUEST_SECONDS.observe(item.wait, phase="wait")
+            metrics.BATCH_REQUEST_SECONDS.observe(item.latency, phase="total")
+            if item.future.done():
+                continue  # The caller went away
+            if isinstance(result, BaseException):
+                item.future.set_exception(result)
+            else:
+                item.future.set_result(result)
+        logger.debug("Sent batch", requests=len(batch), seconds=round(done_at - sent_at, 3))
+        if log.sampled():
+            for item in batch:
+                logger.item("Batched request", latency=round(item.latency, 3), waited=round(item.wait, 3))
+
+    async def stop(self) -> None:
+        """Send the requests still waiting and wait for all batches to finish."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
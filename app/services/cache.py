@@ -0,0 +1,221 @@
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+
+from app.models import Suggestion
+from app.services.records import MemoryRecord, as_records
+
+# Default lifetime of a cached suggestion list, in seconds
+DEFAULT_TTL = 300.0
+
+# Default maximum number of cached suggestion lists per process
+DEFAULT_MAX_ENTRIES = 1024
+
+# Default lifetime of the suggestions kept for a memory, in seconds
+DEFAULT_STORE_TTL = 86400.0
+
+# Default maximum number of memories suggestions are kept for, per process
+DEFAULT_STORE_MAX_ENTRIES = 65536
+
+
+def fingerprint_memories(memories: Sequence[Union[MemoryRecord, Dict[str, Any]]], context: str = "") -> str:
+    """
+    Fingerprint a set of memories, plus any other prompt context.
+
+    The fingerprint changes whenever a memory is added, removed or edited, so
+    it can be used to tell whether cached suggestions are still current.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(context.encode())
+    digest.update(b"\x1d")
+    for record in as_records(memories):
+        digest.update(f"{record.id or ''}\x1f{record.updated}\x1f{record.memory}\x1f\x1e".encode())
+    return digest.hexdigest()
+
+
+def hash_memory(memory: Union[MemoryRecord, Dict[str, Any]]) -> str:
+    """Hash the content of a single memory, the hash changes when the memory is edited."""
+    text = memory.memory if isinstance(memory, MemoryRecord) else str(memory.get("memory") or "")
+    return hashlib.blake2b(text.encode(), digest_size=12).hexdigest()
+
+
+class CacheBackend(ABC):
+    """
+    Storage for cached suggestion lists.
+
+    Entries are grouped by user so that all of a user's entries can be dropped
+    at once when their memories change. Subclass this to share the cache
+    between workers, e.g. on top of Redis.
+    """
+
+    @abstractmethod
+    def get(self, user_id: str, key: str) -> Optional[List[Suggestion]]:
+        ...
+
+    @abstractmethod
+    def set(self, user_id: str, key: str, suggestions: List[Suggestion], ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def invalidate(self, user_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Per-process LRU cache backend with per-entry expiry."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[Suggestion]]]" = OrderedDict()
+        self._keys_by_user: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: str, key: str) -> Optional[List[Suggestion]]:
+        entry = self._entries.get((user_id, key))
+        if entry is None:
+            return None
+        expires_at, suggestions = entry
+        if expires_at <= time.monotonic():
+            self._remove((user_id, key))
+            return None
+        self._entries.move_to_end((user_id, key))
+        return suggestions
+
+    def set(self, user_id: str, key: str, suggestions: List[Suggestion], ttl: float) -> None:
+        self._entries[(user_id, key)] = (time.monotonic() + ttl, suggestions)
+        self._entries.move_to_end((user_id, key))
+        self._keys_by_user.setdefault(user_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def invalidate(self, user_id: str) -> None:
+        for key in self._keys_by_user.pop(user_id, ()):
+            self._entries.pop((user_id, key), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_user.clear()
+
+    def _remove(self, entry_key: Tuple[str, str]) -> None:
+        self._entries.pop(entry_key, None)
+        user_id, key = entry_key
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+class SuggestionCache:
+    """
+    Cache of generated suggestions keyed on user, number of suggestions and
+    a fingerprint of the memories they were generated from.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: float = DEFAULT_TTL):
+        self.backend = backend if backend is not None else InMemoryCacheBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(num_suggestions: int, memories: Sequence[Union[MemoryRecord, Dict[str, Any]]], context: str = "") -> str:
+        return f"{num_suggestions}:{fingerprint_memories(memories, context)}"
+
+    def get(
+        self,
+        user_id: str,
+        num_suggestions: int,
+        memories: Sequence[Union[MemoryRecord, Dict[str, Any]]],
+        context: str = ""
+    ) -> Optional[List[Suggestion]]:
+        suggestions = self.backend.get(user_id, self.make_key(num_suggestions, memories, context))
+        if suggestions is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return suggestions
+
+    def set(
+        self,
+        user_id: str,
+        num_suggestions: int,
+        memories: Sequence[Union[MemoryRecord, Dict[str, Any]]],
+        suggestions: List[Suggestion],
+        context: str = ""
+    ) -> None:
+        self.backend.set(user_id, self.make_key(num_suggestions, memories, context), suggestions, self.ttl)
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop every cached suggestion list for the user."""
+        self.backend.invalidate(user_id)
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class MemorySuggestionStore:
+    """
+    Suggestions kept per memory, keyed on user and the memory's content hash.
+
+    Lets the generator reuse the suggestions of memories that haven't changed
+    and only ask the LLM about new or edited ones. Unlike SuggestionCache it is
+    not invalidated when memories are added, entries of memories that are gone
+    expire or get evicted.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: float = DEFAULT_STORE_TTL):
+        self.backend = backend if backend is not None else InMemoryCacheBackend(DEFAULT_STORE_MAX_ENTRIES)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(memory_hash: str, context: str = "") -> str:
+        context_hash = hashlib.blake2b(context.encode(), digest_size=8).hexdigest()
+        return f"memory:{context_hash}:{memory_hash}"
+
+    def get(self, user_id: str, memory_hashes: List[str], context: str = "") -> Dict[str, List[Suggestion]]:
+        """
+        Look up the suggestions kept for memories.
+
+        Args:
+            user_id: The ID of the user the memories belong to
+            memory_hashes: Content hashes of the memories, see hash_memory
+            context: Anything else the suggestions depend on, e.g. the user's model preferences
+
+        Returns:
+            Dict[str, List[Suggestion]]: The suggestions per memory hash, for the memories that have any
+        """
+        found = {}
+        for memory_hash in memory_hashes:
+            if memory_hash in found:
+                continue
+            suggestions = self.backend.get(user_id, self.make_key(memory_hash, context))
+            if suggestions is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                found[memory_hash] = suggestions
+        return found
+
+    def set(self, user_id: str, suggestions: Dict[str, List[Suggestion]], context: str = "") -> None:
+        """Keep suggestions per memory hash."""
+        for memory_hash, memory_suggestions in suggestions.items():
+            self.backend.set(user_id, self.make_key(memory_hash, context), memory_suggestions, self.ttl)
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
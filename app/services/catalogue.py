@@ -0,0 +1,228 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from app.models import ModelType
+
+# Model types served by text models. Code suggestions run on text models too.
+TEXT_MODEL_TYPES = frozenset({ModelType.TEXT, ModelType.CODE})
+IMAGE_MODEL_TYPES = frozenset({ModelType.IMAGE})
+
+
+def normalize_model_name(name: str) -> str:
+    """Lowercase a model name and turn separators into spaces, e.g. "GPT-4.1" -> "gpt 4 1"."""
+    return " ".join(re.sub(r"[\-_./]+", " ", name.lower()).split())
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """A model users can run suggestions with."""
+    id: str
+    model_types: FrozenSet[ModelType]
+    description: str
+    # Capabilities the model is the go-to choice for, see ModelRegistry.model_for_tag
+    tags: FrozenSet[str] = field(default_factory=frozenset)
+    # Names users refer to the model by, besides its ID
+    aliases: Tuple[str, ...] = ()
+
+
+# Models are listed in order of preference: when several models of a type
+# share a tag, the first one is used for it.
+MODEL_CATALOGUE: List[ModelSpec] = [
+    ModelSpec(
+        id="anthropic/claude-3.7-sonnet",
+        model_types=TEXT_MODEL_TYPES,
+        description="Coding tasks, complex reasoning, technical discussions, detailed explanations and math.",
+        tags=frozenset({"coding", "reasoning"}),
+        aliases=("Claude", "Claude 3.7", "Claude 3.7 Sonnet", "Sonnet 3.7"),
+    ),
+    ModelSpec(
+        id="anthropic/claude-3.5-sonnet",
+        model_types=TEXT_MODEL_TYPES,
+        description="Balanced capabilities, writing tasks and mid-level coding.",
+        tags=frozenset({"general", "writing"}),
+        aliases=("Claude 3.5", "Claude 3.5 Sonnet", "Sonnet 3.5"),
+    ),
+    ModelSpec(
+        id="gpt-4.1",
+        model_types=TEXT_MODEL_TYPES,
+        description="Creative writing, storytelling, marketing copy, complex reasoning and technical accuracy.",
+        tags=frozenset({"creative", "writing", "reasoning"}),
+        aliases=("GPT 4.1", "GPT4.1"),
+    ),
+    ModelSpec(
+        id="o3-mini",
+        model_types=TEXT_MODEL_TYPES,
+        description="Versatile tasks requiring strong reasoning and analytical thinking.",
+        tags=frozenset({"reasoning"}),
+        aliases=("o3 mini",),
+    ),
+    ModelSpec(
+        id="gpt-4o-mini",
+        model_types=TEXT_MODEL_TYPES,
+        description="Efficient processing of really simple queries, focused on speed.",
+        tags=frozenset({"quick"}),
+        aliases=("4o mini", "GPT 4o mini"),
+    ),
+    ModelSpec(
+        id="gpt-4o",
+        model_types=TEXT_MODEL_TYPES,
+        description="Quick responses to simple questions, casual conversation and brief explanations.",
+        tags=frozenset({"quick", "conversation"}),
+        aliases=("GPT 4o", "GPT4o"),
+    ),
+    ModelSpec(
+        id="meta-llama/llama-4-maverick",
+        model_types=TEXT_MODEL_TYPES,
+        description="Complex reasoning, research questions and detailed knowledge queries.",
+        tags=frozenset({"reasoning", "knowledge"}),
+        aliases=("Llama", "Llama 4 Maverick", "Llama Maverick", "Maverick"),
+    ),
+    ModelSpec(
+        id="meta-llama/llama-4-scout",
+        model_types=TEXT_MODEL_TYPES,
+        description="Lightweight everyday questions and general conversation.",
+        tags=frozenset({"quick", "conversation"}),
+        aliases=("Llama 4 Scout", "Llama Scout", "Scout"),
+    ),
+    ModelSpec(
+        id="x-ai/grok-3-beta",
+        model_types=TEXT_MODEL_TYPES,
+        description="Current events, internet trends and web knowledge, with a witty style.",
+        tags=frozenset({"trends"}),
+        aliases=("Grok", "Grok 3"),
+    ),
+    ModelSpec(
+        id="deepseek/deepseek-r1",
+        model_types=TEXT_MODEL_TYPES,
+        description="Research-focused content, academic writing and structured analysis.",
+        tags=frozenset({"research"}),
+        aliases=("DeepSeek", "DeepSeek R1"),
+    ),
+    ModelSpec(
+        id="openai/gpt-image-1",
+        model_types=IMAGE_MODEL_TYPES,
+        description="Versatile high-quality images, photorealism, creative art and detailed illustrations.",
+        tags=frozenset({"general", "illustration"}),
+        aliases=("GPT Image", "GPT Image 1"),
+    ),
+    ModelSpec(
+        id="recraft-ai/recraft-v3",
+        model_types=IMAGE_MODEL_TYPES,
+        description="Photorealistic images, detailed illustrations and design-intensive visuals.",
+        tags=frozenset({"photoreal"}),
+        aliases=("Recraft", "Recraft V3"),
+    ),
+    ModelSpec(
+        id="recraft-ai/recraft-v3-svg",
+        model_types=IMAGE_MODEL_TYPES,
+        description="Vector images, logos, icons, scalable graphics, brand assets and UI/UX designs.",
+        tags=frozenset({"vector"}),
+        aliases=("Recraft SVG", "Recraft V3 SVG"),
+    ),
+    ModelSpec(
+        id="black-forest-labs/flux-1.1-pro-ultra",
+        model_types=IMAGE_MODEL_TYPES,
+        description="Ultra-high-resolution images, professional art and large prints.",
+        tags=frozenset({"high_res"}),
+        aliases=("Flux", "Flux Pro", "Flux 1.1 Pro Ultra"),
+    ),
+    ModelSpec(
+        id="google/gemini-2.0-flash-exp-image-generation",
+        model_types=IMAGE_MODEL_TYPES,
+        description="Multimodal content combining text and images, educational visuals.",
+        tags=frozenset({"multimodal"}),
+        aliases=("Gemini", "Gemini Flash", "Gemini 2.0 Flash"),
+    ),
+]
+
+# Model used for a model type when nothing more specific applies
+DEFAULT_MODELS: Dict[ModelType, str] = {
+    ModelType.TEXT: "anthropic/claude-3.5-sonnet",
+    ModelType.CODE: "anthropic/claude-3.7-sonnet",
+    ModelType.IMAGE: "openai/gpt-image-1",
+}
+
+
+class ModelRegistry:
+    """
+    The model catalogue, indexed by ID, model type, capability tag and alias.
+
+    All indexes are built once, every lookup is a dict access.
+    """
+
+    def __init__(self, models: Iterable[ModelSpec], defaults: Dict[ModelType, str]):
+        self._by_id: Dict[str, ModelSpec] = {}
+        self._by_type: Dict[ModelType, Tuple[ModelSpec, ...]] = {}
+        self._by_tag: Dict[Tuple[str, ModelType], ModelSpec] = {}
+        self._by_alias: Dict[str, ModelSpec] = {}
+
+        by_type: Dict[ModelType, List[ModelSpec]] = {}
+        for model in models:
+            if model.id in self._by_id:
+                raise ValueError(f"Duplicate model in catalogue: {model.id}")
+            self._by_id[model.id] = model
+            for model_type in model.model_types:
+                by_type.setdefault(model_type, []).append(model)
+                for tag in model.tags:
+                    self._by_tag.setdefault((tag, model_type), model)
+            for alias in (model.id,) + model.aliases:
+                self._by_alias.setdefault(normalize_model_name(alias), model)
+        self._by_type = {model_type: tuple(specs) for model_type, specs in by_type.items()}
+
+        self._defaults: Dict[ModelType, ModelSpec] = {}
+        for model_type, model_id in defaults.items():
+            model = self._by_id[model_id]
+            if model_type not in model.model_types:
+                raise ValueError(f"Default model {model_id} does not serve {model_type.value} suggestions")
+            self._defaults[model_type] = model
+
+    def __contains__(self, model_id: str) -> bool:
+        return model_id in self._by_id
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, model_id: str) -> Optional[ModelSpec]:
+        return self._by_id.get(model_id)
+
+    def models_for_type(self, model_type: ModelType) -> Tuple[ModelSpec, ...]:
+        """All models that can run suggestions of the model type, in order of preference."""
+        return self._by_type.get(model_type, ())
+
+    def model_for_tag(self, tag: str, model_type: ModelType) -> Optional[ModelSpec]:
+        """The preferred model of the model type with the capability tag."""
+        return self._by_tag.get((tag, model_type))
+
+    def resolve_alias(self, name: str) -> Optional[ModelSpec]:
+        """Find a model by ID or by a name users refer to it by, e.g. "Claude" or "gpt 4.1"."""
+        return self._by_alias.get(normalize_model_name(name))
+
+    @property
+    def aliases(self) -> Tuple[str, ...]:
+        """All normalized aliases, see normalize_model_name."""
+        return tuple(self._by_alias)
+
+    def default_model(self, model_type: ModelType) -> ModelSpec:
+        return self._defaults[model_type]
+
+    def supports(self, model_id: str, model_type: str) -> bool:
+        """Whether the model exists and can run suggestions of the model type."""
+        model = self._by_id.get(model_id)
+        if model is None:
+            return False
+        try:
+            return ModelType(model_type.lower()) in model.model_types
+        except ValueError:
+            return False
+
+
+# Loaded once, shared by the generator, the model selector and validation
+model_registry = ModelRegistry(MODEL_CATALOGUE, DEFAULT_MODELS)
+
+def get_model_registry() -> ModelRegistry:
+    """Dependency injection for the model registry."""
+    return model_registry
@@ -0,0 +1,104 @@
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.services.ranking import embed, cosine_similarities
+from app.services.records import MemoryBatch, MemoryRecord, as_records
+from app.services.selection import PINNED_CATEGORIES
+
+# Memories at least this similar (cosine of their hashed TF-IDF vectors) are
+# treated as saying the same thing
+DEFAULT_DUPLICATE_THRESHOLD = 0.8
+
+
+def _compatible(categories: Tuple[str, ...], other: Tuple[str, ...]) -> bool:
+    # Pinned memories only merge with memories pinned the same way, so model
+    # preferences are never folded into topics, and topics only merge if they
+    # share a category or one of them has none
+    if PINNED_CATEGORIES.intersection(categories) != PINNED_CATEGORIES.intersection(other):
+        return False
+    return not categories or not other or bool(set(categories).intersection(other))
+
+
+def collapse_near_duplicates(
+    memories: Sequence[Union[MemoryRecord, Dict[str, Any]]],
+    threshold: float = DEFAULT_DUPLICATE_THRESHOLD
+) -> Tuple[List[Union[MemoryRecord, Dict[str, Any]]], int]:
+    """
+    Merge memories that say (nearly) the same thing.
+
+    Of every group of near-duplicates the first memory, the newest when
+    memories are newest first, is kept and gets the categories of the ones
+    merged into it, so no category coverage is lost. Only memories with
+    compatible categories are merged: the same pinned categories, see
+    selection.PINNED_CATEGORIES, and at least one category in common unless
+    one of them has none. Kept memories that
+    absorbed others are copies of the same type, the given memories are not
+    modified.
+
+    Args:
+        memories: Memory records, or raw mem0 memories
+        threshold: Cosine similarity from which two memories are duplicates
+
+    Returns:
+        Tuple[List, int]: The remaining memories in their original order, and
+            how many memories were merged into them
+    """
+    kept, _, merged = collapse_embedded_near_duplicates(memories, threshold=threshold)
+    return kept, merged
+
+
+def collapse_embedded_near_duplicates(
+    memories: Sequence[Union[MemoryRecord, Dict[str, Any]]],
+    vectors: Optional[np.ndarray] = None,
+    threshold: float = DEFAULT_DUPLICATE_THRESHOLD
+) -> Tuple[List[Union[MemoryRecord, Dict[str, Any]]], np.ndarray, int]:
+    """
+    collapse_near_duplicates, also returning the vectors of the kept memories.
+
+    The vectors can be passed on to select_memories so the memories are only
+    embedded once per request.
+
+    Args:
+        memories: Memory records, or raw mem0 memories
+        vectors: Hashed TF-IDF vectors of the memories, see ranking.embed, embedded if None
+        threshold: Cosine similarity from which two memories are duplicates
+
+    Returns:
+        Tuple[List, np.ndarray, int]: The remaining memories in their original
+            order, their vectors, and how many memories were merged into them
+    """
+    batch = MemoryBatch(as_records(memories))
+    if vectors is None:
+        vectors = embed(batch.texts)
+    if len(memories) < 2:
+        return list(memories), vectors, 0
+
+    similarities = cosine_similarities(vectors)
+    # Only later memories can be duplicates of earlier ones
+    duplicates = np.triu(similarities >= threshold, k=1)
+    merged_into = np.full(len(memories), -1)
+    for index in range(len(memories)):
+        if merged_into[index] >= 0:
+            continue
+        for other in np.flatnonzero(duplicates[index] & (merged_into < 0)):
+            if _compatible(batch.categories[index], batch.categories[other]):
+                merged_into[other] = index
+
+    kept = []
+    for index, memory in enumerate(memories):
+        if merged_into[index] >= 0:
+            continue
+        absorbed = np.flatnonzero(merged_into == index)
+        if len(absorbed):
+            categories = list(batch.categories[index])
+            for other in absorbed:
+                for category in batch.categories[other]:
+                    if category not in categories:
+                        categories.append(category)
+            if isinstance(memory, MemoryRecord):
+                memory = memory.with_categories(categories)
+            else:
+                memory = {**memory, "categories": categories}
+        kept.append(memory)
+    return kept, vectors[merged_into < 0], len(memories) - len(kept)
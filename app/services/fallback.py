@@ -0,0 +1,102 @@
+from itertools import chain
+from typing import List, Dict, Any, Optional, Sequence, Union
+
+from app.models import Suggestion, ModelType
+from app.services.catalogue import ModelRegistry, model_registry
+from app.services.keywords import KeywordMatcher
+from app.services.records import MemoryRecord, as_records
+
+# Keywords per fallback category, each term is matched as a word prefix on lowercased text
+FALLBACK_KEYWORDS = {
+    "code": ["python", "code", "algorithm", "graph", "function", "programming", "development"],
+    "image": ["image", "visual", "design", "logo", "picture", "photo"],
+    "writing": ["write", "writing", "blog", "story", "post", "article"],
+}
+
+# Suggestion per fallback category: title, description, model type and the
+# catalogue tag of its model (None for the model type's default model)
+FALLBACK_SUGGESTIONS = {
+    "code": (
+        "Continue working on coding project",
+        "Based on your recent work with algorithms and Python, you might want to explore optimization techniques or add more features.",
+        ModelType.CODE,
+        None,
+    ),
+    "image": (
+        "Create visual content",
+        "Based on your interest in visuals, consider creating some new designs or images.",
+        ModelType.IMAGE,
+        None,
+    ),
+    "writing": (
+        "Expand your writing project",
+        "Consider developing your recent writing ideas further, whether it's technical documentation or creative writing.",
+        ModelType.TEXT,
+        "creative",
+    ),
+}
+
+# Used when no category matches
+GENERAL_SUGGESTION = (
+    "Continue the conversation",
+    "Feel free to ask more questions or explore other topics.",
+    ModelType.TEXT,
+    "quick",
+)
+
+
+class FallbackSuggester:
+    """
+    Suggestions for when the LLM is unavailable.
+
+    Conversations and memories are scored against all fallback categories in
+    a single keyword pass, and the suggestions of the matching categories are
+    returned best match first. The suggestions themselves are built once.
+    """
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry if registry is not None else model_registry
+        self._matcher = KeywordMatcher(FALLBACK_KEYWORDS)
+        self._suggestions = {
+            category: self._build(*template)
+            for category, template in FALLBACK_SUGGESTIONS.items()
+        }
+        self._general = self._build(*GENERAL_SUGGESTION)
+
+    def _build(self, title: str, description: str, model_type: ModelType, tag: Optional[str]) -> Suggestion:
+        model = None
+        if tag is not None:
+            model = self.registry.model_for_tag(tag, model_type)
+        if model is None:
+            model = self.registry.default_model(model_type)
+        return Suggestion(
+            title=title,
+            description=description,
+            model_type=model_type,
+            selected_model=model.id
+        )
+
+    def suggest(
+        self,
+        conversations: List[Dict[str, str]],
+        memories: Sequence[Union[MemoryRecord, Dict[str, Any]]]
+    ) -> List[Suggestion]:
+        """
+        Pick fallback suggestions for the conversations and memories.
+
+        Args:
+            conversations: Recent chat messages with 'role' and 'content'
+            memories: The mem0 memories the suggestions were meant to be based on
+
+        Returns:
+            List[Suggestion]: Suggestions for the matching categories ranked by number of
+                keyword matches, or a general suggestion if none match
+        """
+        counts = self._matcher.count_all(chain(
+            (msg.get("content", "") for msg in conversations),
+            (record.memory for record in as_records(memories))
+        ))
+        ranked = self._matcher.rank(counts)
+        if not ranked:
+            return [self._general.model_copy()]
+        return [self._suggestions[category].model_copy() for category in ranked]
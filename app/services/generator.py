@@ -1,18 +1,28 @@
-from typing import List, Dict, Any, Optional
-import os
+from functools import cached_property
+from typing import TYPE_CHECKING, List, Dict, Any, AsyncIterator, Optional, Tuple, Union
 from dotenv import load_dotenv
 import httpx
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain.memory import ConversationBufferMemory
-from mem0 import AsyncMemoryClient
 from pydantic import BaseModel, Field, ConfigDict
-from app.models import Suggestion, ModelType
-from app.services.memory import MemoryService
+from app.models import Suggestion, SuggestionResult, ModelType
+from app.services.cache import SuggestionCache, MemorySuggestionStore, hash_memory
+from app.services.streaming import SuggestionStreamParser
+from app.services.prompts import PromptBuilder, Prompt, count_tokens
+from app.services.model_selection import ModelSelector
+from app.services.fallback import FallbackSuggester
+from app.services.http import create_async_client
+from app.services.batching import SuggestionBatcher
+from app.services.records import MemoryRecord, as_records
+from app.services import log, metrics
+
+if TYPE_CHECKING:
+    # langchain_openai and openai take seconds to import, they are imported when the LLM client is created
+    from langchain_openai import ChatOpenAI
+    from langchain_core.output_parsers import PydanticOutputParser
 
 load_dotenv()
 
+logger = log.get_logger(__name__)
+
 class ModelSelection(BaseModel):
     model_config = ConfigDict(extra='forbid')
     model_type: str = Field(..., description="Either 'Image' or 'Text'")
@@ -22,170 +32,462 @@ class SuggestionList(BaseModel):
     model_config = ConfigDict(extra='forbid')
     suggestions: List[Suggestion]
 
+class SuggestionDraft(BaseModel):
+    """A suggestion as written by the LLM, before a model is selected for it."""
+    title: str
+    description: str
+    memory: Optional[int] = None  # 1-based number of the memory it is based on
+
+class SuggestionDraftList(BaseModel):
+    suggestions: List[SuggestionDraft]
+
+class SuggestionDraftRequest(BaseModel):
+    """The suggestions for one request of a batched completion."""
+    request: int  # 1-based number of the request in the batch
+    suggestions: List[SuggestionDraft]
+
+class SuggestionDraftBatch(BaseModel):
+    requests: List[SuggestionDraftRequest]
+
+# A request for drafts: the memories, the number of suggestions and the formatted messages
+DraftRequest = Tuple[List[MemoryRecord], int, str]
+
+# Memory category holding the user's model preferences
+PREFERENCES_CATEGORY = "ai_model_preferences"
+
 class SuggestionGenerator:
-    def __init__(self, openai_api_key: str, mem0_api_key: str, proxy_url: str = None):
-        # Initialize proxy client if URL is provided
-        client = None
-        if proxy_url:
-            client = httpx.Client(proxy=proxy_url)
+    def __init__(
+        self,
+        openai_api_key: str,
+        mem0_api_key: Optional[str] = None,
+        proxy_url: str = None,
+        cache: Optional[SuggestionCache] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        store: Optional[MemorySuggestionStore] = None
+    ):
+        # mem0_api_key is unused, memories are passed in by the caller, who
+        # fetches them with MemoryService. It is accepted for existing callers.
+        self.openai_api_key = openai_api_key
+        self.proxy_url = proxy_url
+        # Requests go through the shared pooled client once the app has started,
+        # see use_http_client. Until then the proxy gets a client of its own.
+        self.http_client = http_client
+        # Created by connect, or on first use, see llm
+        self._llm: Optional["ChatOpenAI"] = None
+        self.cache = cache
+        # Suggestions kept per memory, only new or edited memories are sent to the LLM
+        self.store = store
         
-        self.llm = ChatOpenAI(
+        # Static prompt parts are rendered once and shared by all requests
+        self.prompt_builder = PromptBuilder()
+        # Model types and models are picked locally, the LLM only writes suggestions
+        self.model_selector = ModelSelector()
+        self.fallback = FallbackSuggester()
+        # LLM requests are sent one by one unless a batcher is set, see use_batcher
+        self.batcher: Optional[SuggestionBatcher] = None
+
+    @property
+    def llm(self) -> "ChatOpenAI":
+        """The LLM client, created on first use unless connect was called."""
+        if self._llm is None:
+            self.connect()
+        return self._llm
+
+    @llm.setter
+    def llm(self, llm: "ChatOpenAI") -> None:
+        self._llm = llm
+
+    def connect(self) -> None:
+        """
+        Create the LLM client, unless there is one, and load the prompt tokenizer.
+
+        The app connects while it starts, see app/main.py, so neither importing
+        the app nor its first request pays for importing langchain_openai or
+        for downloading the tokenizer.
+        """
+        if self._llm is None:
+            if self.http_client is None and self.proxy_url:
+                self.http_client = create_async_client(proxy_url=self.proxy_url)
+            self._llm = self._create_llm(self.http_client)
+        self.prompt_builder.load()
+
+    @cached_property
+    def suggestion_parser(self) -> "PydanticOutputParser":
+        from langchain_core.output_parsers import PydanticOutputParser
+        return PydanticOutputParser(pydantic_object=SuggestionDraftList)
+
+    @cached_property
+    def batch_parser(self) -> "PydanticOutputParser":
+        from langchain_core.output_parsers import PydanticOutputParser
+        return PydanticOutputParser(pydantic_object=SuggestionDraftBatch)
+
+    def _create_llm(self, http_client: Optional[httpx.AsyncClient]) -> "ChatOpenAI":
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
             model="gpt-3.5-turbo",
             temperature=0.7,
-            openai_api_key=openai_api_key,
-            client=client if client else None,
+            openai_api_key=self.openai_api_key,
+            http_async_client=http_client,
         )
-        self.memory = ConversationBufferMemory()
-        self.mem0_client = AsyncMemoryClient(api_key=mem0_api_key)
-        self.suggestion_parser = PydanticOutputParser(pydantic_object=SuggestionList)
-        self.memory_service = MemoryService()
-        
-        # Combine both prompts into one since model selection is now part of suggestion generation
-        self.suggestion_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a suggestion generator that creates personalized suggestions based on conversation history and memories, one for each memory by the very least.
-            Also you are an expert AI model selection assistant, and your task in this role is to analyze suggestions and determine the optimal AI model based on the user's request and available user model preferences.
-            
-            IMPORTANT: You must generate _exactly_ {num_memories} suggestions – no more, no fewer – one corresponding to each memory provided.  
-            For each suggestion, determine:
-            1. Determine Model Type: Decide whether the suggestion requires an Image, Code or Text model. This is CRITICAL, especially when the user has pre-selected models, as we need to know whether to use their selected image model, code model or text model.
-            2. Select the Best Model: Choose the most suitable model from the provided options or use the user-selected model if indicated in the instructions.
-             
-            SUPER IMPORTANT RULE: For image generation requests or text-to-image prompts, ALWAYS set MODEL_TYPE as "Image" and select an appropriate image model.
-
-            SUPER IMPORTANT RULE: If the user requests a specific model (e.g., "use Claude" or "use GPT 4.1"), select that model regardless of any other settings or considerations.
-
-            SUPER IMPORTANT RULE: Always prioritize specific user model preferences if they exist in [ai_model_preferences]. Only fall back to general model recommendations when no specific preference is found for specific task
-
-            ### AVAILABLE TEXT MODELS:
-            1. "anthropic/claude-3.7-sonnet" - Best for: coding tasks, complex reasoning, technical discussions, detailed explanations, and math problems. Use for complex programming, algorithm design, or sophisticated problem-solving.
-            2. "anthropic/claude-3.5-sonnet" - Best for: balanced capabilities, good for writing tasks and mid-level coding. Use for general-purpose responses that need good reasoning but aren't extremely technical.
-            3. "gpt-4.1" - Best for: creative writing, storytelling, generating fiction, marketing copy, persuasive content, complex reasoning, and technical accuracy. Use when creativity, precision, or detailed explanations are needed.
-            4. "o3-mini" - Best for: versatile tasks requiring strong reasoning and balanced capabilities. Good for analytical thinking and detailed explanations.
-            5. "gpt-4o-mini" - Best for: efficient processing of straightforward tasks with a focus on speed and simplicity. Ideal for quick responses and really-really simple queries.
-            6. "gpt-4o" - Best for: quick responses to simple questions, casual conversation, brief explanations. Good for straightforward queries.
-            7. "meta-llama/llama-4-maverick" - Best for: complex reasoning tasks, research questions, and detailed knowledge queries. Strong on analytical thinking.
-            8. "meta-llama/llama-4-scout" - Best for: lightweight everyday questions and general conversation. Fast and efficient for common queries.
-            9. "x-ai/grok-3-beta" - Best for: queries about current events, internet trends, and web knowledge. Has a distinctive, sometimes witty style.
-            10. "deepseek/deepseek-r1" - Best for: research-focused content, academic writing, and structured analysis.
-            
-            ### AVAILABLE IMAGE MODELS:
-            11. "openai/gpt-image-1" - Best for: versatile high-quality image generation. Excellent for photorealistic images, creative art, and detailed illustrations.
-            12. "recraft-ai/recraft-v3" - Best for: photorealistic images, detailed illustrations, and images with complex elements. Good for high-quality visuals and design-intensive tasks.
-            13. "recraft-ai/recraft-v3-svg" - Best for: vector images, logos, icons, and scalable graphics. Ideal for brand assets and UI/UX designs.
-            14. "black-forest-labs/flux-1.1-pro-ultra" - Best for: ultra-high-resolution images and rapid generation. Great for professional art, detailed prints, and high-fidelity visuals.
-            15. "google/gemini-2.0-flash-exp-image-generation" - Best for: multimodal content combining text and images. Efficient for interactive storytelling, educational visuals, and responsive applications.
-             
-            ### ADDITIONAL GUIDANCE:
-            - For tasks requiring deep reasoning (e.g., "think more," "complex problem"), prioritize models like "anthropic/claude-3.7-sonnet", "gpt-4.1", "meta-llama/llama-4-maverick", or "deepseek/deepseek-r1".
-            - For creative tasks (e.g., storytelling, marketing), prioritize "gpt-4.1".
-            - For quick, simple queries, prioritize "gpt-4o-mini" or "o3-mini".
-            - For current events or trends, prioritize "x-ai/grok-3-beta".
-            - For coding tasks: "anthropic/claude-3.7-sonnet".
-             
-            ### IMAGE VS. TEXT VS. CODE PROMPT IDENTIFICATION GUIDANCE:
-
-            Use the following criteria to determine if a prompt requires an Image, Code, or Text model:
-
-            #### Indicators of Image Prompts:
-            - Explicit requests for images, pictures, visuals, drawings, illustrations, etc.
-            - Mentions of visual styles (photorealistic, cartoon, abstract, etc.)
-            - References to visual elements (colors, composition, lighting, etc.)
-            - Requests to generate or modify visual content (logos, icons, portraits, etc.)
-            - Use of phrases like "show me", "draw", "create an image of", "picture of", "design a"
-
-            #### Indicators of Text Prompts:
-            - Requests for information, explanations, or analysis
-            - Questions that seek factual answers or opinions
-            - Requests to write text content (essays, stories, code, etc.)
-            - Tasks involving reasoning, calculation, or problem-solving
-            - Use of phrases like "explain", "write", "analyze", "how to", "why is", etc
-             
-            #### Indicators of Code Prompts:
-            - Requests to write, analyze, debug, or optimize code snippets or scripts
-            - Mentions of specific programming languages (Python, JavaScript, Java, etc.)
-            - Keywords such as "implement", "debug", "refactor", "optimize", "code", "script", "function", "algorithm"
-            - Requests for code examples, library usage, or coding patterns
-            - Use of phrases like "show the code", "write a function", "fix the bug", "generate code for"
-             
-            ### USER AI MODEL PREFERENCES:
-
-            This section contains specific information about which AI models the user prefers for different types of tasks or scenarios. You MUST prioritize these specific preferences if they exist for the current task type.
-            [user_ai_model_preferences]|| "No user AI model preferences available."
-            
-            Each suggestion should be concise and actionable. Format as a JSON object with a 'suggestions' field containing a list of objects.
-            Each suggestion object MUST have these EXACT fields:
-            - 'title': A short, descriptive title
-            - 'description': A clear, actionable description
-            - 'model_type': Must be one of: 'text', 'code', or 'image' (all lowercase)
-            - 'selected_model': Must be one of the available models for the chosen model_type
-            
-            Example response format:
-            {{
-                "suggestions": [
-                    {{
-                        "title": "Optimize Graph Algorithm",
-                        "description": "Enhance the depth-first search implementation with additional optimizations",
-                        "model_type": "code",
-                        "selected_model": "anthropic/claude-3.7-sonnet"
-                    }},
-                    {{
-                        "title": "Create Modern Logo",
-                        "description": "Design a minimalist tech startup logo",
-                        "model_type": "image",
-                        "selected_model": "recraft-ai/recraft-v3-svg"
-                    }}
-                ]
-            }}"""),
-            ("user", """Based on these messages and memories, generate relevant suggestions:
-            
-            Messages:
-            {messages}
-            
-            Memories:
-            {memories}""")
-        ])
+
+    def use_http_client(self, http_client: httpx.AsyncClient) -> None:
+        """Send LLM requests through a pooled HTTP client, see app/services/http.py."""
+        self.http_client = http_client
+        if self._llm is not None:
+            self._llm = self._create_llm(http_client)
+
+    def use_batcher(self, batcher: Optional[SuggestionBatcher]) -> None:
+        """
+        Send LLM requests through a micro-batching scheduler.
+
+        The batcher should be created with ``complete_batch`` as its complete
+        function. Streaming requests are never batched.
+        """
+        self.batcher = batcher
+
+    async def complete_batch(self, requests: List[DraftRequest]) -> List[Union[List[SuggestionDraft], Exception]]:
+        """
+        Generate drafts for several requests, from different users, with one completion.
+
+        Args:
+            requests: The memories, number of suggestions and formatted messages of each request
+
+        Returns:
+            List[Union[List[SuggestionDraft], Exception]]: The drafts for each request, in order,
+                or an error for requests the LLM left out
+        """
+        if len(requests) == 1:
+            return [await self._complete(*requests[0])]
+        with metrics.STAGE_SECONDS.time(stage="prompt_build"):
+            prompt = self.prompt_builder.build_batch(requests)
+        metrics.PROMPT_TOKENS.observe(prompt.total_tokens)
+        logger.debug(
+            "Built batch prompt",
+            requests=len(requests),
+            prompt_tokens=prompt.total_tokens,
+            system_tokens=prompt.system_tokens,
+            user_tokens=prompt.user_tokens
+        )
+        response = await self._invoke(prompt)
+        with metrics.STAGE_SECONDS.time(stage="parse"):
+            result = self.batch_parser.parse(response.content)
+        drafts = {request.request: request.suggestions for request in result.requests}
+        return [
+            drafts.get(number, ValueError(f"No suggestions for request {number} of the batch"))
+            for number in range(1, len(requests) + 1)
+        ]
+
+    async def _complete(self, memories: List[MemoryRecord], num_suggestions: int, formatted_messages: str) -> List[SuggestionDraft]:
+        prompt = self._build_prompt(memories, num_suggestions, formatted_messages)
+        response = await self._invoke(prompt)
+        with metrics.STAGE_SECONDS.time(stage="parse"):
+            return self.suggestion_parser.parse(response.content).suggestions
+
+    async def _invoke(self, prompt: Prompt) -> Any:
+        with metrics.STAGE_SECONDS.time(stage="llm"):
+            response = await self.llm.ainvoke(prompt.messages)
+        usage = getattr(response, "usage_metadata", None)
+        if isinstance(usage, dict) and usage.get("output_tokens"):
+            metrics.COMPLETION_TOKENS.observe(usage["output_tokens"])
+        elif isinstance(getattr(response, "content", None), str):
+            metrics.COMPLETION_TOKENS.observe(count_tokens(response.content))
+        return response
+
+    async def _generate_drafts(self, memories: List[MemoryRecord], num_suggestions: int, formatted_messages: str) -> List[SuggestionDraft]:
+        if self.batcher is not None:
+            return await self.batcher.submit((memories, num_suggestions, formatted_messages))
+        return await self._complete(memories, num_suggestions, formatted_messages)
 
     async def generate_from_conversations(
         self,
         conversations: List[Dict[str, str]],
         user_id: str,
-        memories: List[Dict[str, str]]
+        memories: List[Union[MemoryRecord, Dict[str, Any]]],
+        num_suggestions: Optional[int] = None
     ) -> List[Suggestion]:
+        """
+        Generate suggestions from the given conversations and memories.
+        
+        See generate, which also tells whether the suggestions are fallback ones.
+
+        Returns:
+            List[Suggestion]: The generated suggestions, or fallback suggestions on failure
+        """
+        result = await self.generate(conversations, user_id, memories, num_suggestions)
+        return result.suggestions
+
+    async def generate(
+        self,
+        conversations: List[Dict[str, str]],
+        user_id: str,
+        memories: List[Union[MemoryRecord, Dict[str, Any]]],
+        num_suggestions: Optional[int] = None
+    ) -> SuggestionResult:
+        """
+        Generate suggestions from the given conversations and memories.
+        
+        Successful generations are cached when the generator has a cache,
+        fallback suggestions never are.
+
+        Args:
+            conversations: Recent chat messages with 'role' and 'content'
+            user_id: The ID of the user the suggestions are for
+            memories: The memory records to base the suggestions on, raw mem0 memories are converted
+            num_suggestions: How many suggestions to ask the LLM for, defaults to one per memory
+
+        Returns:
+            SuggestionResult: The generated suggestions, or fallback suggestions, flagged as such, on failure
+        """
+        metrics.GENERATIONS.inc()
         try:
-            print(f"\nUsing provided memories for user {user_id}...")
-            print(f"Total memories: {len(memories)}")
-            
-            for memory in memories:
-                print(f"Memory: {memory.get('memory', '')}")
+            memories = as_records(memories)
+            logger.debug("Generating suggestions", user_id=user_id, memories=len(memories))
+            if log.sampled():
+                for memory in memories:
+                    logger.item("Memory", user_id=user_id, memory_id=memory.id, memory=memory.memory)
 
             formatted_messages = self._format_messages_for_prompt(conversations)
-            formatted_memories = self._format_memories(memories)
             
-            print("\nGenerating suggestions...")
+            if num_suggestions is None:
+                num_suggestions = len(memories)
+            
+            if self.cache is not None:
+                cached = self.cache.get(user_id, num_suggestions, memories, formatted_messages)
+                if cached is not None:
+                    logger.info("Serving cached suggestions", user_id=user_id, count=len(cached))
+                    return SuggestionResult(suggestions=cached)
+            
             try:
                 # Generate suggestions with model selection included
-                num_memories = len(memories)
-                chain = self.suggestion_prompt | self.llm | self.suggestion_parser
-                result = await chain.ainvoke({
-                    "messages": formatted_messages,
-                    "memories": formatted_memories,
-                    "num_memories": num_memories
-                })
-                suggestions = result.suggestions
-                print(f"Generated {len(suggestions)} suggestions")
+                topics, preferences = self._split_preferences(memories)
+                if self.store is not None and topics:
+                    suggestions = await self._generate_incrementally(
+                        user_id, topics, preferences, num_suggestions, formatted_messages
+                    )
+                else:
+                    drafts = await self._generate_drafts(topics, num_suggestions, formatted_messages)
+                    suggestions = [
+                        self._complete_draft(draft, topics, preferences)
+                        for draft in drafts
+                    ]
+                logger.info("Generated suggestions", user_id=user_id, count=len(suggestions))
+                if log.sampled():
+                    for suggestion in suggestions:
+                        logger.item(
+                            "Suggestion",
+                            user_id=user_id,
+                            title=suggestion.title,
+                            model_type=suggestion.model_type,
+                            selected_model=suggestion.selected_model
+                        )
                 
-                for suggestion in suggestions:
-                    print(f"Generated: {suggestion.title} ({suggestion.model_type}) - Model: {suggestion.selected_model}")
+                if self.cache is not None and suggestions:
+                    self.cache.set(user_id, num_suggestions, memories, suggestions, formatted_messages)
                 
-                return suggestions
+                return SuggestionResult(suggestions=suggestions)
             
             except Exception as e:
-                print(f"Error generating suggestions: {str(e)}")
-                return self._generate_fallback_suggestions(conversations, memories)
+                logger.warning("Error generating suggestions, falling back", user_id=user_id, error=str(e))
+                return SuggestionResult(
+                    suggestions=self._generate_fallback_suggestions(conversations, memories),
+                    is_fallback=True
+                )
+
+        except Exception:
+            logger.exception("Error in generate", user_id=user_id)
+            return SuggestionResult(suggestions=self._generate_fallback_suggestions(conversations, []), is_fallback=True)
+
+    async def _generate_incrementally(
+        self,
+        user_id: str,
+        memories: List[MemoryRecord],
+        preferences: Dict[ModelType, str],
+        num_suggestions: int,
+        formatted_messages: str
+    ) -> List[Suggestion]:
+        """
+        Reuse the stored suggestions of unchanged memories and only generate for the others.
+
+        Suggestions for new or edited memories come first, followed by the
+        reused ones in memory order. The LLM is asked for at least as many
+        suggestions as the reused ones fall short of num_suggestions, and if
+        no memory is new but too few suggestions are stored, e.g. because a
+        larger number is asked for than before, all memories are regenerated.
+        New suggestions are stored under the memory they are based on, and
+        every memory sent to the LLM gets an entry, an empty one if it got no
+        suggestion, so it is known next time.
+        """
+        context = self._store_context(preferences, formatted_messages)
+        hashes = [hash_memory(memory) for memory in memories]
+        known = self.store.get(user_id, hashes, context)
 
+        unique_memories = []
+        unique_hashes = []
+        seen = set()
+        for memory_hash, memory in zip(hashes, memories):
+            if memory_hash not in seen:
+                seen.add(memory_hash)
+                unique_memories.append(memory)
+                unique_hashes.append(memory_hash)
+
+        reused = []
+        new_memories = []
+        new_hashes = []
+        for memory_hash, memory in zip(unique_hashes, unique_memories):
+            if memory_hash in known:
+                reused.extend(known[memory_hash])
+            else:
+                new_memories.append(memory)
+                new_hashes.append(memory_hash)
+        if not new_memories and len(reused) < num_suggestions:
+            reused = []
+            new_memories = unique_memories
+            new_hashes = unique_hashes
+
+        generated = []
+        if new_memories:
+            count = max(num_suggestions - len(reused), min(num_suggestions, len(new_memories)))
+            drafts = await self._generate_drafts(new_memories, count, formatted_messages)
+            generated_by_hash: Dict[str, List[Suggestion]] = {memory_hash: [] for memory_hash in new_hashes}
+            uncited = []
+            for draft in drafts:
+                suggestion = self._complete_draft(draft, new_memories, preferences)
+                generated.append(suggestion)
+                if draft.memory is not None and 1 <= draft.memory <= len(new_memories):
+                    generated_by_hash[new_hashes[draft.memory - 1]].append(suggestion)
+                else:
+                    uncited.append(suggestion)
+            # Suggestions citing no memory are kept under memories that got none, so they are reused too
+            empty = [memory_hash for memory_hash in new_hashes if not generated_by_hash[memory_hash]]
+            for memory_hash, suggestion in zip(empty, uncited):
+                generated_by_hash[memory_hash].append(suggestion)
+            self.store.set(user_id, generated_by_hash, context)
+
+        logger.info(
+            "Generated suggestions incrementally",
+            user_id=user_id,
+            reused=len(reused),
+            unchanged_memories=len(known),
+            generated=len(generated),
+            new_memories=len(new_memories)
+        )
+        return (generated + reused)[:num_suggestions]
+
+    @staticmethod
+    def _store_context(preferences: Dict[ModelType, str], formatted_messages: str) -> str:
+        # Stored suggestions depend on the model preferences they were selected with
+        return "\x1d".join(
+            [formatted_messages] + [f"{model_type.value}={model}" for model_type, model in sorted(preferences.items())]
+        )
+
+    async def stream_from_conversations(
+        self,
+        conversations: List[Dict[str, str]],
+        user_id: str,
+        memories: List[Union[MemoryRecord, Dict[str, Any]]],
+        num_suggestions: Optional[int] = None
+    ) -> AsyncIterator[Suggestion]:
+        """
+        Streaming variant of generate_from_conversations.
+        
+        Each suggestion is yielded as soon as its JSON object is complete in the
+        LLM token stream. Fallback suggestions are yielded if the LLM fails
+        before producing any suggestion.
+        
+        Args:
+            conversations: Recent chat messages with 'role' and 'content'
+            user_id: The ID of the user the suggestions are for
+            memories: The memory records to base the suggestions on, raw mem0 memories are converted
+            num_suggestions: How many suggestions to ask the LLM for, defaults to one per memory
+            
+        Yields:
+            Suggestion: The generated suggestions, in the order the LLM writes them
+        """
+        metrics.GENERATIONS.inc()
+        memories = as_records(memories)
+        formatted_messages = self._format_messages_for_prompt(conversations)
+        if num_suggestions is None:
+            num_suggestions = len(memories)
+        
+        if self.cache is not None:
+            cached = self.cache.get(user_id, num_suggestions, memories, formatted_messages)
+            if cached is not None:
+                for suggestion in cached:
+                    yield suggestion
+                return
+        
+        suggestions = []
+        try:
+            topics, preferences = self._split_preferences(memories)
+            prompt = self._build_prompt(topics, num_suggestions, formatted_messages)
+            parser = SuggestionStreamParser(item_model=SuggestionDraft)
+            stream = self.llm.astream(prompt.messages)
+            try:
+                async for chunk in stream:
+                    for draft in parser.feed(chunk.content):
+                        suggestion = self._complete_draft(draft, topics, preferences)
+                        suggestions.append(suggestion)
+                        yield suggestion
+            finally:
+                # Closed right away when the caller stops early, not when it is garbage collected
+                await stream.aclose()
+            logger.info("Streamed suggestions", user_id=user_id, count=len(suggestions))
         except Exception as e:
-            print(f"Error in generate_from_conversations: {str(e)}")
-            return self._generate_fallback_suggestions(conversations, [])
+            logger.warning("Error streaming suggestions", user_id=user_id, streamed=len(suggestions), error=str(e))
+            if not suggestions:
+                for suggestion in self._generate_fallback_suggestions(conversations, memories):
+                    yield suggestion
+            return
+        
+        if not suggestions:
+            for suggestion in self._generate_fallback_suggestions(conversations, memories):
+                yield suggestion
+        elif self.cache is not None:
+            self.cache.set(user_id, num_suggestions, memories, suggestions, formatted_messages)
+
+    def _build_prompt(self, memories: List[MemoryRecord], num_suggestions: int, formatted_messages: str) -> Prompt:
+        with metrics.STAGE_SECONDS.time(stage="prompt_build"):
+            prompt = self.prompt_builder.build(memories, num_suggestions, formatted_messages)
+        metrics.PROMPT_TOKENS.observe(prompt.total_tokens)
+        logger.debug(
+            "Built prompt",
+            prompt_tokens=prompt.total_tokens,
+            system_tokens=prompt.system_tokens,
+            user_tokens=prompt.user_tokens
+        )
+        return prompt
+
+    def _split_preferences(
+        self,
+        memories: List[MemoryRecord]
+    ) -> Tuple[List[MemoryRecord], Dict[ModelType, str]]:
+        """Separate model preference memories from the memories to suggest from."""
+        topics = []
+        preference_texts = []
+        for memory in memories:
+            if PREFERENCES_CATEGORY in memory.categories:
+                preference_texts.append(memory.memory)
+            else:
+                topics.append(memory)
+        return topics, self.model_selector.parse_preferences(preference_texts)
+
+    def _complete_draft(
+        self,
+        draft: SuggestionDraft,
+        memories: List[MemoryRecord],
+        preferences: Dict[ModelType, str]
+    ) -> Suggestion:
+        """Pick the model type and model for a suggestion written by the LLM."""
+        text = f"{draft.title}\n{draft.description}"
+        if draft.memory is not None and 1 <= draft.memory <= len(memories):
+            text = f"{text}\n{memories[draft.memory - 1].memory}"
+        model_type, selected_model = self.model_selector.select(text, preferences)
+        return Suggestion(
+            title=draft.title,
+            description=draft.description,
+            model_type=model_type.value,
+            selected_model=selected_model
+        )
 
     def _format_messages(self, conversations: List[Dict[str, str]]) -> List[Dict[str, str]]:
         return [
@@ -204,70 +506,17 @@ class SuggestionGenerator:
             formatted.append(f"{role}: {content}")
         return "\n\n".join(formatted)
 
-    def _format_memories(self, memories: List[Dict[str, Any]]) -> str:
+    def _format_memories(self, memories: List[MemoryRecord]) -> str:
         return "\n".join(
-            memory.get("memory", "") for memory in memories
+            memory.memory for memory in memories
         )
 
     def _generate_fallback_suggestions(
         self,
         conversations: List[Dict[str, str]],
-        memories: List[Dict[str, Any]]
+        memories: List[MemoryRecord]
     ) -> List[Suggestion]:
         """Generate fallback suggestions based on conversation context when API calls fail."""
-        fallback_suggestions = []
-        
-        # Extract topics from conversations and memories
-        all_content = " ".join([
-            msg.get("content", "").lower() 
-            for msg in conversations
-        ] + [
-            memory.get("memory", "").lower() 
-            for memory in memories
-        ])
-
-        # Add coding-related suggestion if relevant keywords are found
-        if any(term in all_content for term in ["python", "code", "algorithm", "graph", "function", "programming", "development"]):
-            fallback_suggestions.append(
-                Suggestion(
-                    title="Continue working on coding project",
-                    description="Based on your recent work with algorithms and Python, you might want to explore optimization techniques or add more features.",
-                    model_type=ModelType.CODE,
-                    selected_model="anthropic/claude-3.7-sonnet"
-                )
-            )
-
-        # Add image-related suggestion if relevant keywords are found
-        if any(term in all_content for term in ["image", "visual", "design", "logo", "picture", "photo"]):
-            fallback_suggestions.append(
-                Suggestion(
-                    title="Create visual content",
-                    description="Based on your interest in visuals, consider creating some new designs or images.",
-                    model_type=ModelType.IMAGE,
-                    selected_model="openai/gpt-image-1"
-                )
-            )
-
-        # Add writing-related suggestion if relevant keywords are found
-        if any(term in all_content for term in ["write", "blog", "story", "post", "article"]):
-            fallback_suggestions.append(
-                Suggestion(
-                    title="Expand your writing project",
-                    description="Consider developing your recent writing ideas further, whether it's technical documentation or creative writing.",
-                    model_type=ModelType.TEXT,
-                    selected_model="gpt-4.1"
-                )
-            )
-
-        # Always include a general suggestion if no other suggestions were added
-        if not fallback_suggestions:
-            fallback_suggestions.append(
-                Suggestion(
-                    title="Continue the conversation",
-                    description="Feel free to ask more questions or explore other topics.",
-                    model_type=ModelType.TEXT,
-                    selected_model="gpt-4o-mini"
-                )
-            )
-
-        return fallback_suggestions
+        metrics.FALLBACKS.inc()
+        with metrics.STAGE_SECONDS.time(stage="fallback"):
+            return self.fallback.suggest(conversations, memories)
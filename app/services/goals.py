@@ -0,0 +1,160 @@
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.records import MICROSECONDS, MemoryRecord, parse_timestamp
+
+# Category mem0 files goals and milestones under
+GOALS_CATEGORY = "milestones_and_goals"
+
+# Seconds after which a user's indexed goals are delta synced on the next read
+DEFAULT_GOALS_MAX_AGE = 300.0
+
+# Maximum number of users whose goals are indexed, the least recently read go first
+DEFAULT_GOALS_MAX_USERS = 10000
+
+
+class UserGoals:
+    """One user's goals, kept sorted by timestamp."""
+
+    __slots__ = ("entries", "keys", "by_id", "watermark", "checked_at", "written_at")
+
+    def __init__(self):
+        # (epoch microseconds, memory id, goal), oldest first
+        self.entries: List[Tuple[int, str, Dict[str, Any]]] = []
+        # (epoch microseconds, memory id) of each entry, bisected instead of
+        # the entries as bisect only takes a key function from Python 3.10
+        self.keys: List[Tuple[int, str]] = []
+        self.by_id: Dict[str, Tuple[int, str, Dict[str, Any]]] = {}
+        self.watermark: Optional[str] = None
+        self.checked_at = 0.0
+        self.written_at = 0.0
+
+    def put(self, memory: Dict[str, Any]) -> None:
+        """Index, re-index or drop a memory depending on whether it still is a goal."""
+        record = MemoryRecord.from_mem0(memory)
+        memory_id = record.id or record.memory
+        if not memory_id:
+            return
+        self.remove(memory_id)
+        if not record.memory or GOALS_CATEGORY not in record.categories:
+            return
+        entry = (
+            record.created,
+            memory_id,
+            {"content": record.memory, "timestamp": memory.get("created_at"), "categories": list(record.categories)}
+        )
+        index = bisect_left(self.keys, (entry[0], entry[1]))
+        self.keys.insert(index, (entry[0], entry[1]))
+        self.entries.insert(index, entry)
+        self.by_id[memory_id] = entry
+
+    def remove(self, memory_id: str) -> None:
+        entry = self.by_id.pop(memory_id, None)
+        if entry is not None:
+            index = bisect_left(self.keys, (entry[0], entry[1]))
+            del self.keys[index]
+            del self.entries[index]
+
+    def advance(self, memories: List[Dict[str, Any]], checked_at: float) -> None:
+        for memory in memories:
+            updated_at = memory.get("updated_at")
+            if updated_at and parse_timestamp(updated_at) > parse_timestamp(self.watermark):
+                self.watermark = updated_at
+        self.checked_at = checked_at
+
+
+class GoalsIndex:
+    """
+    Per-user index of goal memories, ordered by parsed timestamp.
+
+    MemoryService fills a user's index from mem0 on the first read, with the
+    category filtered server side, and afterwards only fetches the memories
+    updated since, after a write or once max_age has passed. Reads are
+    answered from the index by recency window and limit.
+    """
+
+    def __init__(self, max_age: float = DEFAULT_GOALS_MAX_AGE, max_users: int = DEFAULT_GOALS_MAX_USERS):
+        self.max_age = max_age
+        self.max_users = max_users
+        self._users: "OrderedDict[str, UserGoals]" = OrderedDict()
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._users
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, user_id: str) -> Optional[UserGoals]:
+        return self._users.get(user_id)
+
+    def is_due(self, user_id: str, now: Optional[float] = None) -> bool:
+        """Whether the user's goals need a (delta) sync before they are read."""
+        goals = self._users.get(user_id)
+        if goals is None:
+            return True
+        now = time.time() if now is None else now
+        return goals.written_at >= goals.checked_at or now - goals.checked_at >= self.max_age
+
+    def load(self, user_id: str, memories: List[Dict[str, Any]], checked_at: float) -> None:
+        """Index all of the user's goal memories, replacing what was indexed."""
+        goals = UserGoals()
+        for memory in memories:
+            goals.put(memory)
+        goals.advance(memories, checked_at)
+        self._users[user_id] = goals
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def merge(self, user_id: str, memories: List[Dict[str, Any]], checked_at: float) -> None:
+        """Apply the user's memories updated since the last sync, of any category."""
+        goals = self._users.get(user_id)
+        if goals is None:
+            return
+        for memory in memories:
+            goals.put(memory)
+        goals.advance(memories, checked_at)
+
+    def mark_written(self, user_id: str) -> None:
+        """Write listener for MemoryService, the next read fetches what changed."""
+        goals = self._users.get(user_id)
+        if goals is not None:
+            goals.written_at = time.time()
+
+    def query(
+        self,
+        user_id: str,
+        window: Optional[float] = None,
+        limit: Optional[int] = None,
+        now: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        The user's goals, newest first.
+
+        Args:
+            user_id: The ID of the user
+            window: Only goals from the last window seconds, all if None
+            limit: Maximum number of goals, all if None
+
+        Returns:
+            List[Dict[str, Any]]: Goals with content, timestamp and categories
+        """
+        goals = self._users.get(user_id)
+        if goals is None:
+            return []
+        self._users.move_to_end(user_id)
+        start = 0
+        if window is not None:
+            now = time.time() if now is None else now
+            # A 1-tuple sorts before every key with the same timestamp
+            start = bisect_left(goals.keys, (int((now - window) * MICROSECONDS),))
+        stop = start if limit is None else max(start, len(goals.entries) - limit)
+        return [entry[2] for entry in reversed(goals.entries[stop:])]
+
+    def evict(self, user_id: str) -> None:
+        self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._users.clear()
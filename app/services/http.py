@@ -0,0 +1,133 @@
+from typing import Dict, Optional
+
+import httpx
+
+# Connections per backend, in use and idle
+DEFAULT_MAX_CONNECTIONS = 100
+
+# Idle connections per backend kept open for reuse
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# Seconds an idle connection is kept open
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+# Seconds to wait for a response, and for a connection to be established
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (``pip install httpx[http2]``)."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_async_client(
+    proxy_url: Optional[str] = None,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+    timeout: float = DEFAULT_TIMEOUT,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    http2: bool = True
+) -> httpx.AsyncClient:
+    """
+    Create an async HTTP client with a keep-alive connection pool.
+
+    Args:
+        proxy_url: Proxy to send all requests through
+        max_connections: Maximum number of connections
+        max_keepalive_connections: Maximum number of idle connections kept open
+        keepalive_expiry: Seconds an idle connection is kept open
+        timeout: Seconds to wait for reads, writes and free connections
+        connect_timeout: Seconds to wait for a connection to be established
+        http2: Use HTTP/2 when the server and the h2 package support it
+
+    Returns:
+        httpx.AsyncClient: The client, to be closed with ``aclose()``
+    """
+    return httpx.AsyncClient(
+        proxy=proxy_url,
+        http2=http2 and http2_available(),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout)
+    )
+
+
+class HTTPClientPool:
+    """
+    Pooled async HTTP clients, one per backend.
+
+    Each backend (the LLM provider, mem0) gets its own client and connection
+    pool, created on first use and kept for the lifetime of the app, so
+    requests reuse open connections instead of paying for a new TLS handshake
+    every time. Backends don't share a client because SDKs like mem0 set their
+    base URL and auth headers on the client they are given.
+
+    Args:
+        max_connections: Maximum number of connections per backend
+        max_keepalive_connections: Maximum number of idle connections kept open per backend
+        keepalive_expiry: Seconds an idle connection is kept open
+        timeout: Seconds to wait for reads, writes and free connections
+        connect_timeout: Seconds to wait for a connection to be established
+        http2: Use HTTP/2 when the server and the h2 package support it
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        http2: bool = True
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.http2 = http2
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def get(self, backend: str, proxy_url: Optional[str] = None) -> httpx.AsyncClient:
+        """
+        Get the client for a backend, creating it on first use.
+
+        Args:
+            backend: Name of the backend, e.g. "openai" or "mem0"
+            proxy_url: Proxy for the backend, only used when the client is created
+
+        Returns:
+            httpx.AsyncClient: The backend's client
+        """
+        client = self._clients.get(backend)
+        if client is None or client.is_closed:
+            client = create_async_client(
+                proxy_url=proxy_url,
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+                timeout=self.timeout,
+                connect_timeout=self.connect_timeout,
+                http2=self.http2
+            )
+            self._clients[backend] = client
+        return client
+
+    def __contains__(self, backend: str) -> bool:
+        return backend in self._clients
+
+    async def aclose(self) -> None:
+        """Close all clients and their connections."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
@@ -0,0 +1,142 @@
+import string
+from collections import Counter
+from typing import List, Dict, Iterable, Tuple
+
+# Punctuation that separates tokens. "+" and "#" stay part of words for "c++" and "c#".
+_SEPARATORS = str.maketrans({char: " " for char in string.punctuation if char not in "+#"})
+
+# Joins texts scanned together, its token is not part of any term so terms never span two texts
+_TEXT_SEPARATOR = "\n\x00\n"
+
+# Terms this short have to match whole tokens, longer ones are token prefixes
+WHOLE_WORD_LENGTH = 3
+
+# Tokens seen before and their categories are remembered up to this many tokens
+MAX_MEMO_SIZE = 65536
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase tokens on whitespace and punctuation."""
+    return text.lower().translate(_SEPARATORS).split()
+
+
+class KeywordMatcher:
+    """
+    Scores text against several keyword categories at once.
+
+    Text is tokenized once and every token is looked up in tables compiled
+    from the terms of all categories, so the cost does not grow with the
+    number of categories or terms. Terms are token prefixes ("illustrat"
+    matches "illustration"), except very short ones and whole_words which
+    have to be whole tokens, and can span several tokens ("unit test"). The longest matching
+    term wins, and a term can belong to several categories ("logo" is both
+    image and vector), every match counts towards each of them.
+
+    Args:
+        categories: Lowercase terms per category name
+        whole_words: Terms that only match whole tokens however long they are,
+            e.g. "photo", which would otherwise match "photosynthesis"
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]], whole_words: Iterable[str] = ()):
+        self.categories = list(categories)
+        self._whole_words = {word.lower() for word in whole_words}
+        self._order = {name: index for index, name in enumerate(self.categories)}
+
+        categories_by_term: Dict[Tuple[str, ...], List[str]] = {}
+        for name, terms in categories.items():
+            for term in terms:
+                names = categories_by_term.setdefault(tuple(tokenize(term)), [])
+                if name not in names:
+                    names.append(name)
+
+        # Single token terms, by the whole token or by the token prefix
+        self._words: Dict[str, Tuple[str, ...]] = {}
+        self._prefixes: Dict[str, Tuple[str, ...]] = {}
+        # Multi token terms by their first token, longest first
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], Tuple[str, ...]]]] = {}
+        for tokens, names in categories_by_term.items():
+            if len(tokens) > 1:
+                self._phrases.setdefault(tokens[0], []).append((tokens[1:], tuple(names)))
+            elif self._is_whole_word(tokens[0]):
+                self._words[tokens[0]] = tuple(names)
+            else:
+                self._prefixes[tokens[0]] = tuple(names)
+        for phrases in self._phrases.values():
+            phrases.sort(key=lambda phrase: len(phrase[0]), reverse=True)
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._prefixes}, reverse=True)
+        self._memo: Dict[str, Tuple[str, ...]] = {}
+
+    def _is_whole_word(self, term: str) -> bool:
+        return len(term) <= WHOLE_WORD_LENGTH or term in self._whole_words
+
+    def _match_token(self, token: str) -> Tuple[str, ...]:
+        names = self._memo.get(token)
+        if names is None:
+            names = self._words.get(token, ())
+            for length in self._prefix_lengths:
+                if length <= len(token) and token[:length] in self._prefixes:
+                    names = self._prefixes[token[:length]]
+                    break
+            if len(self._memo) >= MAX_MEMO_SIZE:
+                self._memo.clear()
+            self._memo[token] = names
+        return names
+
+    def _match_phrase(self, tokens: List[str], start: int) -> Tuple[int, Tuple[str, ...]]:
+        """Length and categories of the longest multi token term at tokens[start], (0, ()) if none."""
+        for rest, names in self._phrases[tokens[start]]:
+            end = start + 1 + len(rest)
+            if end > len(tokens):
+                continue
+            *middle, last = rest
+            if tokens[start + 1:end - 1] != middle:
+                continue
+            if last == tokens[end - 1] or (not self._is_whole_word(last) and tokens[end - 1].startswith(last)):
+                return len(rest) + 1, names
+        return 0, ()
+
+    def _count_phrases(self, tokens: List[str], token_counts: Counter, counts: Dict[str, int]) -> None:
+        """Count the multi token terms, their tokens are taken out of token_counts."""
+        position = 0
+        while position < len(tokens):
+            length = 0
+            if tokens[position] in self._phrases:
+                length, names = self._match_phrase(tokens, position)
+            if length:
+                for name in names:
+                    counts[name] = counts.get(name, 0) + 1
+                token_counts.subtract(tokens[position:position + length])
+                position += length
+            else:
+                position += 1
+
+    def count(self, text: str) -> Dict[str, int]:
+        """
+        Count the category matches in text.
+
+        Args:
+            text: The text to scan, any case
+
+        Returns:
+            Dict[str, int]: Number of matches per category, categories without matches are left out
+        """
+        counts: Dict[str, int] = {}
+        tokens = tokenize(text)
+        token_counts = Counter(tokens)
+        if self._phrases and not self._phrases.keys().isdisjoint(token_counts):
+            self._count_phrases(tokens, token_counts, counts)
+        # Every distinct token is matched once, however often it occurs
+        for token, number in token_counts.items():
+            if number > 0:
+                for name in self._match_token(token):
+                    counts[name] = counts.get(name, 0) + number
+        return counts
+
+    def count_all(self, texts: Iterable[str]) -> Dict[str, int]:
+        """Count the category matches over several texts, tokenized together in one pass."""
+        return self.count(_TEXT_SEPARATOR.join(text for text in texts if text))
+
+    def rank(self, counts: Dict[str, int]) -> List[str]:
+        """Categories with matches, most matches first, ties in category order."""
+        return sorted(counts, key=lambda name: (-counts[name], self._order[name]))
@@ -0,0 +1,174 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, TextIO
+
+# Root of the loggers of the app, every get_logger logger is below it
+ROOT_LOGGER = "app"
+
+# Default log level
+DEFAULT_LEVEL = "INFO"
+
+# Default share of requests whose per-item debug output (every memory, every
+# suggestion) is logged, the summary lines are always logged
+DEFAULT_SAMPLE_RATE = 0.01
+
+# Header a request ID is read from, and sent back in
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_request_id: ContextVar[str] = ContextVar("request_id", default="-")
+_sampled: ContextVar[bool] = ContextVar("sampled", default=False)
+_sample_rate = float(os.getenv("LOG_SAMPLE_RATE", DEFAULT_SAMPLE_RATE))
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+def set_request_id(request_id: Optional[str] = None) -> str:
+    """
+    Set the ID logged with everything the current request, or task, logs.
+
+    Whether the request's per-item debug output is sampled is decided here,
+    from the ID, so either all or none of a request's items are logged.
+
+    Returns:
+        str: The request ID, a new one if none was given
+    """
+    request_id = request_id or uuid.uuid4().hex
+    _request_id.set(request_id)
+    _sampled.set(zlib.crc32(request_id.encode()) / 0xFFFFFFFF < _sample_rate)
+    return request_id
+
+
+def get_request_id() -> str:
+    return _request_id.get()
+
+
+def sampled() -> bool:
+    """Whether the current request logs its per-item debug output."""
+    return _sampled.get()
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    Logger taking structured fields as keyword arguments.
+
+        logger.info("Generated suggestions", user_id=user_id, count=3)
+    """
+
+    def __init__(self, logger: logging.Logger):
+        super().__init__(logger, {})
+
+    def process(self, msg: Any, kwargs: Dict[str, Any]):
+        fields = {
+            key: kwargs.pop(key)
+            for key in list(kwargs)
+            if key not in ("exc_info", "stack_info", "stacklevel", "extra")
+        }
+        kwargs.setdefault("extra", {})["fields"] = fields
+        return msg, kwargs
+
+    def item(self, msg: str, **fields: Any) -> None:
+        """Per-item debug output, only logged for sampled requests."""
+        if sampled() and self.isEnabledFor(logging.DEBUG):
+            self.debug(msg, **fields)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """A structured logger below the app's root logger, name is usually __name__."""
+    if name != ROOT_LOGGER and not name.startswith(f"{ROOT_LOGGER}."):
+        name = f"{ROOT_LOGGER}.{name}"
+    return StructuredLogger(logging.getLogger(name))
+
+
+class _RequestContextFilter(logging.Filter):
+    """Stamps records with the request ID in the caller's context, before they are queued."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the structured fields at the top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queues records with only their message rendered, the JSON is rendered by the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        exc_text = None
+        if record.exc_info:
+            # Tracebacks can't be queued, only their text
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        prepared = super().prepare(record)
+        prepared.exc_text = exc_text
+        return prepared
+
+    def format(self, record: logging.LogRecord) -> str:
+        return record.getMessage()
+
+
+def start_logging(level: Optional[str] = None, stream: Optional[TextIO] = None) -> None:
+    """
+    Send the app's logs through a queue to a background thread.
+
+    Logging calls on the event loop only put the record on a queue, a
+    QueueListener thread formats it as JSON and writes it to the stream.
+
+    Args:
+        level: Log level of the app's loggers, LOG_LEVEL or INFO by default
+        stream: Where to write the logs, stderr by default
+    """
+    global _listener, _queue_handler
+    stop_logging()
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel((level or os.getenv("LOG_LEVEL", DEFAULT_LEVEL)).upper())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter())
+    _queue_handler = _QueueHandler(log_queue)
+    _queue_handler.addFilter(_RequestContextFilter())
+    root.addHandler(_queue_handler)
+    root.propagate = False
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Write out the queued logs and stop the background thread."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _queue_handler is not None:
+        root = logging.getLogger(ROOT_LOGGER)
+        root.removeHandler(_queue_handler)
+        root.propagate = True
+        _queue_handler = None
+
+
+def set_sample_rate(rate: float) -> None:
+    """Share of requests, from 0 to 1, whose per-item debug output is logged."""
+    global _sample_rate
+    _sample_rate = rate
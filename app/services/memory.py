@@ -1,10 +1,25 @@
+import asyncio
+import heapq
+import json
 import os
-from typing import List, Dict, Any
-from mem0 import AsyncMemoryClient
+import time
+from typing import TYPE_CHECKING, List, Dict, Any, AsyncIterator, Awaitable, Callable, Optional
+import httpx
 from dotenv import load_dotenv
 
+from app.services.goals import GoalsIndex, GOALS_CATEGORY
+from app.services.records import MemoryRecord
+from app.services import log
+
+if TYPE_CHECKING:
+    # mem0 takes over a second to import, it is imported when the client is created
+    from mem0 import AsyncMemoryClient
+    from app.services.mirror import MemoryMirror, SyncState
+
 load_dotenv()
 
+logger = log.get_logger(__name__)
+
 DEFAULT_CATEGORIES = [
     {"personal_information": "Basic information about the user including name, preferences, and personality traits"},
     {"communicational_style": "Tracks the user's communication preferences including tone, length, formality, slang usage, and preferred response format"},
@@ -24,27 +39,187 @@ DEFAULT_CATEGORIES = [
     {"image_generation_preferences": "Details about user's preferences for image generation, including styles, themes, contexts, and specific requirements"}
 ]
 
+# Page size used when listing memories from mem0
+DEFAULT_PAGE_SIZE = 50
+
+# Most pages iter_memories requests, in case the API keeps returning pages
+MAX_PAGES = 1000
+
+# How many of the most recent memories get_recent_conversations returns by default
+DEFAULT_RECENT_LIMIT = 50
+
+# Callbacks run with the user_id after any MemoryService writes memories for that user
+_write_listeners: List[Callable[[str], None]] = []
+
+def add_write_listener(listener: Callable[[str], None]) -> None:
+    """Register a callback that is called with the user_id whenever memories are added."""
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+def remove_write_listener(listener: Callable[[str], None]) -> None:
+    """Unregister a callback added with add_write_listener."""
+    if listener in _write_listeners:
+        _write_listeners.remove(listener)
+
+# Seconds the project categories are served before they are refreshed in the background
+DEFAULT_CATEGORIES_TTL = 3600.0
+
+class CategoryCache:
+    """
+    Process-wide cache of the project's categories.
+
+    Categories are set per mem0 project, not per user, and barely ever
+    change, so they are fetched once and then served from memory. Concurrent
+    first lookups share a single fetch. Once ttl has passed the cached list
+    is still served while one refresh runs in the background, and it is only
+    replaced, bumping version, if the fetched categories differ.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_CATEGORIES_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self.fetches = 0
+        self._categories: Optional[List[Dict[str, Any]]] = None
+        self._fingerprint: Optional[str] = None
+        self._fetched_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._refresh: Optional[asyncio.Future] = None
+
+    async def get(self, fetch: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """
+        Return the cached categories, fetching them on first use.
+
+        Args:
+            fetch: Loads the categories from mem0
+
+        Returns:
+            List[Dict[str, Any]]: The categories, shared by all callers and not to be modified
+        """
+        if self._categories is not None:
+            if time.monotonic() - self._fetched_at >= self.ttl and self._refresh is None:
+                self._refresh = asyncio.ensure_future(self._background_refresh(fetch))
+            return self._categories
+        async with self._get_lock():
+            if self._categories is None:
+                self._store(await fetch())
+        return self._categories
+
+    def invalidate(self) -> None:
+        """Drop the cached categories, the next lookup fetches them again."""
+        self._categories = None
+        self._fingerprint = None
+
+    def _store(self, categories: List[Dict[str, Any]]) -> None:
+        self.fetches += 1
+        self._fetched_at = time.monotonic()
+        fingerprint = json.dumps(categories, sort_keys=True)
+        if fingerprint != self._fingerprint:
+            self._categories = categories
+            self._fingerprint = fingerprint
+            self.version += 1
+
+    async def _background_refresh(self, fetch: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> None:
+        try:
+            self._store(await fetch())
+        except Exception as e:
+            logger.warning("Error refreshing project categories, serving the cached ones", error=str(e))
+        finally:
+            self._refresh = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # A lock only works within the event loop it was first used in
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+# Shared by every MemoryService in the process
+category_cache = CategoryCache(ttl=float(os.getenv("CATEGORIES_TTL", DEFAULT_CATEGORIES_TTL)))
+
 class MemoryService:
-    def __init__(self):
-        self.client = AsyncMemoryClient()
+    def __init__(
+        self,
+        client: Optional["AsyncMemoryClient"] = None,
+        mirror: Optional["MemoryMirror"] = None,
+        categories: Optional[CategoryCache] = None,
+        goals: Optional[GoalsIndex] = None
+    ):
+        # Created by connect, or on first use, see client
+        self._client = client
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.mirror = mirror
+        # Mirror loads started by reads, by user_id, see _load_in_background
+        self._mirror_loads: Dict[str, asyncio.Future] = {}
+        self.categories = categories if categories is not None else category_cache
+        self.goals = goals if goals is not None else GoalsIndex()
+
+    @property
+    def client(self) -> "AsyncMemoryClient":
+        """The mem0 client, created on first use unless it was given or connect was called."""
+        if self._client is None:
+            self.connect()
+        return self._client
+
+    @client.setter
+    def client(self, client: "AsyncMemoryClient") -> None:
+        self._client = client
+
+    def connect(self) -> None:
+        """
+        Create the mem0 client, unless there is one.
+
+        Importing mem0 and the API key check the client makes when it is
+        created take a while and block, so the app connects while it starts,
+        see app/main.py, instead of when it is imported.
+        """
+        if self._client is None:
+            from mem0 import AsyncMemoryClient
+            self._client = AsyncMemoryClient(host=os.getenv("MEM0_HOST"), client=self._http_client)
+
+    def use_http_client(self, http_client: httpx.AsyncClient) -> None:
+        """Send mem0 requests through a pooled HTTP client, see app/services/http.py."""
+        self._http_client = http_client
+        if self._client is not None:
+            from mem0 import AsyncMemoryClient
+            self._client = AsyncMemoryClient(
+                api_key=self._client.api_key,
+                host=self._client.host,
+                client=http_client
+            )
+
+    def use_mirror(self, mirror: Optional["MemoryMirror"]) -> None:
+        """Serve recent memories from a local mirror, see app/services/mirror.py. None turns it off."""
+        self.mirror = mirror
         
-    async def initialize_categories(self, user_id: str) -> List[Dict[str, str]]:
-        """Initialize default categories for a new user."""
-        # First, set the categories at the project level
-        response = await self.client.update_project(custom_categories=DEFAULT_CATEGORIES)
+    async def initialize_categories(self) -> List[Dict[str, str]]:
+        """Set the default categories on the mem0 project, they are shared by all users."""
+        await self.client.update_project(custom_categories=DEFAULT_CATEGORIES)
         return DEFAULT_CATEGORIES
 
     async def get_user_categories(self, user_id: str) -> List[Dict[str, Any]]:
-        """Retrieve user's custom categories from mem0."""
-        # Get project settings to check categories
+        """
+        Retrieve the categories memories are filed under.
+        
+        Categories are set per mem0 project, so every user gets the same ones,
+        served from the process-wide category cache.
+        
+        Args:
+            user_id: The ID of the user
+            
+        Returns:
+            List[Dict[str, Any]]: The categories, not to be modified
+        """
+        return await self.categories.get(self._fetch_categories)
+    
+    async def _fetch_categories(self) -> List[Dict[str, Any]]:
         project = await self.client.get_project(fields=["custom_categories"])
         categories = project.get("custom_categories", [])
         
         if not categories:
             # If no categories set, initialize them
-            await self.initialize_categories(user_id)
-            project = await self.client.get_project(fields=["custom_categories"])
-            categories = project.get("custom_categories", [])
+            categories = await self.initialize_categories()
             
         # Transform categories into the expected format
         formatted_categories = []
@@ -60,49 +235,237 @@ class MemoryService:
             
         return formatted_categories
     
-    async def get_user_goals(self, user_id: str) -> List[Dict[str, Any]]:
-        """Retrieve user's goals from mem0."""
-        # Get all memories with milestones_and_goals category
+    async def get_user_goals(
+        self,
+        user_id: str,
+        window: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve the user's goals, newest first.
+        
+        Goals are answered from the per-user goals index. The first read fills
+        it with the user's goal memories, filtered by category in mem0, later
+        reads only fetch the memories updated since, after a write or once the
+        index's max_age has passed.
+        
+        Args:
+            user_id: The ID of the user
+            window: Only goals from the last window seconds, all if None
+            limit: Maximum number of goals to return, all if None
+            
+        Returns:
+            List[Dict[str, Any]]: Goals with content, timestamp and categories
+        """
+        if self.goals.is_due(user_id):
+            await self._sync_goals(user_id)
+        return self.goals.query(user_id, window=window, limit=limit)
+    
+    async def _sync_goals(self, user_id: str) -> None:
+        checked_at = time.time()
+        indexed = self.goals.get(user_id)
+        if indexed is None or indexed.watermark is None:
+            filters = {
+                "AND": [
+                    {"user_id": user_id},
+                    {"categories": {"contains": GOALS_CATEGORY}}
+                ]
+            }
+            memories = [memory async for memory in self.iter_memories(filters)]
+            self.goals.load(user_id, memories, checked_at)
+            return
+        # Memories of every category, so goals that lost theirs are dropped too
         filters = {
             "AND": [
                 {"user_id": user_id},
-                {"categories": {"contains": "milestones_and_goals"}}
+                {"updated_at": {"gte": indexed.watermark}}
             ]
         }
-        response = await self.client.get_all(version="v2", filters=filters)
-        memories = response.get("results", []) if isinstance(response, dict) else response
-        goals = []
+        memories = [memory async for memory in self.iter_memories(filters)]
+        self.goals.merge(user_id, memories, checked_at)
+    
+    async def add_memory(self, user_id: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        response = await self.client.add(messages=messages, user_id=user_id, output_format="v1.1")
+        if self.mirror is not None and isinstance(response, dict):
+            await asyncio.to_thread(self.mirror.write, user_id, response.get("results") or [])
+        self.goals.mark_written(user_id)
+        for listener in list(_write_listeners):
+            listener(user_id)
+        return response
+    
+    async def iter_memories(
+        self,
+        filters: Dict[str, Any],
+        limit: Optional[int] = None,
+        page_size: int = DEFAULT_PAGE_SIZE
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream memories matching the filters from mem0, one page at a time.
+        
+        Pages are only requested as the caller consumes them, and no more than
+        ``limit`` memories are ever fetched, so callers that stop early never
+        pay for the rest of the user's history. Listing stops at a page that
+        repeats the previous one or only has memories already yielded, which
+        happens with backends that ignore ``page``, and after MAX_PAGES pages.
         
-        # Extract goals from memories
-        for memory in memories:
-            if isinstance(memory, dict):
-                # Get the memory content
-                content = memory.get("memory", "")
-                if content:
-                    goals.append({
-                        "content": content,
-                        "timestamp": memory.get("created_at"),
-                        "categories": memory.get("categories", [])
-                    })
+        Args:
+            filters: mem0 v2 filters
+            limit: Maximum number of memories to yield, unbounded if None
+            page_size: Number of memories requested per page
+            
+        Yields:
+            Dict[str, Any]: Raw mem0 memories in the order the API returns them
+        """
+        if limit is not None:
+            if limit <= 0:
+                return
+            page_size = min(page_size, limit)
         
-        # Sort goals by timestamp if available
-        goals.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        return goals
+        remaining = limit
+        seen_ids = set()
+        previous = None
+        for page in range(1, MAX_PAGES + 1):
+            response = await self.client.get_all(
+                version="v2",
+                filters=filters,
+                page=page,
+                page_size=page_size
+            )
+            if isinstance(response, dict):
+                results = response.get("results", [])
+                has_next = bool(response.get("next"))
+            else:
+                results = response
+                has_next = len(results) >= page_size
+            
+            fresh = [memory for memory in results if not memory.get("id") or memory["id"] not in seen_ids]
+            if not fresh or results == previous:
+                return
+            previous = results
+            seen_ids.update(memory["id"] for memory in fresh if memory.get("id"))
+            
+            for memory in fresh[:remaining]:
+                yield memory
+            
+            if remaining is not None:
+                remaining -= len(fresh)
+                if remaining <= 0:
+                    return
+            if not has_next:
+                return
+        logger.warning("Stopped listing memories after the maximum number of pages", pages=MAX_PAGES)
     
-    async def add_memory(self, user_id: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
-        return await self.client.add(messages=messages, user_id=user_id, output_format="v1.1")
+    async def get_recent_conversations(self, user_id: str, limit: int = DEFAULT_RECENT_LIMIT) -> List[MemoryRecord]:
+        """
+        Retrieve the user's most recent memories, newest first.
+        
+        mem0 lists memories newest first, so only the first ``limit`` memories
+        are fetched instead of the user's whole history.
+        
+        Args:
+            user_id: The ID of the user
+            limit: Maximum number of memories to return
+            
+        Returns:
+            List[MemoryRecord]: Up to ``limit`` memories ordered by parsed creation time
+        """
+        if self.mirror is not None:
+            return await self._get_mirrored_conversations(user_id, limit)
+        return await self._get_recent_from_mem0(user_id, limit)
     
-    async def get_recent_conversations(self, user_id: str) -> List[Dict[str, Any]]:
-        """Retrieve user's recent conversations."""
-        # Get all memories for the user, sorted by timestamp
+    async def _get_recent_from_mem0(self, user_id: str, limit: int) -> List[MemoryRecord]:
         filters = {
             "AND": [
                 {"user_id": user_id}
             ]
         }
-        response = await self.client.get_all(version="v2", filters=filters)
-        memories = response.get("results", []) if isinstance(response, dict) else response
+        records = [MemoryRecord.from_mem0(memory) async for memory in self.iter_memories(filters, limit=limit)]
+        
+        # Only ``limit`` memories are ordered, in case the API order is not strict
+        return heapq.nlargest(limit, records, key=lambda record: record.created)
+    
+    async def _get_mirrored_conversations(self, user_id: str, limit: int) -> List[MemoryRecord]:
+        state = await asyncio.to_thread(self.mirror.read_state, user_id)
+        now = time.time()
+        if state is None or state.needs_reload(self.mirror.reload_interval, now):
+            # A full load lists the user's whole history, reads never wait for it
+            self._load_in_background(user_id)
+            if state is None:
+                return await self._get_recent_from_mem0(user_id, limit)
+        elif state.is_due(self.mirror.sync_interval, now):
+            try:
+                await self._merge_user(user_id, state)
+            except Exception as e:
+                # Serve what the mirror has, the next read tries again
+                logger.warning("Error syncing memories, serving the mirror", user_id=user_id, error=str(e))
+        memories = await asyncio.to_thread(self.mirror.recent, user_id, limit)
+        return [MemoryRecord.from_mem0(memory) for memory in memories]
+    
+    def _load_in_background(self, user_id: str) -> None:
+        if user_id not in self._mirror_loads:
+            self._mirror_loads[user_id] = asyncio.ensure_future(self._background_load(user_id))
+    
+    async def _background_load(self, user_id: str) -> None:
+        try:
+            await self._load_user(user_id)
+        except Exception as e:
+            logger.warning("Error loading memories into the mirror", user_id=user_id, error=str(e))
+        finally:
+            self._mirror_loads.pop(user_id, None)
+    
+    async def wait_for_mirror(self) -> None:
+        """Wait for the mirror loads started by reads to finish."""
+        while self._mirror_loads:
+            await asyncio.gather(*list(self._mirror_loads.values()))
+    
+    async def cancel_mirror_loads(self) -> None:
+        """Cancel the mirror loads started by reads, when the app stops."""
+        loads = list(self._mirror_loads.values())
+        for load in loads:
+            load.cancel()
+        await asyncio.gather(*loads, return_exceptions=True)
+        self._mirror_loads.clear()
+    
+    async def sync_user(self, user_id: str) -> None:
+        """
+        Bring the user's mirrored memories up to date with mem0.
+        
+        A user that is not mirrored yet, or was last loaded reload_interval
+        seconds ago, is loaded in full, which drops the memories other clients
+        deleted in mem0. Otherwise only the memories updated since the last
+        sync are fetched.
         
-        # Sort memories by timestamp and return the most recent ones
-        memories.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        return memories  # Return the 10 most recent conversations
+        Args:
+            user_id: The ID of the user
+        """
+        state = await asyncio.to_thread(self.mirror.sync_state, user_id)
+        if state is None or state.needs_reload(self.mirror.reload_interval, time.time()):
+            await self._load_user(user_id)
+        else:
+            await self._merge_user(user_id, state)
+    
+    async def _load_user(self, user_id: str) -> None:
+        checked_at = time.time()
+        filters = {"AND": [{"user_id": user_id}]}
+        memories = [memory async for memory in self.iter_memories(filters)]
+        await asyncio.to_thread(self.mirror.load, user_id, memories, checked_at)
+    
+    async def _merge_user(self, user_id: str, state: "SyncState") -> None:
+        checked_at = time.time()
+        # gte, memories sharing the watermark's timestamp are fetched again and merged idempotently
+        filters = {"AND": [{"user_id": user_id}, {"updated_at": {"gte": state.watermark}}]}
+        memories = [memory async for memory in self.iter_memories(filters)]
+        await asyncio.to_thread(self.mirror.merge, user_id, memories, checked_at)
+    
+    async def sync_mirror(self) -> None:
+        """Evict the cold users from the mirror, then delta sync every remaining user that is due."""
+        if self.mirror is None:
+            return
+        evicted = await asyncio.to_thread(self.mirror.evict_cold)
+        if evicted:
+            logger.info("Evicted users from the memory mirror", evicted=evicted)
+        for user_id in await asyncio.to_thread(self.mirror.users_due):
+            try:
+                await self.sync_user(user_id)
+            except Exception as e:
+                logger.warning("Error syncing memories", user_id=user_id, error=str(e))
@@ -0,0 +1,233 @@
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Histogram buckets for stage latencies, in seconds
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Histogram buckets for prompt and completion sizes, in tokens
+DEFAULT_TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class Metric(ABC):
+    """A named metric, optionally split by labels, rendered in the Prometheus text format."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    @abstractmethod
+    def samples(self) -> List[Sample]:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Sample]:
+        return [(f"{self.name}_total", self._labels(key), value) for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """A value read from a function whenever the metrics are collected."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, function: Callable[[], float]):
+        super().__init__(name, help)
+        self.function = function
+
+    def value(self) -> float:
+        return float(self.function())
+
+    def samples(self) -> List[Sample]:
+        return [(self.name, {}, self.value())]
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, plus their sum and count."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per label set: observations per bucket (not cumulative), sum and count
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe how long the block takes, in seconds, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def sum(self, **labels: str) -> float:
+        series = self._series.get(self._key(labels))
+        return series[1] if series else 0.0
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        for key, (counts, total, count) in self._series.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, observed in zip(self.buckets, counts):
+                cumulative += observed
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """The metrics of the process, served on /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Register a metric, a metric registered again under the same name replaces the old one."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, function: Callable[[], float]) -> Gauge:
+        return self.register(Gauge(name, help, function))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+def ratio(part: float, whole: float) -> float:
+    """part / whole, 0 when there is nothing to divide."""
+    return part / whole if whole else 0.0
+
+
+registry = MetricsRegistry()
+
+# Where the time of a suggestion request goes: mem0_fetch, select, prompt_build,
+# llm, parse, fallback and total
+STAGE_SECONDS = registry.histogram(
+    "suggestion_stage_seconds",
+    "Time spent per stage of generating suggestions",
+    labelnames=("stage",)
+)
+PROMPT_TOKENS = registry.histogram(
+    "suggestion_prompt_tokens",
+    "Tokens in the prompts sent to the LLM",
+    buckets=DEFAULT_TOKEN_BUCKETS
+)
+COMPLETION_TOKENS = registry.histogram(
+    "suggestion_completion_tokens",
+    "Tokens in the LLM completions",
+    buckets=DEFAULT_TOKEN_BUCKETS
+)
+# Time a batched LLM request spends waiting for its batch to be sent, and in
+# total from being submitted to its result, see app/services/batching.py
+BATCH_REQUEST_SECONDS = registry.histogram(
+    "suggestion_batch_request_seconds",
+    "Time per micro-batched LLM request, waiting for its batch and in total",
+    labelnames=("phase",)
+)
+GENERATIONS = registry.counter(
+    "suggestion_generations",
+    "Suggestion lists generated, cached or fallback ones included"
+)
+FALLBACKS = registry.counter(
+    "suggestion_fallbacks",
+    "Suggestion lists that fell back to keyword suggestions"
+)
+registry.gauge(
+    "suggestion_fallback_ratio",
+    "Share of generated suggestion lists that fell back to keyword suggestions",
+    lambda: ratio(FALLBACKS.value(), GENERATIONS.value())
+)
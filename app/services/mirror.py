@@ -0,0 +1,394 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import (
+    JSON, BigInteger, Column, Float, Index, MetaData, String, Table, create_engine, delete, func, select, update
+)
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.pool import StaticPool
+
+from app.services import log
+from app.services.records import MemoryRecord, parse_timestamp
+
+logger = log.get_logger(__name__)
+
+# Database the mirror is kept in, an in-memory SQLite database by default
+DEFAULT_MIRROR_URL = "sqlite://"
+
+# Seconds after which a user's mirrored memories are delta synced with mem0
+DEFAULT_SYNC_INTERVAL = 60.0
+
+# Seconds after which a user's mirrored memories are reloaded in full, dropping
+# the memories other clients deleted in mem0, which delta syncs never see
+DEFAULT_RELOAD_INTERVAL = 900.0
+
+# Seconds without reads after which a user's memories are dropped from the mirror
+DEFAULT_MAX_IDLE = 3600.0
+
+# Maximum number of users whose memories are mirrored, the least recently read go first
+DEFAULT_MAX_USERS = 10000
+
+metadata = MetaData()
+
+mirrored_users = Table(
+    "mirrored_users",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    # Latest updated_at seen in mem0, delta syncs ask for memories updated since
+    Column("watermark", String, nullable=True),
+    Column("checked_at", Float, nullable=False),
+    Column("written_at", Float, nullable=False, default=0.0),
+    Column("accessed_at", Float, nullable=False),
+    # When all of the user's memories were last listed, see MemoryMirror.load
+    Column("loaded_at", Float, nullable=False, default=0.0),
+)
+
+mirrored_memories = Table(
+    "mirrored_memories",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("memory_id", String, primary_key=True),
+    # Creation time in epoch microseconds, see app/services/records.py
+    Column("created", BigInteger, nullable=False),
+    Column("data", JSON, nullable=False),
+    Index("ix_mirrored_memories_recent", "user_id", "created"),
+)
+
+
+def create_mirror_engine(url: str = DEFAULT_MIRROR_URL) -> Engine:
+    """Create the engine for the mirror database, in-memory SQLite shares one connection."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return create_engine(
+            url,
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False}
+        )
+    return create_engine(url)
+
+
+@dataclass(frozen=True)
+class SyncState:
+    """Where a user's mirrored memories stand compared to mem0."""
+    watermark: Optional[str]
+    checked_at: float
+    written_at: float
+    accessed_at: float
+    loaded_at: float
+
+    def is_due(self, interval: float, now: float) -> bool:
+        """Whether the user needs a delta sync, after a write or once interval has passed."""
+        return self.written_at >= self.checked_at or now - self.checked_at >= interval
+
+    def needs_reload(self, interval: float, now: float) -> bool:
+        """Whether the user's next sync should reload all memories instead of a delta."""
+        return self.watermark is None or now - self.loaded_at >= interval
+
+
+class MemoryMirror:
+    """
+    Local copy of users' mem0 memories in SQLite.
+
+    The mirror only stores and reads memories, MemoryService fills it from
+    mem0 in the background after a user's first read, delta syncs it by
+    ``updated_at`` and writes through to it when memories are added. Delta
+    syncs can't see memories deleted by other clients, so every
+    reload_interval seconds a user is reloaded in full instead. Users that
+    are not read for max_idle seconds, or beyond the max_users most recently
+    read ones, are evicted and loaded again after their next read.
+
+    The methods block, MemoryService runs them in worker threads. They run
+    one at a time, an in-memory database shares a single connection.
+    """
+
+    def __init__(
+        self,
+        url: str = DEFAULT_MIRROR_URL,
+        sync_interval: float = DEFAULT_SYNC_INTERVAL,
+        reload_interval: float = DEFAULT_RELOAD_INTERVAL,
+        max_idle: float = DEFAULT_MAX_IDLE,
+        max_users: int = DEFAULT_MAX_USERS,
+        engine: Optional[Engine] = None
+    ):
+        self.engine = engine if engine is not None else create_mirror_engine(url)
+        self.sync_interval = sync_interval
+        self.reload_interval = reload_interval
+        self.max_idle = max_idle
+        self.max_users = max_users
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        metadata.create_all(self.engine)
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.sync_state(user_id) is not None
+
+    @property
+    def background_interval(self) -> float:
+        """
+        Seconds between background syncs, see MirrorSync.
+
+        Background syncs take users half way through sync_interval, see
+        users_due, so with a quarter of it between syncs users are synced
+        before reads find them due and sync them on the request path.
+        """
+        return self.sync_interval / 4
+
+    def __len__(self) -> int:
+        with self._connect() as connection:
+            return connection.execute(select(func.count()).select_from(mirrored_users)).scalar_one()
+
+    def sync_state(self, user_id: str) -> Optional[SyncState]:
+        """The user's sync state, None if the user is not mirrored."""
+        with self._connect() as connection:
+            row = connection.execute(
+                select(
+                    mirrored_users.c.watermark,
+                    mirrored_users.c.checked_at,
+                    mirrored_users.c.written_at,
+                    mirrored_users.c.accessed_at,
+                    mirrored_users.c.loaded_at
+                ).where(mirrored_users.c.user_id == user_id)
+            ).first()
+        return SyncState(*row) if row is not None else None
+
+    def read_state(self, user_id: str) -> Optional[SyncState]:
+        """The user's sync state for a read, counted as a hit if the user is mirrored, else a miss."""
+        state = self.sync_state(user_id)
+        if state is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return state
+
+    def load(self, user_id: str, memories: List[Dict[str, Any]], checked_at: Optional[float] = None) -> None:
+        """
+        Replace all of the user's mirrored memories, on their first read or a reload.
+
+        Args:
+            user_id: The ID of the user
+            memories: All of the user's memories, as listed by mem0
+            checked_at: When the memories were requested from mem0, now by default
+        """
+        checked_at = time.time() if checked_at is None else checked_at
+        with self._begin() as connection:
+            # A reload keeps the last read time, background reloads must not keep idle users from eviction
+            accessed_at = connection.execute(
+                select(mirrored_users.c.accessed_at).where(mirrored_users.c.user_id == user_id)
+            ).scalar_one_or_none()
+            connection.execute(delete(mirrored_memories).where(mirrored_memories.c.user_id == user_id))
+            connection.execute(delete(mirrored_users).where(mirrored_users.c.user_id == user_id))
+            connection.execute(mirrored_users.insert().values(
+                user_id=user_id,
+                watermark=_latest_update(memories),
+                checked_at=checked_at,
+                written_at=0.0,
+                accessed_at=time.time() if accessed_at is None else accessed_at,
+                loaded_at=checked_at
+            ))
+            self._upsert(connection, user_id, memories)
+
+    def merge(self, user_id: str, memories: List[Dict[str, Any]], checked_at: Optional[float] = None) -> None:
+        """
+        Merge memories updated in mem0 since the last sync into the mirror.
+
+        Args:
+            user_id: The ID of the user, who must be mirrored
+            memories: The memories mem0 lists as updated since the watermark
+            checked_at: When the memories were requested from mem0, now by default
+        """
+        checked_at = time.time() if checked_at is None else checked_at
+        with self._begin() as connection:
+            row = connection.execute(
+                select(mirrored_users.c.watermark).where(mirrored_users.c.user_id == user_id)
+            ).first()
+            if row is None:
+                # Evicted while the delta was being fetched
+                return
+            watermark = row.watermark
+            latest = _latest_update(memories)
+            if latest is not None and parse_timestamp(latest) > parse_timestamp(watermark):
+                watermark = latest
+            connection.execute(
+                update(mirrored_users)
+                .where(mirrored_users.c.user_id == user_id)
+                .values(watermark=watermark, checked_at=checked_at)
+            )
+            self._upsert(connection, user_id, memories)
+
+    def write(self, user_id: str, events: Iterable[Dict[str, Any]]) -> None:
+        """
+        Write the memory events returned by a mem0 add through to the mirror.
+
+        ADD and UPDATE events are stored right away, DELETE events remove the
+        memory. mem0 fills in timestamps and categories on its side, so the
+        user is also marked for a delta sync on the next read. Users that are
+        not mirrored are left alone, their next read loads everything.
+        """
+        now = time.time()
+        with self._begin() as connection:
+            written = connection.execute(
+                update(mirrored_users)
+                .where(mirrored_users.c.user_id == user_id)
+                .values(written_at=now)
+            ).rowcount
+            if not written:
+                return
+            stamp = datetime.fromtimestamp(now, timezone.utc).isoformat()
+            for event in events:
+                memory_id = event.get("id")
+                if not memory_id:
+                    continue
+                if event.get("event") == "DELETE":
+                    connection.execute(delete(mirrored_memories).where(
+                        (mirrored_memories.c.user_id == user_id) & (mirrored_memories.c.memory_id == memory_id)
+                    ))
+                    continue
+                existing = connection.execute(
+                    select(mirrored_memories.c.data).where(
+                        (mirrored_memories.c.user_id == user_id) & (mirrored_memories.c.memory_id == memory_id)
+                    )
+                ).scalar_one_or_none()
+                memory = dict(existing) if existing else {"id": memory_id, "created_at": stamp, "categories": []}
+                memory.update({"memory": event.get("memory", memory.get("memory")), "updated_at": stamp})
+                self._upsert(connection, user_id, [memory])
+
+    def recent(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        """The user's ``limit`` most recently created memories, newest first."""
+        with self._begin() as connection:
+            rows = connection.execute(
+                select(mirrored_memories.c.data)
+                .where(mirrored_memories.c.user_id == user_id)
+                .order_by(mirrored_memories.c.created.desc(), mirrored_memories.c.memory_id)
+                .limit(limit)
+            ).scalars().all()
+            connection.execute(
+                update(mirrored_users)
+                .where(mirrored_users.c.user_id == user_id)
+                .values(accessed_at=time.time())
+            )
+        return list(rows)
+
+    def users_due(self, now: Optional[float] = None) -> List[str]:
+        """The mirrored users the background sync should sync, half way through sync_interval."""
+        now = time.time() if now is None else now
+        with self._connect() as connection:
+            rows = connection.execute(
+                select(mirrored_users.c.user_id).where(
+                    (mirrored_users.c.written_at >= mirrored_users.c.checked_at)
+                    | (mirrored_users.c.checked_at <= now - self.sync_interval / 2)
+                )
+            ).scalars().all()
+        return list(rows)
+
+    def evict(self, user_id: str) -> None:
+        """Drop the user's memories from the mirror."""
+        with self._begin() as connection:
+            self._evict(connection, [user_id])
+
+    def evict_cold(self, now: Optional[float] = None) -> int:
+        """
+        Drop the users not read for max_idle seconds, and the least recently
+        read ones beyond max_users.
+
+        Returns:
+            int: Number of users evicted
+        """
+        now = time.time() if now is None else now
+        with self._begin() as connection:
+            cold = list(connection.execute(
+                select(mirrored_users.c.user_id).where(mirrored_users.c.accessed_at <= now - self.max_idle)
+            ).scalars())
+            cold += connection.execute(
+                select(mirrored_users.c.user_id)
+                .where(mirrored_users.c.accessed_at > now - self.max_idle)
+                .order_by(mirrored_users.c.accessed_at.desc())
+                .offset(self.max_users)
+            ).scalars().all()
+            self._evict(connection, cold)
+        return len(cold)
+
+    def clear(self) -> None:
+        with self._begin() as connection:
+            connection.execute(delete(mirrored_memories))
+            connection.execute(delete(mirrored_users))
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def _connect(self) -> Iterator[Connection]:
+        with self._lock, self.engine.connect() as connection:
+            yield connection
+
+    @contextmanager
+    def _begin(self) -> Iterator[Connection]:
+        with self._lock, self.engine.begin() as connection:
+            yield connection
+
+    @staticmethod
+    def _upsert(connection, user_id: str, memories: List[Dict[str, Any]]) -> None:
+        rows = {}
+        for memory in memories:
+            record = MemoryRecord.from_mem0(memory)
+            if record.id:
+                rows[record.id] = {
+                    "user_id": user_id,
+                    "memory_id": record.id,
+                    "created": record.created,
+                    "data": memory
+                }
+        if not rows:
+            return
+        connection.execute(delete(mirrored_memories).where(
+            (mirrored_memories.c.user_id == user_id) & mirrored_memories.c.memory_id.in_(list(rows))
+        ))
+        connection.execute(mirrored_memories.insert(), list(rows.values()))
+
+    @staticmethod
+    def _evict(connection, user_ids: List[str]) -> None:
+        if not user_ids:
+            return
+        connection.execute(delete(mirrored_memories).where(mirrored_memories.c.user_id.in_(user_ids)))
+        connection.execute(delete(mirrored_users).where(mirrored_users.c.user_id.in_(user_ids)))
+
+
+def _latest_update(memories: List[Dict[str, Any]]) -> Optional[str]:
+    stamps = [memory.get("updated_at") for memory in memories if memory.get("updated_at")]
+    return max(stamps, key=parse_timestamp) if stamps else None
+
+
+class MirrorSync:
+    """Runs a sync function every interval seconds, started and stopped with the FastAPI app lifespan."""
+
+    def __init__(self, sync: Callable[[], Awaitable[None]], interval: float = DEFAULT_SYNC_INTERVAL):
+        self.sync = sync
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning("Error syncing the memory mirror", error=str(e))
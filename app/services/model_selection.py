@@ -0,0 +1,186 @@
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.models import ModelType
+from app.services.catalogue import ModelRegistry, model_registry, normalize_model_name
+from app.services.keywords import KeywordMatcher
+
+# Keyword features, each term is matched as a word prefix on lowercased text
+FEATURES = {
+    "image": [
+        "image", "picture", "photo", "photos", "photograph", "photoreal", "draw", "illustrat", "logo",
+        "icon", "visual", "poster", "portrait", "render", "artwork", "painting", "svg", "vector",
+        "infographic", "wallpaper", "banner", "sketch", "mockup", "scene", "landscape", "panoram",
+        "graphic design",
+    ],
+    # Counts as image only next to other image features, alone it is as often an API or a strategy
+    "design": ["design"],
+    "code": [
+        "code", "coding", "program", "python", "javascript", "typescript", "java", "rust", "golang",
+        "c++", "sql", "script", "function", "algorithm", "debug", "refactor", "implement", "api",
+        "bug", "compile", "library", "framework", "database", "regex", "unit test", "depth-first",
+        "dfs", "backend", "frontend", "repository", "git",
+    ],
+    "creative": [
+        "story", "stories", "fiction", "poem", "poetry", "novel", "marketing", "advert", "copywrit",
+        "slogan", "blog", "creative", "screenplay", "lyrics", "fantasy", "narrative", "campaign",
+    ],
+    "trends": [
+        "news", "trend", "current event", "latest", "social media", "twitter", "tweet", "meme",
+        "viral", "headline", "buzz",
+    ],
+    "research": [
+        "research", "academic", "thesis", "paper", "literature review", "study", "survey",
+        "citation", "scientific", "journal",
+    ],
+    "quick": [
+        "weather", "quick", "recipe", "lunch", "dinner", "simple", "casual", "tip",
+    ],
+    "reasoning": [
+        "analy", "reasoning", "complex", "math", "proof", "pros and cons", "compare", "strategy",
+        "optimiz", "requirement",
+    ],
+    "vector": ["logo", "icon", "svg", "vector", "brand", "ui", "ux"],
+    "photoreal": ["photoreal", "realistic", "photo", "photos", "photograph"],
+    "high_res": ["high-resolution", "high resolution", "ultra", "print", "panoram", "4k", "8k"],
+    "multimodal": ["infographic", "interactive", "educational", "diagram", "explain", "storyboard"],
+}
+
+# Terms matched as whole words only, "photo" would otherwise match "photosynthesis"
+WHOLE_WORD_FEATURES = ["photo", "photos"]
+
+# Text features that pick the catalogue model tagged with them, most specific first
+TEXT_FEATURE_TAGS = ["trends", "research", "creative", "reasoning", "quick"]
+
+# Image features that pick the catalogue model tagged with them, most specific first
+IMAGE_FEATURE_TAGS = ["vector", "multimodal", "high_res", "photoreal"]
+
+# Words that turn a model name into an explicit request for that model
+REQUEST_CUES = r"(?:use|uses|using|prefer|prefers|preferred)"
+
+# Weaker cues, only a request for aliases that are not common words, "with GPT 4.1" but not "with Scout"
+WEAK_REQUEST_CUES = r"(?:with|via|through|ask|in)"
+
+# Aliases that are also common words, only asked for with REQUEST_CUES
+COMMON_WORD_ALIASES = ("flux", "gemini", "llama", "maverick", "scout")
+
+
+class ModelSelector:
+    """
+    Rule based model routing.
+
+    Assigns a ModelType and picks a model from the catalogue from keyword
+    features of the suggestion text, the user's model preferences and
+    explicit requests for a model.
+    """
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry if registry is not None else model_registry
+        self._feature_matcher = KeywordMatcher(FEATURES, whole_words=WHOLE_WORD_FEATURES)
+        aliases = "|".join(re.escape(alias) for alias in sorted(self.registry.aliases, key=len, reverse=True))
+        self._alias_pattern = re.compile(r"(?<![\w])(" + aliases + r")(?![\w])")
+        self._request_patterns = [
+            self._compile_request_pattern(REQUEST_CUES, aliases),
+            self._compile_request_pattern(WEAK_REQUEST_CUES, "|".join(
+                re.escape(alias) for alias in sorted(self.registry.aliases, key=len, reverse=True)
+                if alias not in COMMON_WORD_ALIASES
+            )),
+        ]
+
+    @staticmethod
+    def _compile_request_pattern(cues: str, aliases: str) -> re.Pattern:
+        return re.compile(r"(?<![\w])" + cues + r"\s+(?:the\s+|a\s+|model\s+)*(" + aliases + r")(?![\w])")
+
+    def features(self, text: str) -> Dict[str, int]:
+        """Count the keyword features in text."""
+        return self._feature_matcher.count(text)
+
+    def classify(self, features: Dict[str, int]) -> ModelType:
+        """Decide the model type from the keyword features, image only when its features outnumber code's."""
+        image = features.get("image", 0)
+        if image:
+            image += features.get("design", 0)
+        code = features.get("code", 0)
+        if image > code:
+            return ModelType.IMAGE
+        if code > 0:
+            return ModelType.CODE
+        return ModelType.TEXT
+
+    def requested_model(self, text: str) -> Optional[str]:
+        """The model the text explicitly asks for, e.g. "use Claude"."""
+        normalized = normalize_model_name(text)
+        matches = [match for match in (pattern.search(normalized) for pattern in self._request_patterns) if match]
+        if not matches:
+            return None
+        first = min(matches, key=lambda match: match.start())
+        return self.registry.resolve_alias(first.group(1)).id
+
+    def parse_preferences(self, preferences: Iterable[str]) -> Dict[ModelType, str]:
+        """
+        Turn ai_model_preferences memories into a preferred model per model type.
+
+        Preferences are expected newest first, and the newest preference for a
+        model type wins.
+        """
+        preferred: Dict[ModelType, str] = {}
+        for preference in preferences:
+            normalized = normalize_model_name(preference)
+            models = [self.registry.resolve_alias(alias) for alias in self._alias_pattern.findall(normalized)]
+            if not models:
+                continue
+            features = self.features(preference)
+            for model in models:
+                if ModelType.IMAGE in model.model_types:
+                    scopes = [ModelType.IMAGE]
+                elif features.get("code"):
+                    scopes = [ModelType.CODE]
+                elif features.get("creative") or "writ" in normalized or "text" in normalized:
+                    scopes = [ModelType.TEXT]
+                else:
+                    scopes = [ModelType.TEXT, ModelType.CODE]
+                for scope in scopes:
+                    preferred.setdefault(scope, model.id)
+        return preferred
+
+    def select(
+        self,
+        text: str,
+        preferences: Optional[Dict[ModelType, str]] = None
+    ) -> Tuple[ModelType, str]:
+        """
+        Pick the model type and model for a suggestion.
+
+        Args:
+            text: The suggestion text, plus the memory it is based on
+            preferences: The user's preferred model per model type
+
+        Returns:
+            Tuple[ModelType, str]: The model type and the selected model
+        """
+        features = self.features(text)
+        model_type = self.classify(features)
+
+        requested = self.requested_model(text)
+        if requested is not None:
+            if ModelType.IMAGE in self.registry.get(requested).model_types:
+                return ModelType.IMAGE, requested
+            if model_type == ModelType.IMAGE:
+                model_type = ModelType.TEXT
+            return model_type, requested
+
+        if preferences and model_type in preferences:
+            return model_type, preferences[model_type]
+
+        if model_type == ModelType.IMAGE:
+            feature_tags = IMAGE_FEATURE_TAGS
+        elif model_type == ModelType.TEXT:
+            feature_tags = TEXT_FEATURE_TAGS
+        else:
+            feature_tags = []
+        for feature in feature_tags:
+            if features.get(feature):
+                model = self.registry.model_for_tag(feature, model_type)
+                if model is not None:
+                    return model_type, model.id
+        return model_type, self.registry.default_model(model_type).id
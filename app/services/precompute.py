@@ -0,0 +1,174 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from app.models import Suggestion, SuggestionResult
+from app.services import log
+
+logger = log.get_logger(__name__)
+
+# Number of suggestions computed in the background for every user
+DEFAULT_NUM_SUGGESTIONS = 5
+
+# Age in seconds after which a precomputed list is refreshed on the next read
+DEFAULT_MAX_AGE = 600.0
+
+# Number of background generations running at the same time
+DEFAULT_CONCURRENCY = 4
+
+# Maximum number of users waiting for a refresh
+DEFAULT_QUEUE_SIZE = 1000
+
+# Maximum number of users whose precomputed suggestions are kept
+DEFAULT_MAX_USERS = 10000
+
+
+class SuggestionPrecomputer:
+    """
+    Precomputes suggestions in the background and serves them stale-while-revalidate.
+
+    Refreshes are queued per user and deduplicated, so a user is never queued
+    twice, and a fixed pool of workers bounds how many generations run at once.
+    The workers are started and stopped with the FastAPI app lifespan.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[str, int], Awaitable[SuggestionResult]],
+        num_suggestions: int = DEFAULT_NUM_SUGGESTIONS,
+        max_age: float = DEFAULT_MAX_AGE,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        max_users: int = DEFAULT_MAX_USERS
+    ):
+        self.compute = compute
+        self.num_suggestions = num_suggestions
+        self.max_age = max_age
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_users = max_users
+        self._results: "OrderedDict[str, Tuple[float, List[Suggestion]]]" = OrderedDict()
+        self._queued: Set[str] = set()
+        self._in_progress: Set[str] = set()
+        self._rerun: Set[str] = set()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        """Start the background workers."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the background workers and drop any queued refreshes."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._queue = None
+        self._queued.clear()
+        self._in_progress.clear()
+        self._rerun.clear()
+
+    def get(self, user_id: str, n: int) -> Optional[List[Suggestion]]:
+        """
+        Return the last computed suggestions for the user, if there are at least n.
+
+        A refresh is scheduled in the background when the stored list is older
+        than max_age, the stale list is still returned.
+        """
+        entry = self._results.get(user_id)
+        if entry is None:
+            return None
+        computed_at, suggestions = entry
+        if len(suggestions) < n:
+            return None
+        self._results.move_to_end(user_id)
+        if time.monotonic() - computed_at > self.max_age:
+            self.schedule(user_id)
+        return suggestions[:n]
+
+    def store(
+        self,
+        user_id: str,
+        suggestions: List[Suggestion],
+        is_fallback: bool = False,
+        keep_larger: bool = False
+    ) -> None:
+        """
+        Store freshly computed suggestions for the user.
+
+        Fallback suggestions are not stored, like SuggestionCache they would
+        otherwise be served instead of real ones until max_age. With
+        keep_larger, as for the results of requests, fewer suggestions than
+        are stored don't replace them, later requests for more would miss.
+        """
+        if is_fallback:
+            logger.debug("Not storing fallback suggestions", user_id=user_id)
+            return
+        if keep_larger:
+            entry = self._results.get(user_id)
+            if entry is not None and len(entry[1]) > len(suggestions):
+                return
+        self._results[user_id] = (time.monotonic(), suggestions)
+        self._results.move_to_end(user_id)
+        while len(self._results) > self.max_users:
+            self._results.popitem(last=False)
+
+    def schedule(self, user_id: str) -> bool:
+        """
+        Queue a background refresh for the user.
+
+        A user that is already queued is not queued again. If the user is being
+        refreshed right now, another refresh runs once the current one is done.
+
+        Returns:
+            bool: False if the workers are not running, the user is already
+            queued or the queue is full
+        """
+        if self._queue is None or user_id in self._queued:
+            return False
+        if user_id in self._in_progress:
+            self._rerun.add(user_id)
+            return True
+        try:
+            self._queue.put_nowait(user_id)
+        except asyncio.QueueFull:
+            return False
+        self._queued.add(user_id)
+        return True
+
+    def on_memory_added(self, user_id: str) -> None:
+        """Write listener for MemoryService, regenerates after new memories."""
+        self.schedule(user_id)
+
+    def clear(self) -> None:
+        self._results.clear()
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            user_id = await queue.get()
+            self._queued.discard(user_id)
+            self._in_progress.add(user_id)
+            try:
+                result = await self.compute(user_id, self.num_suggestions)
+                if result.suggestions:
+                    self.store(user_id, result.suggestions, is_fallback=result.is_fallback)
+            except Exception as e:
+                logger.warning("Error precomputing suggestions", user_id=user_id, error=str(e))
+            finally:
+                self._in_progress.discard(user_id)
+                queue.task_done()
+            if user_id in self._rerun:
+                self._rerun.discard(user_id)
+                self.schedule(user_id)
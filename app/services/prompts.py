@@ -0,0 +1,184 @@
+from functools import cached_property, lru_cache
+from typing import TYPE_CHECKING, List, Dict, Any, Sequence, Tuple, Union
+
+from app.services.records import MemoryRecord, as_records
+
+if TYPE_CHECKING:
+    # Imported when the first prompt is built, like langchain_openai in app/services/generator.py
+    from langchain_core.messages import BaseMessage, SystemMessage
+
+# The system prompt is static, so it is rendered once and sent as a stable
+# prefix that providers can cache. Everything that changes between requests
+# goes in the user message after it. Model types and models are picked
+# locally by ModelSelector, the LLM only writes the suggestions.
+
+_INSTRUCTIONS = """You are a suggestion generator that creates short, personalized, actionable suggestions for what the user could do next with an AI assistant, based on their conversation history and memories.
+
+Make every suggestion specific: say what kind of output it is about (code, an image, a story, an analysis, ...) and mention any AI model the user asked for, so the right model can be picked for it."""
+
+_SUGGESTION_FIELDS = """objects with EXACTLY these fields:
+- "title": a short, descriptive title
+- "description": a clear, actionable description
+- "memory": the number of the memory the suggestion is based on"""
+
+SYSTEM_PROMPT = _INSTRUCTIONS + """
+
+Respond with a JSON object with a "suggestions" field containing a list of """ + _SUGGESTION_FIELDS + """
+
+Example: {"suggestions": [{"title": "Optimize Graph Algorithm", "description": "Enhance the depth-first search implementation in Python with memoization", "memory": 1}]}"""
+
+# Several users' requests packed into one completion, see PromptBuilder.build_batch
+BATCH_SYSTEM_PROMPT = _INSTRUCTIONS + """
+
+You get several numbered requests, each for a different user. Handle every request on its own and never use the memories of one request for another.
+
+Respond with a JSON object with a "requests" field containing one object per request, with a "request" field holding the request number and a "suggestions" field containing a list of """ + _SUGGESTION_FIELDS + """
+
+Example: {"requests": [{"request": 1, "suggestions": [{"title": "Optimize Graph Algorithm", "description": "Enhance the depth-first search implementation in Python with memoization", "memory": 1}]}, {"request": 2, "suggestions": [{"title": "Design a Bakery Logo", "description": "Create a minimalist logo for your bakery", "memory": 2}]}]}"""
+
+USER_MESSAGE = """Generate exactly {num_suggestions} suggestions – no more, no fewer – each one grounded in the memories below, preferring the most recent and actionable ones and covering different topics.
+
+Messages:
+{messages}
+
+Memories:
+{memories}"""
+
+BATCH_REQUEST = """Request {number}:
+{request}"""
+
+
+def _count_tokens_estimate(text: str) -> int:
+    # Roughly four characters per token for English text
+    return (len(text) + 3) // 4
+
+
+@lru_cache(maxsize=1)
+def _get_encoder():
+    """
+    Load the tiktoken encoder once, None if tiktoken or its encoding is unavailable.
+
+    tiktoken downloads the encoding unless it is in its cache, so this must not
+    run on import. The app loads it while it starts, see PromptBuilder.load.
+    """
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens in text, estimated from its length if tiktoken is unavailable."""
+    encoder = _get_encoder()
+    if encoder is None:
+        return _count_tokens_estimate(text)
+    return len(encoder.encode(text))
+
+
+class Prompt:
+    """A rendered prompt and its token counts."""
+
+    __slots__ = ("messages", "system_tokens", "user_tokens")
+
+    def __init__(self, messages: List["BaseMessage"], system_tokens: int, user_tokens: int):
+        self.messages = messages
+        self.system_tokens = system_tokens
+        self.user_tokens = user_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        return self.system_tokens + self.user_tokens
+
+
+class PromptBuilder:
+    """
+    Assembles suggestion prompts.
+
+    The system message is rendered and token counted once, on first use or
+    by load, then reused as is for every request.
+    """
+
+    def load(self) -> None:
+        """Load the tokenizer and render the system messages ahead of the first request."""
+        for name in ("system_message", "system_tokens", "batch_system_message", "batch_system_tokens"):
+            getattr(self, name)
+
+    @cached_property
+    def system_message(self) -> "SystemMessage":
+        from langchain_core.messages import SystemMessage
+        return SystemMessage(content=SYSTEM_PROMPT)
+
+    @cached_property
+    def system_tokens(self) -> int:
+        return count_tokens(SYSTEM_PROMPT)
+
+    @cached_property
+    def batch_system_message(self) -> "SystemMessage":
+        from langchain_core.messages import SystemMessage
+        return SystemMessage(content=BATCH_SYSTEM_PROMPT)
+
+    @cached_property
+    def batch_system_tokens(self) -> int:
+        return count_tokens(BATCH_SYSTEM_PROMPT)
+
+    def build(
+        self,
+        memories: Sequence[Union[MemoryRecord, Dict[str, Any]]],
+        num_suggestions: int,
+        messages: str = ""
+    ) -> Prompt:
+        """
+        Build the prompt for a request.
+
+        Args:
+            memories: The memories to base the suggestions on, numbered from 1 in the prompt
+            num_suggestions: Number of suggestions to ask for
+            messages: Recent conversation, already formatted for the prompt
+
+        Returns:
+            Prompt: The messages to send to the LLM and their token counts
+        """
+        from langchain_core.messages import HumanMessage
+        user = self._render_request(memories, num_suggestions, messages)
+        return Prompt(
+            messages=[self.system_message, HumanMessage(content=user)],
+            system_tokens=self.system_tokens,
+            user_tokens=count_tokens(user)
+        )
+
+    def build_batch(self, requests: List[Tuple[Sequence[Union[MemoryRecord, Dict[str, Any]]], int, str]]) -> Prompt:
+        """
+        Build one prompt for the requests of several users.
+
+        Args:
+            requests: The memories, number of suggestions and formatted messages of each
+                request, numbered from 1 in the prompt
+
+        Returns:
+            Prompt: The messages to send to the LLM and their token counts
+        """
+        from langchain_core.messages import HumanMessage
+        user = "\n\n".join(
+            BATCH_REQUEST.format(number=number, request=self._render_request(*request))
+            for number, request in enumerate(requests, 1)
+        )
+        return Prompt(
+            messages=[self.batch_system_message, HumanMessage(content=user)],
+            system_tokens=self.batch_system_tokens,
+            user_tokens=count_tokens(user)
+        )
+
+    def _render_request(
+        self,
+        memories: Sequence[Union[MemoryRecord, Dict[str, Any]]],
+        num_suggestions: int,
+        messages: str
+    ) -> str:
+        return USER_MESSAGE.format(
+            num_suggestions=num_suggestions,
+            messages=messages,
+            memories="\n".join(
+                f"{number}. {record.memory}" for number, record in enumerate(as_records(memories), 1)
+            )
+        )
@@ -0,0 +1,123 @@
+import math
+import zlib
+from collections import Counter
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.services.keywords import tokenize
+
+# Width of the hashed term vectors. Hash collisions only blur the similarity
+# of the few memories ranked per request a little.
+DEFAULT_DIMENSIONS = 1024
+
+# Words that say nothing about what a memory is about
+STOP_WORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "of", "on", "or", "that", "the", "their", "they", "this", "to", "was", "with",
+    "user", "users", "s",
+})
+
+
+def _bucket(token: str, dimensions: int) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(token.encode()) % dimensions
+
+
+def embed(texts: Sequence[str], dimensions: int = DEFAULT_DIMENSIONS) -> np.ndarray:
+    """
+    Embed texts as hashed TF-IDF vectors.
+
+    Term frequencies are sublinear and document frequencies are taken from
+    the texts themselves, so terms every text shares weigh little.
+
+    Args:
+        texts: The texts to embed
+        dimensions: Width of the vectors
+
+    Returns:
+        np.ndarray: One L2-normalized float32 row per text, all zeros for texts without terms
+    """
+    rows, columns, weights = [], [], []
+    for row, text in enumerate(texts):
+        counts = Counter(token for token in tokenize(text) if token not in STOP_WORDS)
+        for token, count in counts.items():
+            rows.append(row)
+            columns.append(_bucket(token, dimensions))
+            weights.append(1.0 + math.log(count))
+
+    if not rows:
+        return np.zeros((len(texts), dimensions), dtype=np.float32)
+    cells = np.asarray(rows, dtype=np.int64) * dimensions + np.asarray(columns, dtype=np.int64)
+    vectors = np.bincount(cells, weights=weights, minlength=len(texts) * dimensions)
+    vectors = vectors.astype(np.float32).reshape(len(texts), dimensions)
+
+    document_frequency = np.count_nonzero(vectors, axis=0)
+    vectors *= (np.log((1 + len(texts)) / (1 + document_frequency)) + 1).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def cosine_similarities(vectors: np.ndarray) -> np.ndarray:
+    """Pairwise cosine similarities of L2-normalized row vectors."""
+    return vectors @ vectors.T
+
+
+def novelty(similarities: np.ndarray) -> np.ndarray:
+    """
+    How new each item is compared to the items after it.
+
+    For items ordered newest first this is one minus the similarity to the
+    closest older item, so a memory about a topic that comes up for the first
+    time scores 1 and a repeat of an older memory scores close to 0.
+    """
+    if len(similarities) == 0:
+        return np.zeros(0, dtype=np.float32)
+    older = np.triu(similarities, k=1)
+    return 1.0 - older.max(axis=1)
+
+
+def mmr(
+    relevance: np.ndarray,
+    similarities: np.ndarray,
+    k: int,
+    diversity: float,
+    groups: Optional[np.ndarray] = None,
+    group_penalty: float = 0.0
+) -> List[int]:
+    """
+    Maximal marginal relevance selection.
+
+    Greedily picks the item with the best relevance minus ``diversity`` times
+    its highest similarity to the items picked so far. Items can also be
+    penalized for every picked item they share a group with, e.g. a category.
+
+    Args:
+        relevance: Relevance score per item
+        similarities: Pairwise similarities of the items
+        k: Number of items to pick
+        diversity: Weight of the similarity to already picked items
+        groups: Optional 0/1 matrix with a row per item and a column per group
+        group_penalty: Penalty per picked item sharing a group
+
+    Returns:
+        List[int]: Indexes of the picked items, in the order they were picked, ties go to the lower index
+    """
+    count = len(relevance)
+    picked: List[int] = []
+    closest = np.zeros(count, dtype=np.float32)
+    covered = np.zeros(groups.shape[1], dtype=np.float32) if groups is not None else None
+    available = np.ones(count, dtype=bool)
+    for _ in range(min(k, count)):
+        scores = relevance - diversity * closest
+        if covered is not None:
+            scores = scores - group_penalty * (groups @ covered)
+        scores = np.where(available, scores, -np.inf)
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        np.maximum(closest, similarities[best], out=closest)
+        if covered is not None:
+            covered += groups[best]
+    return picked
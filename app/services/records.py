@@ -0,0 +1,125 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Timestamps are kept as integer microseconds since the epoch
+MICROSECONDS = 1_000_000
+
+
+def parse_timestamp(value: Optional[str]) -> int:
+    """
+    Parse a mem0 ISO timestamp into microseconds since the epoch.
+
+    Timestamps with different UTC offsets compare by the instant they denote,
+    naive ones are taken as UTC, and missing or unparsable ones are 0 so they
+    sort last when newest come first.
+    """
+    if not value:
+        return 0
+    if isinstance(value, str) and value[-1:] in ("Z", "z"):
+        # fromisoformat only accepts a trailing Z from Python 3.11
+        value = value[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return 0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    delta = parsed - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86400 + delta.seconds) * MICROSECONDS + delta.microseconds
+
+
+class MemoryRecord:
+    """
+    A mem0 memory normalized once, when it is fetched.
+
+    Timestamps are parsed into integers so memories can be ordered and
+    top-k selected without comparing strings. The memory as mem0 returned it
+    is kept in ``raw``. Records are what MemoryService returns and what the
+    selection, prompt and generation code works on. ``get`` and ``[]`` read
+    like the mem0 dict, for callers that still treat memories as dicts.
+    """
+
+    __slots__ = ("id", "memory", "categories", "created", "updated", "raw")
+
+    def __init__(
+        self,
+        id: Optional[str],
+        memory: str,
+        categories: Tuple[str, ...],
+        created: int,
+        updated: int,
+        raw: Dict[str, Any]
+    ):
+        self.id = id
+        self.memory = memory
+        self.categories = categories
+        self.created = created
+        self.updated = updated
+        self.raw = raw
+
+    @classmethod
+    def from_mem0(cls, memory: Dict[str, Any]) -> "MemoryRecord":
+        return cls(
+            id=memory.get("id"),
+            memory=memory.get("memory") or "",
+            categories=tuple(memory.get("categories") or ()),
+            created=parse_timestamp(memory.get("created_at")),
+            updated=parse_timestamp(memory.get("updated_at")),
+            raw=memory
+        )
+
+    def with_categories(self, categories: Sequence[str]) -> "MemoryRecord":
+        """A copy of the record filed under other categories."""
+        return MemoryRecord(self.id, self.memory, tuple(categories), self.created, self.updated, self.raw)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == "memory":
+            return self.memory
+        if key == "categories":
+            return list(self.categories)
+        return self.raw.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ("memory", "categories"):
+            return self.get(key)
+        return self.raw[key]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MemoryRecord):
+            return NotImplemented
+        return (
+            self.id == other.id and self.memory == other.memory and self.categories == other.categories
+            and self.created == other.created and self.updated == other.updated
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"MemoryRecord(id={self.id!r}, memory={self.memory!r}, categories={self.categories!r})"
+
+
+def as_records(memories: Iterable[Union[MemoryRecord, Dict[str, Any]]]) -> List[MemoryRecord]:
+    """Records for memories that may still be mem0 dicts, records are passed through."""
+    return [
+        memory if isinstance(memory, MemoryRecord) else MemoryRecord.from_mem0(memory)
+        for memory in memories
+    ]
+
+
+class MemoryBatch:
+    """
+    Columns of a list of records, for code that works on all of them at once.
+
+    ``texts`` and ``categories`` line up with ``records``, so vectorized
+    scoring (see app/services/ranking.py) never has to walk the records again.
+    """
+
+    __slots__ = ("records", "texts", "categories")
+
+    def __init__(self, records: List[MemoryRecord]):
+        self.records = records
+        self.texts = [record.memory for record in records]
+        self.categories = [record.categories for record in records]
+
+    def __len__(self) -> int:
+        return len(self.records)
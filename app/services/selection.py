@@ -0,0 +1,132 @@
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.services.ranking import embed, cosine_similarities, novelty, mmr
+from app.services.records import MemoryBatch, MemoryRecord, as_records
+
+# How many memories are given to the LLM per requested suggestion. A little
+# more than one so the model has some context to choose from.
+MEMORIES_PER_SUGGESTION = 2
+
+# Upper bound on the number of memories that ever go into a single prompt.
+MAX_SELECTED_MEMORIES = 40
+
+# Relative weight of each mem0 category when picking memories for suggestions.
+# Actionable categories (projects, goals, creative work) rank above background
+# facts about the user. Unknown categories get DEFAULT_CATEGORY_WEIGHT.
+CATEGORY_WEIGHTS = {
+    "working_projects": 1.0,
+    "milestones_and_goals": 0.9,
+    "image_generation_preferences": 0.8,
+    "technology_and_tools": 0.8,
+    "lifestyle_management_concerns": 0.6,
+    "entertainment": 0.5,
+    "health": 0.5,
+    "food": 0.5,
+    "music": 0.5,
+    "sports": 0.5,
+    "fashion": 0.5,
+    "family": 0.4,
+    "connections": 0.4,
+    "communicational_style": 0.3,
+    "personal_information": 0.3,
+}
+DEFAULT_CATEGORY_WEIGHT = 0.6
+
+# Score weights and the penalty applied for every already selected memory
+# that shares a category with a candidate.
+RECENCY_WEIGHT = 0.6
+CATEGORY_WEIGHT = 0.4
+DIVERSITY_PENALTY = 0.25
+
+# Weight of how new a memory's topic is compared to older memories, and of
+# its text similarity to the memories already selected (see ranking.mmr).
+NOVELTY_WEIGHT = 0.2
+SIMILARITY_PENALTY = 0.5
+
+# Memories in these categories describe how to pick models rather than what
+# to suggest, so they are always passed through and do not count towards k.
+PINNED_CATEGORIES = {"ai_model_preferences"}
+
+
+def memories_for_suggestions(n: int) -> int:
+    """Number of memories to put into the prompt when asking for ``n`` suggestions."""
+    return min(max(n, 1) * MEMORIES_PER_SUGGESTION, MAX_SELECTED_MEMORIES)
+
+
+def _category_score(categories: Tuple[str, ...]) -> float:
+    if not categories:
+        return DEFAULT_CATEGORY_WEIGHT
+    return max(CATEGORY_WEIGHTS.get(category, DEFAULT_CATEGORY_WEIGHT) for category in categories)
+
+
+def _rank(batch: MemoryBatch, k: int, vectors: Optional[np.ndarray] = None) -> List[int]:
+    """Indexes into the batch of the k memories to keep."""
+    total = len(batch)
+    similarities = cosine_similarities(embed(batch.texts) if vectors is None else vectors)
+
+    recency = 1.0 - np.arange(total, dtype=np.float32) / total
+    category = np.array([_category_score(categories) for categories in batch.categories], dtype=np.float32)
+    relevance = RECENCY_WEIGHT * recency + CATEGORY_WEIGHT * category + NOVELTY_WEIGHT * novelty(similarities)
+
+    # Which categories each candidate is in, for the category coverage penalty
+    columns: Dict[str, int] = {}
+    for categories in batch.categories:
+        for name in categories:
+            columns.setdefault(name, len(columns))
+    groups = np.zeros((total, len(columns)), dtype=np.float32)
+    for index, categories in enumerate(batch.categories):
+        for name in categories:
+            groups[index, columns[name]] = 1.0
+
+    return mmr(relevance, similarities, k, SIMILARITY_PENALTY, groups, DIVERSITY_PENALTY)
+
+
+def select_memories(
+    memories: Sequence[Union[MemoryRecord, Dict[str, Any]]],
+    n: int,
+    k: Optional[int] = None,
+    vectors: Optional[np.ndarray] = None
+) -> List[Union[MemoryRecord, Dict[str, Any]]]:
+    """
+    Pick the memories worth prompting with for ``n`` suggestions.
+
+    ``memories`` are expected newest first, as returned by
+    ``MemoryService.get_recent_conversations``. Each memory is scored by
+    recency (its position in the list), category weight and how new its topic
+    is compared to older memories. Memories are then picked by maximal
+    marginal relevance on hashed TF-IDF vectors of their text, with a penalty
+    for categories that are already covered, so the result stays diverse.
+    Model preference memories are always kept.
+
+    Args:
+        memories: Memory records, or raw mem0 memories, newest first
+        n: Number of suggestions that will be requested
+        k: Number of memories to select, defaults to ``memories_for_suggestions(n)``
+        vectors: Hashed TF-IDF vectors of the memories, one row per memory, when the
+            caller already has them, see dedup.collapse_embedded_near_duplicates
+
+    Returns:
+        List: The selected memories as given, in their original order
+    """
+    if k is None:
+        k = memories_for_suggestions(n)
+
+    pinned = []
+    candidates = []
+    candidate_records = []
+    for position, record in enumerate(as_records(memories)):
+        if not record.memory:
+            continue
+        if PINNED_CATEGORIES.intersection(record.categories):
+            pinned.append(position)
+        else:
+            candidates.append(position)
+            candidate_records.append(record)
+
+    if len(candidates) > k:
+        candidate_vectors = vectors[candidates] if vectors is not None else None
+        candidates = [candidates[index] for index in _rank(MemoryBatch(candidate_records), k, candidate_vectors)]
+
+    return [memories[position] for position in sorted(pinned + candidates)]
@@ -0,0 +1,72 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("task", "size")
+
+    def __init__(self, task: asyncio.Task, size: int):
+        self.task = task
+        self.size = size
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight call.
+
+    The first caller for a key starts the call, callers arriving while it is
+    still running wait for its result instead of starting their own. A call
+    can be given a size, e.g. the number of suggestions it generates, and is
+    then only joined by callers that need at most that many; callers needing
+    more start a call of their own. Callers slice the shared result to what
+    they need and must not modify it.
+
+    The call runs as a task of its own, so a caller going away (e.g. a client
+    disconnecting) doesn't cancel it for the others. Errors are raised to
+    every caller waiting for the call.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, List[_Flight]] = {}
+        self.calls = 0
+        self.joins = 0
+
+    def in_flight(self, key: Hashable) -> int:
+        """Number of calls running for the key."""
+        return len(self._flights.get(key, ()))
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], size: int = 0) -> T:
+        """
+        Run fn, or wait for the result of a compatible call already running for key.
+
+        Args:
+            key: What the call is for, e.g. the user_id
+            fn: Starts the call, only called if there is no compatible call running
+            size: Size of the result the caller needs, calls of at least this size are joined
+
+        Returns:
+            The result of the call
+        """
+        for flight in self._flights.get(key, ()):
+            if flight.size >= size:
+                self.joins += 1
+                return await asyncio.shield(flight.task)
+
+        self.calls += 1
+        flight = _Flight(asyncio.ensure_future(fn()), size)
+        self._flights.setdefault(key, []).append(flight)
+        flight.task.add_done_callback(lambda task: self._land(key, flight))
+        return await asyncio.shield(flight.task)
+
+    def _land(self, key: Hashable, flight: _Flight) -> None:
+        flights = self._flights.get(key)
+        if flights is None:
+            return
+        flights.remove(flight)
+        if not flights:
+            del self._flights[key]
+        # Retrieve the error so a call nobody waits for anymore is not reported as unhandled
+        if not flight.task.cancelled():
+            flight.task.exception()
@@ -0,0 +1,93 @@
+import json
+from typing import List, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+from app.models import Suggestion
+
+
+class SuggestionStreamParser:
+    """
+    Incremental parser for a streamed ``{"suggestions": [...]}`` JSON document.
+
+    Text is fed in as it arrives from the LLM, and every suggestion object is
+    returned as soon as its closing brace has been seen, without waiting for
+    the rest of the document. Anything before the opening brace of the
+    document, such as a Markdown code fence, is ignored.
+
+    Args:
+        item_model: The pydantic model each suggestion object is validated as
+    """
+
+    def __init__(self, item_model: Type[BaseModel] = Suggestion):
+        self.item_model = item_model
+        self._buffer = ""
+        # Position in the buffer up to which the text has been scanned
+        self._position = 0
+        # Nesting depth of objects and arrays, 1 inside the top-level object
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        # Depth of the suggestions array once its opening bracket was seen
+        self._array_depth = None
+        # Buffer offset of the suggestion object currently being read
+        self._object_start = None
+        self.errors = 0
+
+    def feed(self, text: str) -> List[BaseModel]:
+        """
+        Feed the next chunk of streamed text.
+
+        Returns:
+            List[BaseModel]: The suggestions completed by this chunk
+        """
+        self._buffer += text
+        completed = []
+        buffer = self._buffer
+        position = self._position
+        while position < len(buffer):
+            char = buffer[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if char == "[" and self._array_depth is None and self._depth == 2:
+                    self._array_depth = self._depth
+                elif char == "{" and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._object_start = position
+            elif char in "}]":
+                if self._depth > 0:
+                    if (
+                        char == "}"
+                        and self._object_start is not None
+                        and self._depth == self._array_depth + 1
+                    ):
+                        suggestion = self._parse(buffer[self._object_start:position + 1])
+                        if suggestion is not None:
+                            completed.append(suggestion)
+                        self._object_start = None
+                    self._depth -= 1
+            position += 1
+
+        # Only keep the text of the object that is still being read
+        keep_from = self._object_start if self._object_start is not None else position
+        self._buffer = buffer[keep_from:]
+        self._position = position - keep_from
+        if self._object_start is not None:
+            self._object_start = 0
+        return completed
+
+    def _parse(self, text: str) -> Optional[BaseModel]:
+        try:
+            return self.item_model.model_validate(json.loads(text))
+        except (ValueError, ValidationError):
+            self.errors += 1
+            return None
@@ -0,0 +1,339 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+# Synthetic memories per category, {topic}, {language} and {model} are filled in
+MEMORY_TEMPLATES = {
+    "working_projects": [
+        "Working on a {topic} service written in {language}",
+        "Fixing a memory leak in the {topic} pipeline",
+        "Migrating the {topic} backend from {language} to Rust",
+        "Writing integration tests for the {topic} API",
+    ],
+    "lifestyle_management_concerns": [
+        "Cooking {topic} recipes on weekends",
+        "Trying to keep a morning routine before work",
+        "Learning to play {topic} on the guitar",
+    ],
+    "milestones_and_goals": [
+        "Wants to ship the {topic} beta by the end of the quarter",
+        "Goal: run a half marathon this year",
+        "Wants to get better at {language}",
+    ],
+    "ai_model_preferences": [
+        "Prefers {model} for writing code",
+        "Likes images generated with {model}",
+    ],
+}
+
+TOPICS = ["search", "billing", "recommendation", "chat", "analytics", "jazz", "sourdough", "ramen", "graph", "payments"]
+LANGUAGES = ["Python", "Go", "TypeScript", "Java", "Kotlin"]
+MODELS = ["Claude", "GPT-4", "DALL-E", "Midjourney", "Stable Diffusion"]
+
+# Timestamp of the newest synthetic memory, older ones are an hour apart
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+Response = Tuple[int, Union[Dict[str, Any], Iterator[str]]]
+
+
+class FakeMem0:
+    """
+    Fake mem0 API with synthetic users.
+
+    Every user, the synthetic ones in user_ids or any other that is asked
+    for, gets a number of memories between min_memories and max_memories,
+    drawn log-uniformly so most users have a short history and a few have a
+    very long one. Memories are generated on a user's first read and are the
+    same for the same seed and user ID. Both the v2 and v3 list endpoints are
+    served, so it works with old and new mem0 clients.
+
+    Args:
+        users: Number of synthetic users in user_ids
+        min_memories: Fewest memories a user has
+        max_memories: Most memories a user has
+        latency: Seconds every request takes
+        seed: Seed of the synthetic data
+    """
+
+    def __init__(
+        self,
+        users: int = 100,
+        min_memories: int = 10,
+        max_memories: int = 10000,
+        latency: float = 0.02,
+        seed: int = 0
+    ):
+        self.min_memories = min_memories
+        self.max_memories = max_memories
+        self.latency = latency
+        self.seed = seed
+        self.requests = 0
+        self.categories: List[Dict[str, str]] = []
+        self.user_ids = [f"bench-user-{i}" for i in range(users)]
+        self._memories: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def memories(self, user_id: str) -> List[Dict[str, Any]]:
+        """The user's memories, newest first, generated on first use."""
+        with self._lock:
+            memories = self._memories.get(user_id)
+            if memories is None:
+                memories = self._memories[user_id] = self._generate(user_id)
+            return memories
+
+    def _generate(self, user_id: str) -> List[Dict[str, Any]]:
+        rng = random.Random(f"{self.seed}:{user_id}")
+        count = round(math.exp(rng.uniform(math.log(self.min_memories), math.log(self.max_memories))))
+        memories = []
+        for i in range(count):
+            category = rng.choice(list(MEMORY_TEMPLATES))
+            text = rng.choice(MEMORY_TEMPLATES[category]).format(
+                topic=rng.choice(TOPICS),
+                language=rng.choice(LANGUAGES),
+                model=rng.choice(MODELS)
+            )
+            stamp = (EPOCH - timedelta(hours=i)).isoformat()
+            memories.append({
+                "id": f"{user_id}-{i}",
+                "user_id": user_id,
+                "memory": text,
+                "categories": [category],
+                "created_at": stamp,
+                "updated_at": stamp,
+            })
+        return memories
+
+    def _matches(self, memory: Dict[str, Any], condition: Dict[str, Any]) -> bool:
+        for key, value in condition.items():
+            if key == "AND":
+                if not all(self._matches(memory, c) for c in value):
+                    return False
+            elif key == "OR":
+                if not any(self._matches(memory, c) for c in value):
+                    return False
+            elif key == "categories":
+                wanted = value.get("contains") or value.get("in") if isinstance(value, dict) else value
+                wanted = [wanted] if isinstance(wanted, str) else wanted
+                if not set(wanted) & set(memory["categories"]):
+                    return False
+            elif isinstance(value, dict):
+                if "gte" in value and memory.get(key, "") < value["gte"]:
+                    return False
+            elif memory.get(key) != value:
+                return False
+        return True
+
+    def _user_of(self, filters: Dict[str, Any]) -> Optional[str]:
+        if "user_id" in filters:
+            return filters["user_id"]
+        for condition in filters.get("AND", []):
+            user_id = self._user_of(condition)
+            if user_id is not None:
+                return user_id
+        return None
+
+    def list(self, filters: Dict[str, Any], page: int = 1, page_size: int = 100) -> Dict[str, Any]:
+        """A page of the memories matching v2 filters, newest first."""
+        user_id = self._user_of(filters)
+        found = self.memories(user_id) if user_id else []
+        # Plain user reads are the common case, only other filters need a scan
+        if any(set(condition) != {"user_id"} for condition in filters.get("AND", [filters])):
+            found = [m for m in found if self._matches(m, filters)]
+        start = (page - 1) * page_size
+        return {
+            "count": len(found),
+            "next": f"?page={page + 1}" if start + page_size < len(found) else None,
+            "previous": f"?page={page - 1}" if page > 1 else None,
+            "results": found[start:start + page_size],
+        }
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Dict[str, Any]) -> Response:
+        self.requests += 1
+        time.sleep(self.latency)
+        if path.startswith("/v1/ping"):
+            return 200, {"status": "ok", "org_id": "bench-org", "project_id": "bench-project", "user_email": "bench@example.com"}
+        if method == "POST" and re.fullmatch(r"/v[23]/memories/?", path):
+            return 200, self.list(
+                body.get("filters") or {},
+                page=int(query.get("page", body.get("page", 1))),
+                page_size=int(query.get("page_size", body.get("page_size", 100)))
+            )
+        if "/projects/" in path:
+            if method == "GET":
+                return 200, {"custom_categories": self.categories}
+            self.categories = body.get("custom_categories", self.categories)
+            return 200, {"message": "Updated custom categories"}
+        return 404, {"detail": f"Not found: {method} {path}"}
+
+
+class FakeLLM:
+    """
+    Fake OpenAI-compatible chat completions endpoint.
+
+    It answers the app's prompts with as many suggestions as each request asks
+    for, each based on one of the numbered memories, in the single or batched
+    JSON format. A completion takes ttft seconds plus token_latency seconds
+    per completion token, streamed completions send their tokens as they go.
+
+    Args:
+        ttft: Seconds before the first token
+        token_latency: Seconds per completion token
+    """
+
+    def __init__(self, ttft: float = 0.2, token_latency: float = 0.01):
+        self.ttft = ttft
+        self.token_latency = token_latency
+        self.requests = 0
+        self.completion_tokens = 0
+
+    @staticmethod
+    def _text(message: Dict[str, Any]) -> str:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return content
+
+    @staticmethod
+    def _drafts(request: str) -> List[Dict[str, Any]]:
+        wanted = re.search(r"Generate exactly (\d+) suggestions", request)
+        memories = re.findall(r"^(\d+)\. (.+)$", request.split("Memories:", 1)[-1], re.MULTILINE)
+        drafts = []
+        for i in range(int(wanted.group(1)) if wanted else 3):
+            number, text = memories[i % len(memories)] if memories else (None, "your recent work")
+            drafts.append({
+                "title": "Follow up: " + " ".join(text.split()[:4]),
+                "description": f"Ask the assistant to help with this next: {text}",
+                "memory": int(number) if number else None,
+            })
+        return drafts
+
+    def complete(self, messages: List[Dict[str, Any]]) -> str:
+        system = self._text(messages[0]) if messages else ""
+        user = self._text(messages[-1]) if messages else ""
+        if '"requests" field' in system:
+            parts = re.split(r"^Request (\d+):$", user, flags=re.MULTILINE)[1:]
+            return json.dumps({"requests": [
+                {"request": int(number), "suggestions": self._drafts(request)}
+                for number, request in zip(parts[::2], parts[1::2])
+            ]})
+        return json.dumps({"suggestions": self._drafts(user)})
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: Dict[str, Any]) -> Response:
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": f"Not found: {method} {path}"}}
+        self.requests += 1
+        messages = body.get("messages", [])
+        content = self.complete(messages)
+        # Roughly four characters per token, like the app's own estimate
+        tokens = [content[i:i + 4] for i in range(0, len(content), 4)]
+        prompt_tokens = sum(len(self._text(m)) for m in messages) // 4
+        self.completion_tokens += len(tokens)
+        model = body.get("model", "fake")
+        if body.get("stream"):
+            return 200, self._stream(model, tokens)
+        time.sleep(self.ttft + self.token_latency * len(tokens))
+        return 200, {
+            "id": f"chatcmpl-bench-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            },
+        }
+
+    def _stream(self, model: str, tokens: List[str]) -> Iterator[str]:
+        time.sleep(self.ttft)
+        for token in tokens:
+            time.sleep(self.token_latency)
+            yield self._chunk(model, {"content": token}, None)
+        yield self._chunk(model, {}, "stop")
+        yield "data: [DONE]\n\n"
+
+    def _chunk(self, model: str, delta: Dict[str, Any], finish_reason: Optional[str]) -> str:
+        chunk = {
+            "id": f"chatcmpl-bench-{self.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for the connections a high concurrency run opens at once
+    request_queue_size = 256
+
+
+def _handler(backend: Union[FakeMem0, FakeLLM]) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so clients reuse their pooled connections like they would in production
+        protocol_version = "HTTP/1.1"
+
+        def _dispatch(self) -> None:
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            body = json.loads(raw) if raw else {}
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            status, payload = backend.handle(self.command, url.path, query, body)
+            self.send_response(status)
+            if isinstance(payload, dict):
+                data = json.dumps(payload).encode()
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for event in payload:
+                data = event.encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+class FakeServer:
+    """Serves a fake backend over HTTP from a background thread, on a free local port."""
+
+    def __init__(self, backend: Union[FakeMem0, FakeLLM]):
+        self.backend = backend
+        self._server = _Server(("127.0.0.1", 0), _handler(backend))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
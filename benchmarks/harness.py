@@ -0,0 +1,82 @@
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from benchmarks.fakes import FakeLLM, FakeMem0, FakeServer
+
+
+class FakeBackends:
+    """
+    Fake mem0 and LLM servers, and the environment that points the app at them.
+
+    The environment is set on start, so the app must be imported afterwards,
+    see app_client, and restored on stop. Real API keys are replaced so they
+    never reach the fakes. Other app settings for the run go in env.
+
+        with FakeBackends(FakeMem0(users=50), FakeLLM(ttft=0.1), env={"LOG_LEVEL": "WARNING"}) as backends:
+            async with app_client() as client:
+                ...
+    """
+
+    def __init__(
+        self,
+        mem0: Optional[FakeMem0] = None,
+        llm: Optional[FakeLLM] = None,
+        env: Optional[Dict[str, str]] = None
+    ):
+        self.mem0 = mem0 or FakeMem0()
+        self.llm = llm or FakeLLM()
+        self.env = dict(env or {})
+        self._servers = [FakeServer(self.mem0), FakeServer(self.llm)]
+        # Values the environment had before start, None for unset variables
+        self._saved: Dict[str, Optional[str]] = {}
+
+    def environ(self) -> Dict[str, str]:
+        mem0_server, llm_server = self._servers
+        return {
+            "MEM0_HOST": mem0_server.url,
+            "MEM0_API_KEY": "benchmark",
+            "MEM0_TELEMETRY": "false",
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_BASE_URL": f"{llm_server.url}/v1",
+            "OPENAI_API_BASE": f"{llm_server.url}/v1",
+            **self.env,
+        }
+
+    def start(self) -> None:
+        for server in self._servers:
+            server.start()
+        environ = self.environ()
+        self._saved = {name: os.environ.get(name) for name in environ}
+        os.environ.update(environ)
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.stop()
+        for name, value in self._saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        self._saved = {}
+
+    def __enter__(self) -> "FakeBackends":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+@asynccontextmanager
+async def app_client() -> AsyncIterator[httpx.AsyncClient]:
+    """The app, with its lifespan running, behind an in-process HTTP client."""
+    # Imported here, the app is set up from the environment when it is imported
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=None) as client:
+            yield client
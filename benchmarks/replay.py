@@ -0,0 +1,283 @@
+import argparse
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.services.records import MICROSECONDS, parse_timestamp
+from benchmarks.fakes import FakeLLM, FakeMem0
+from benchmarks.harness import FakeBackends, app_client
+from benchmarks.report import (
+    counter_delta,
+    format_histogram,
+    format_stages,
+    histogram,
+    parse_metrics,
+    stage_breakdown,
+    summarize,
+)
+
+# Suggestions asked for by recorded requests that don't say
+DEFAULT_N = 3
+
+
+@dataclass(frozen=True)
+class RecordedRequest:
+    """A request to replay, offset seconds after the first one of the log."""
+
+    offset: float
+    user_id: str
+    n: int
+    stream: bool = False
+
+
+def _epoch_seconds(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and parse_timestamp(value):
+        return parse_timestamp(value) / MICROSECONDS
+    return None
+
+
+def _seconds(entry: Dict[str, Any]) -> Optional[float]:
+    """When a recorded request was made, in seconds, from its offset, received, timestamp or time field."""
+    if entry.get("offset") is not None:
+        return float(entry["offset"])
+    for key in ("received", "timestamp"):
+        seconds = _epoch_seconds(entry.get(key))
+        if seconds is not None:
+            return seconds
+    # A log line's time is when it was written, for "Handled request" lines when the request was answered
+    seconds = _epoch_seconds(entry.get("time"))
+    if seconds is not None and isinstance(entry.get("duration_ms"), (int, float)):
+        seconds -= entry["duration_ms"] / 1000
+    return seconds
+
+
+def load_requests(path: str) -> Tuple[List[RecordedRequest], int]:
+    """
+    Read the suggestion requests of a JSON lines log.
+
+    Every line with a ``user_id`` is a request, with ``n`` suggestions and a
+    time from ``offset`` (seconds), ``received`` or ``timestamp`` (epoch
+    seconds or ISO) or ``time`` (ISO, less ``duration_ms`` if there is one).
+    The app's own "Handled request" log lines have all of them, lines with a
+    ``path`` are only replayed for the suggestion endpoints, ``/stream`` ones
+    streamed. A line without a time is sent together with the line before it.
+
+    Returns:
+        Tuple[List[RecordedRequest], int]: The requests in the order they
+            were made, and the number of lines that were skipped
+    """
+    entries = []
+    skipped = 0
+    with open(path) as lines:
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            if not isinstance(entry, dict) or not entry.get("user_id"):
+                skipped += 1
+                continue
+            route = entry.get("path") or "/api/v1/suggestions"
+            if "/suggestions" not in route:
+                skipped += 1
+                continue
+            entries.append((_seconds(entry), entry, route))
+
+    requests = []
+    start = next((seconds for seconds, _, _ in entries if seconds is not None), 0.0)
+    offset = 0.0
+    for seconds, entry, route in entries:
+        if seconds is not None:
+            offset = seconds - start
+        requests.append(RecordedRequest(
+            offset=offset,
+            user_id=str(entry["user_id"]),
+            n=int(entry.get("n") or DEFAULT_N),
+            stream=bool(entry.get("stream")) or route.endswith("/stream")
+        ))
+    requests.sort(key=lambda request: request.offset)
+    return requests, skipped
+
+
+async def _send(client: httpx.AsyncClient, request: RecordedRequest) -> Optional[str]:
+    """Send a request, None if it succeeded, else what went wrong."""
+    params = {"user_id": request.user_id, "n": request.n}
+    try:
+        if not request.stream:
+            response = await client.get("/api/v1/suggestions", params=params)
+            return None if response.status_code == 200 else str(response.status_code)
+        async with client.stream("GET", "/api/v1/suggestions/stream", params=params) as response:
+            if response.status_code != 200:
+                return str(response.status_code)
+            async for line in response.aiter_lines():
+                # Errors after the stream started are sent as a {"detail": ...} line
+                if line.startswith('{"detail"'):
+                    return "stream error"
+        return None
+    except Exception as e:
+        return type(e).__name__
+
+
+async def replay(client: httpx.AsyncClient, requests: List[RecordedRequest], speed: float) -> Dict[str, Any]:
+    """
+    Send the requests on the recorded schedule, sped up by speed.
+
+    The schedule is kept no matter how slow the app answers, every request
+    is sent at its time without waiting for the ones before it.
+
+    Returns:
+        Dict[str, Any]: Latencies and how late every request was sent, in
+            seconds, the errors and the elapsed time
+    """
+    latencies: List[float] = []
+    lags: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def send(request: RecordedRequest, due: float) -> None:
+        started = time.perf_counter()
+        lags.append(started - due)
+        error = await _send(client, request)
+        latencies.append(time.perf_counter() - started)
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+
+    start = time.perf_counter()
+    tasks = []
+    for request in requests:
+        due = start + request.offset / speed
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(request, due)))
+    await asyncio.gather(*tasks)
+    return {"latencies": latencies, "lags": lags, "errors": errors, "elapsed": time.perf_counter() - start}
+
+
+async def _metrics(client: httpx.AsyncClient) -> Optional[Dict]:
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    return parse_metrics(response.text) if response.status_code == 200 else None
+
+
+@asynccontextmanager
+async def _target(args: argparse.Namespace) -> AsyncIterator[httpx.AsyncClient]:
+    if args.url:
+        # No connection limit, a limit would queue requests in the client and hide the app's latency
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+            yield client
+        return
+    mem0 = FakeMem0(
+        users=0,
+        min_memories=args.min_memories,
+        max_memories=args.max_memories,
+        latency=args.mem0_latency,
+        seed=args.seed
+    )
+    llm = FakeLLM(ttft=args.ttft, token_latency=args.token_latency)
+    with FakeBackends(mem0, llm, env={"LOG_LEVEL": args.log_level}):
+        async with app_client() as client:
+            yield client
+
+
+async def run(args: argparse.Namespace, requests: List[RecordedRequest]) -> Dict[str, Any]:
+    async with _target(args) as client:
+        before = await _metrics(client)
+        result = await replay(client, requests, args.speed)
+        after = await _metrics(client)
+
+    fallback_rate = None
+    stages = {}
+    if before is not None and after is not None:
+        generations = counter_delta(before, after, "suggestion_generations")
+        fallback_rate = counter_delta(before, after, "suggestion_fallbacks") / generations if generations else 0.0
+        stages = stage_breakdown(before, after)
+    duration = requests[-1].offset / args.speed if requests else 0.0
+    return {
+        "requests": len(requests),
+        "speed": args.speed,
+        "elapsed_s": result["elapsed"],
+        "offered_rps": len(requests) / duration if duration else None,
+        "throughput_rps": len(requests) / result["elapsed"] if result["elapsed"] else 0.0,
+        "latency": summarize(result["latencies"]),
+        "histogram": histogram(result["latencies"]),
+        "send_lag": summarize(result["lags"]),
+        "errors": result["errors"],
+        "error_rate": sum(result["errors"].values()) / len(requests) if requests else 0.0,
+        "fallback_rate": fallback_rate,
+        "stages": stages,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    latency = report["latency"]
+    offered = f"{report['offered_rps']:.1f}" if report["offered_rps"] else "all at once"
+    print(
+        f"Replayed {report['requests']} requests at {report['speed']:g}x speed in {report['elapsed_s']:.2f}s, "
+        f"offered {offered} requests/s, throughput {report['throughput_rps']:.1f} requests/s"
+    )
+    print(
+        f"Latency     p50 {latency['p50_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms, "
+        f"p99 {latency['p99_ms']:.1f} ms, max {latency['max_ms']:.1f} ms"
+    )
+    for line in format_histogram(report["histogram"]):
+        print(line)
+    errors = ", ".join(f"{count} x {error}" for error, count in report["errors"].items()) or "none"
+    print(f"Errors      {100 * report['error_rate']:.1f}% ({errors})")
+    fallback_rate = report["fallback_rate"]
+    print(f"Fallbacks   {f'{100 * fallback_rate:.1f}%' if fallback_rate is not None else 'unknown, /metrics is not reachable'}")
+    # Requests sent late mean the replayer, not the app, could not keep up with the schedule
+    print(f"Send lag    p99 {report['send_lag']['p99_ms']:.1f} ms")
+    if report["stages"]:
+        print("Stages")
+        for line in format_stages(report["stages"]):
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded suggestion requests against the app.")
+    parser.add_argument("log", help="JSON lines log of the requests, e.g. the app's own logs")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay this many times faster than recorded")
+    parser.add_argument("--limit", type=int, help="Only replay the first requests")
+    parser.add_argument("--url", help="App to replay against, by default the app runs in-process with fake backends")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for a response from --url")
+    parser.add_argument("--min-memories", type=int, default=10, help="Fewest memories a fake mem0 user has")
+    parser.add_argument("--max-memories", type=int, default=10000, help="Most memories a fake mem0 user has")
+    parser.add_argument("--mem0-latency", type=float, default=0.02, help="Seconds per fake mem0 request")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds before the fake LLM's first token")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Seconds per fake LLM completion token")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the fake mem0 users")
+    parser.add_argument("--log-level", default="WARNING", help="Log level of the in-process app")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    requests, skipped = load_requests(args.log)
+    if args.limit is not None:
+        requests = requests[:args.limit]
+    if not requests:
+        parser.error(f"{args.log} has no requests with a user_id to replay ({skipped} lines skipped)")
+
+    report = asyncio.run(run(args, requests))
+    report["skipped_lines"] = skipped
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
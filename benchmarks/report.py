@@ -0,0 +1,94 @@
+import math
+import re
+from typing import Dict, List, Sequence, Tuple
+
+# Stages of suggestion_stage_seconds, in the order a request goes through them
+STAGES = ("mem0_fetch", "select", "prompt_build", "llm", "parse", "fallback", "total")
+
+# Upper bounds of the latency histogram, in milliseconds
+HISTOGRAM_BOUNDS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, math.inf)
+
+Samples = Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})? (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """The q-th percentile (0-100) of the values, linearly interpolated, 0 if there are none."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies: Sequence[float]) -> Dict[str, float]:
+    """Count, mean and tail of latencies in seconds, reported in milliseconds."""
+    return {
+        "count": len(latencies),
+        "mean_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_ms": 1000 * percentile(latencies, 50),
+        "p95_ms": 1000 * percentile(latencies, 95),
+        "p99_ms": 1000 * percentile(latencies, 99),
+        "max_ms": 1000 * max(latencies, default=0.0),
+    }
+
+
+def parse_metrics(text: str) -> Samples:
+    """Samples of a Prometheus text exposition, keyed by name and sorted labels."""
+    samples: Samples = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match is None:
+            continue
+        name, labels, value = match.groups()
+        key = tuple(sorted(_LABEL.findall(labels or "")))
+        samples[(name, key)] = float(value)
+    return samples
+
+
+def stage_breakdown(before: Samples, after: Samples) -> Dict[str, Dict[str, float]]:
+    """Count and mean time of every stage observed between two /metrics snapshots."""
+    breakdown = {}
+    for stage in STAGES:
+        key = (("stage", stage),)
+        count = after.get(("suggestion_stage_seconds_count", key), 0.0) - before.get(("suggestion_stage_seconds_count", key), 0.0)
+        total = after.get(("suggestion_stage_seconds_sum", key), 0.0) - before.get(("suggestion_stage_seconds_sum", key), 0.0)
+        if count:
+            breakdown[stage] = {"count": count, "mean_ms": 1000 * total / count, "seconds": total}
+    return breakdown
+
+
+def counter_delta(before: Samples, after: Samples, name: str) -> float:
+    return after.get((f"{name}_total", ()), 0.0) - before.get((f"{name}_total", ()), 0.0)
+
+
+def format_stages(breakdown: Dict[str, Dict[str, float]]) -> List[str]:
+    """Table lines of a stage breakdown, with every stage's share of the total time."""
+    total = breakdown.get("total", {}).get("seconds", 0.0)
+    lines = [f"  {'stage':<14}{'count':>8}{'mean ms':>12}{'share':>9}"]
+    for stage, stats in breakdown.items():
+        share = f"{100 * stats['seconds'] / total:.1f}%" if total and stage != "total" else ""
+        lines.append(f"  {stage:<14}{stats['count']:>8.0f}{stats['mean_ms']:>12.1f}{share:>9}")
+    return lines
+
+
+def histogram(latencies: Sequence[float], bounds_ms: Sequence[float] = HISTOGRAM_BOUNDS_MS) -> List[Tuple[float, int]]:
+    """Number of latencies, in seconds, up to every bound and above the one before it."""
+    counts = [0] * len(bounds_ms)
+    for latency in latencies:
+        counts[next(i for i, bound in enumerate(bounds_ms) if 1000 * latency <= bound)] += 1
+    return list(zip(bounds_ms, counts))
+
+
+def format_histogram(buckets: List[Tuple[float, int]], width: int = 40) -> List[str]:
+    """Table lines of a latency histogram, with a bar per bucket."""
+    most = max((count for _, count in buckets), default=0)
+    lines = []
+    for bound, count in buckets:
+        label = f"<= {bound:.0f} ms" if bound != math.inf else "slower"
+        bar = "#" * round(width * count / most) if most else ""
+        lines.append(f"  {label:>12}{count:>8}  {bar}")
+    return lines
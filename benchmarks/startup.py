@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.fakes import FakeLLM, FakeMem0
+from benchmarks.harness import FakeBackends
+from benchmarks.report import percentile
+
+
+def measure() -> Dict[str, Any]:
+    """Time importing the app, starting it and its first request, in this fresh process."""
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    import httpx
+
+    async def start_and_serve() -> float:
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+                response = await client.get("/api/v1/suggestions", params={"user_id": "bench-user-0", "n": 3})
+                response.raise_for_status()
+            return ready
+
+    ready = asyncio.run(start_and_serve())
+    served = time.perf_counter()
+    return {
+        "import_s": imported - started,
+        "startup_s": ready - imported,
+        "first_request_s": served - ready,
+        "modules": len(sys.modules),
+        # ru_maxrss is in kilobytes on Linux
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run(runs: int) -> Dict[str, Any]:
+    """Measure in runs fresh interpreters against fake backends, the medians of every measure."""
+    samples: List[Dict[str, Any]] = []
+    with FakeBackends(FakeMem0(latency=0.0), FakeLLM(ttft=0.0, token_latency=0.0)) as backends:
+        env = {**os.environ, **backends.environ(), "LOG_LEVEL": "WARNING"}
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.startup", "--measure"],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True
+            ).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: percentile([sample[key] for sample in samples], 50) for key in samples[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the app's cold start against fake backends.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure in")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure()))
+        return
+    report = run(args.runs)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"Median of {args.runs} cold starts")
+    print(f"  import          {1000 * report['import_s']:.0f} ms, {report['modules']:.0f} modules")
+    print(f"  lifespan start  {1000 * report['startup_s']:.0f} ms")
+    print(f"  first request   {1000 * report['first_request_s']:.0f} ms")
+    print(f"  max RSS         {report['max_rss_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
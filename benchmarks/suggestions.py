@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import json
+import time
+from itertools import count
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.fakes import FakeLLM, FakeMem0
+from benchmarks.harness import FakeBackends, app_client
+from benchmarks.report import counter_delta, format_stages, parse_metrics, stage_breakdown, summarize
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    user_ids: List[str],
+    requests: int,
+    concurrency: int,
+    n: int
+) -> Dict[str, Any]:
+    """
+    Send requests to /api/v1/suggestions from concurrency workers.
+
+    Users are taken round robin, every worker sends its next request as soon
+    as its last one is answered.
+
+    Returns:
+        Dict[str, Any]: The latencies in seconds, the errors and the elapsed time
+    """
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    numbers = count()
+
+    async def worker() -> None:
+        while (number := next(numbers)) < requests:
+            user_id = user_ids[number % len(user_ids)]
+            started = time.perf_counter()
+            try:
+                response = await client.get("/api/v1/suggestions", params={"user_id": user_id, "n": n})
+                error = None if response.status_code == 200 else str(response.status_code)
+            except Exception as e:
+                error = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            if error is not None:
+                errors[error] = errors.get(error, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"latencies": latencies, "errors": errors, "elapsed": time.perf_counter() - started}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    mem0 = FakeMem0(
+        users=args.users,
+        min_memories=args.min_memories,
+        max_memories=args.max_memories,
+        latency=args.mem0_latency,
+        seed=args.seed
+    )
+    llm = FakeLLM(ttft=args.ttft, token_latency=args.token_latency)
+    env = {"LOG_LEVEL": args.log_level}
+    if args.no_cache:
+        env.update(SUGGESTION_CACHE_TTL="0", SUGGESTION_STORE_TTL="0")
+    with FakeBackends(mem0, llm, env=env):
+        async with app_client() as client:
+            if args.warmup:
+                await drive(client, mem0.user_ids, args.warmup, args.concurrency, args.n)
+            before = parse_metrics((await client.get("/metrics")).text)
+            backend_requests = (mem0.requests, llm.requests, llm.completion_tokens)
+            result = await drive(client, mem0.user_ids, args.requests, args.concurrency, args.n)
+            after = parse_metrics((await client.get("/metrics")).text)
+
+    generations = counter_delta(before, after, "suggestion_generations")
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "elapsed_s": result["elapsed"],
+        "throughput_rps": args.requests / result["elapsed"],
+        "latency": summarize(result["latencies"]),
+        "errors": result["errors"],
+        "fallback_rate": counter_delta(before, after, "suggestion_fallbacks") / generations if generations else 0.0,
+        "stages": stage_breakdown(before, after),
+        "backends": {
+            "mem0_requests": mem0.requests - backend_requests[0],
+            "llm_requests": llm.requests - backend_requests[1],
+            "llm_completion_tokens": llm.completion_tokens - backend_requests[2],
+        },
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    latency = report["latency"]
+    errors = ", ".join(f"{count} x {error}" for error, count in report["errors"].items()) or "none"
+    print(
+        f"{report['requests']} requests at concurrency {report['concurrency']} in {report['elapsed_s']:.2f}s, "
+        f"errors: {errors}, {100 * report['fallback_rate']:.1f}% fallbacks"
+    )
+    print(f"Throughput  {report['throughput_rps']:.1f} requests/s")
+    print(
+        f"Latency     p50 {latency['p50_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms, "
+        f"p99 {latency['p99_ms']:.1f} ms, max {latency['max_ms']:.1f} ms"
+    )
+    print("Stages")
+    for line in format_stages(report["stages"]):
+        print(line)
+    backends = report["backends"]
+    print(
+        f"Backends    {backends['mem0_requests']} mem0 requests, {backends['llm_requests']} LLM requests, "
+        f"{backends['llm_completion_tokens']} completion tokens"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark /api/v1/suggestions against fake mem0 and LLM backends.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests to measure")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at once")
+    parser.add_argument("--warmup", type=int, default=20, help="Requests sent before measuring")
+    parser.add_argument("--n", type=int, default=3, help="Suggestions per request")
+    parser.add_argument("--users", type=int, default=100, help="Synthetic users, taken round robin")
+    parser.add_argument("--min-memories", type=int, default=10, help="Fewest memories a user has")
+    parser.add_argument("--max-memories", type=int, default=10000, help="Most memories a user has")
+    parser.add_argument("--mem0-latency", type=float, default=0.02, help="Seconds per mem0 request")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds before the LLM's first token")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Seconds per LLM completion token")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic users")
+    parser.add_argument("--no-cache", action="store_true", help="Turn the suggestion cache and store off")
+    parser.add_argument("--log-level", default="WARNING", help="Log level of the app")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from app.services import metrics
+from app.services.batching import SuggestionBatcher
+from app.services.generator import SuggestionGenerator
+
+class FakeProvider:
+    """Mock batch endpoint, records the batches it gets and echoes every request."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    async def __call__(self, requests):
+        self.batches.append(list(requests))
+        await asyncio.sleep(self.delay)
+        return [
+            ValueError(f"bad request {request}") if request == "bad" else f"result {request}"
+            for request in requests
+        ]
+
+@pytest.mark.asyncio
+async def test_requests_in_the_window_are_batched():
+    provider = FakeProvider()
+    batcher = SuggestionBatcher(provider, window=0.01, max_batch_size=10)
+    observed = metrics.BATCH_REQUEST_SECONDS.count(phase="total")
+    results = await asyncio.gather(*[batcher.submit(f"user{i}") for i in range(3)])
+    assert results == ["result user0", "result user1", "result user2"]
+    assert provider.batches == [["user0", "user1", "user2"]]
+    assert batcher.batches == 1 and batcher.requests == 3
+    # Every request's latency is on /metrics, including the window it waited
+    assert metrics.BATCH_REQUEST_SECONDS.count(phase="total") == observed + 3
+    assert 'suggestion_batch_request_seconds_count{phase="wait"}' in metrics.registry.render()
+
+@pytest.mark.asyncio
+async def test_full_batches_are_sent_right_away():
+    provider = FakeProvider()
+    batcher = SuggestionBatcher(provider, window=10, max_batch_size=2)
+    first = await asyncio.wait_for(
+        asyncio.gather(batcher.submit("a"), batcher.submit("b")), timeout=1
+    )
+    assert first == ["result a", "result b"]
+    # The rest waits for the window, stop sends it
+    pending = asyncio.ensure_future(batcher.submit("c"))
+    await asyncio.sleep(0)
+    assert batcher.pending == 1
+    await batcher.stop()
+    assert await pending == "result c"
+    assert [len(batch) for batch in provider.batches] == [2, 1]
+
+@pytest.mark.asyncio
+async def test_errors_are_fanned_out():
+    batcher = SuggestionBatcher(FakeProvider(), window=0.01)
+    good, bad = await asyncio.gather(batcher.submit("good"), batcher.submit("bad"), return_exceptions=True)
+    assert good == "result good"
+    assert isinstance(bad, ValueError)
+
+    async def failing(requests):
+        raise RuntimeError("provider down")
+    batcher = SuggestionBatcher(failing, window=0.01)
+    results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def batched_response(*requests):
+    return SimpleNamespace(content=json.dumps({"requests": [
+        {"request": number, "suggestions": [
+            {"title": title, "description": f"{title} description", "memory": 1}
+        ]}
+        for number, title in requests
+    ]}))
+
+@pytest.mark.asyncio
+async def test_generator_packs_users_into_one_completion():
+    generator = SuggestionGenerator(openai_api_key="test", mem0_api_key="test")
+    generator.llm = AsyncMock()
+    generator.llm.ainvoke.return_value = batched_response(
+        (1, "Refactor the Python parser"), (2, "Design a bakery logo")
+    )
+    generator.use_batcher(SuggestionBatcher(generator.complete_batch, window=0.01))
+
+    coding, design = await asyncio.gather(
+        generator.generate_from_conversations([], "user1", [{"memory": "Writing a parser in Python"}], 1),
+        generator.generate_from_conversations([], "user2", [{"memory": "Opening a bakery"}], 1),
+    )
+
+    assert generator.llm.ainvoke.call_count == 1
+    prompt = generator.llm.ainvoke.call_args[0][0]
+    assert "Request 1:" in prompt[1].content and "Request 2:" in prompt[1].content
+    assert coding[0].title == "Refactor the Python parser"
+    assert coding[0].model_type == "code"
+    assert design[0].title == "Design a bakery logo"
+    assert design[0].model_type == "image"
+
+@pytest.mark.asyncio
+async def test_requests_missing_from_the_batch_fall_back():
+    generator = SuggestionGenerator(openai_api_key="test", mem0_api_key="test")
+    generator.llm = AsyncMock()
+    generator.llm.ainvoke.return_value = batched_response((1, "Refactor the Python parser"))
+
+    results = await generator.complete_batch([
+        ([{"memory": "Writing a parser"}], 1, ""),
+        ([{"memory": "Opening a bakery"}], 1, ""),
+    ])
+    assert results[0][0].title == "Refactor the Python parser"
+    assert isinstance(results[1], ValueError)
@@ -0,0 +1,96 @@
+import pytest
+from app.models import Suggestion, ModelType
+from app.services.cache import CacheBackend, SuggestionCache, InMemoryCacheBackend, fingerprint_memories
+from app.services.memory import MemoryService, add_write_listener, remove_write_listener
+
+@pytest.fixture
+def memories():
+    return [
+        {"id": "m1", "memory": "Working on a Python graph algorithm", "updated_at": "2024-03-20T10:00:00Z"},
+        {"id": "m2", "memory": "Designing a logo for the new app", "updated_at": "2024-03-20T11:00:00Z"}
+    ]
+
+@pytest.fixture
+def suggestions():
+    return [
+        Suggestion(
+            title="Optimize your algorithm",
+            description="Improve the time complexity of your graph traversal algorithm",
+            model_type=ModelType.CODE,
+            selected_model="anthropic/claude-3.7-sonnet"
+        )
+    ]
+
+def test_fingerprint_changes_with_memories(memories):
+    edited = [dict(memories[0], memory="Working on a Rust graph algorithm"), memories[1]]
+    assert fingerprint_memories(memories) == fingerprint_memories([dict(m) for m in memories])
+    assert fingerprint_memories(memories) != fingerprint_memories(edited)
+    assert fingerprint_memories(memories) != fingerprint_memories(memories[:1])
+    assert fingerprint_memories(memories) != fingerprint_memories(memories, "user: hello")
+
+def test_cache_hit_and_miss(memories, suggestions):
+    cache = SuggestionCache()
+    assert cache.get("user", 3, memories) is None
+    cache.set("user", 3, memories, suggestions)
+    assert cache.get("user", 3, memories) == suggestions
+    # Different n, user or memory set are different entries
+    assert cache.get("user", 2, memories) is None
+    assert cache.get("other_user", 3, memories) is None
+    assert cache.get("user", 3, memories[:1]) is None
+    assert cache.hits == 1
+    assert cache.misses == 4
+
+def test_cache_entries_expire(memories, suggestions, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.cache.time.monotonic", lambda: now[0])
+    cache = SuggestionCache(ttl=10)
+    cache.set("user", 3, memories, suggestions)
+    now[0] += 9
+    assert cache.get("user", 3, memories) == suggestions
+    now[0] += 2
+    assert cache.get("user", 3, memories) is None
+    assert len(cache.backend) == 0
+
+def test_cache_evicts_least_recently_used(memories, suggestions):
+    cache = SuggestionCache(backend=InMemoryCacheBackend(max_entries=2))
+    cache.set("user_1", 3, memories, suggestions)
+    cache.set("user_2", 3, memories, suggestions)
+    cache.get("user_1", 3, memories)
+    cache.set("user_3", 3, memories, suggestions)
+    assert cache.get("user_1", 3, memories) == suggestions
+    assert cache.get("user_2", 3, memories) is None
+    assert cache.get("user_3", 3, memories) == suggestions
+
+def test_invalidate_drops_all_entries_for_user(memories, suggestions):
+    cache = SuggestionCache()
+    cache.set("user", 3, memories, suggestions)
+    cache.set("user", 5, memories, suggestions)
+    cache.set("other_user", 3, memories, suggestions)
+    cache.invalidate("user")
+    assert cache.get("user", 3, memories) is None
+    assert cache.get("user", 5, memories) is None
+    assert cache.get("other_user", 3, memories) == suggestions
+
+@pytest.mark.asyncio
+async def test_add_memory_invalidates_cache(memories, suggestions):
+    class FakeMem0Client:
+        async def add(self, messages, user_id, output_format):
+            return {"results": [{"id": "m3", "memory": messages[0]["content"], "event": "ADD"}]}
+
+    cache = SuggestionCache()
+    cache.set("user", 3, memories, suggestions)
+    add_write_listener(cache.invalidate)
+    try:
+        service = MemoryService(client=FakeMem0Client())
+        await service.add_memory("user", [{"role": "user", "content": "I started learning Go"}])
+    finally:
+        remove_write_listener(cache.invalidate)
+    assert cache.get("user", 3, memories) is None
+
+def test_incomplete_backends_fail_when_created():
+    class GetOnlyBackend(CacheBackend):
+        def get(self, user_id, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyBackend()
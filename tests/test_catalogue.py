@@ -0,0 +1,51 @@
+import pytest
+from pydantic import ValidationError
+from app.models import ModelType, Suggestion
+from app.services.catalogue import ModelRegistry, ModelSpec, MODEL_CATALOGUE, model_registry
+
+def test_indexes():
+    assert "gpt-4.1" in model_registry
+    assert "gpt-5" not in model_registry
+    assert len(model_registry) == len(MODEL_CATALOGUE)
+
+    image_models = {model.id for model in model_registry.models_for_type(ModelType.IMAGE)}
+    assert "recraft-ai/recraft-v3-svg" in image_models
+    assert "gpt-4.1" not in image_models
+    # Code suggestions run on text models
+    assert model_registry.models_for_type(ModelType.CODE) == model_registry.models_for_type(ModelType.TEXT)
+
+    assert model_registry.model_for_tag("vector", ModelType.IMAGE).id == "recraft-ai/recraft-v3-svg"
+    assert model_registry.model_for_tag("vector", ModelType.TEXT) is None
+    # The first model in the catalogue wins a shared tag
+    assert model_registry.model_for_tag("reasoning", ModelType.TEXT).id == "anthropic/claude-3.7-sonnet"
+
+    assert model_registry.default_model(ModelType.CODE).id == "anthropic/claude-3.7-sonnet"
+    assert model_registry.default_model(ModelType.IMAGE).id == "openai/gpt-image-1"
+
+def test_resolve_alias():
+    assert model_registry.resolve_alias("Claude").id == "anthropic/claude-3.7-sonnet"
+    assert model_registry.resolve_alias("GPT-4.1").id == "gpt-4.1"
+    assert model_registry.resolve_alias("recraft_v3 svg").id == "recraft-ai/recraft-v3-svg"
+    assert model_registry.resolve_alias("deepseek/deepseek-r1").id == "deepseek/deepseek-r1"
+    assert model_registry.resolve_alias("Bard") is None
+
+def test_supports():
+    assert model_registry.supports("gpt-4.1", "code")
+    assert model_registry.supports("openai/gpt-image-1", "Image")
+    assert not model_registry.supports("openai/gpt-image-1", "text")
+    assert not model_registry.supports("gpt-4.1", "video")
+    assert not model_registry.supports("gpt-5", "text")
+
+def test_invalid_catalogues():
+    text = frozenset({ModelType.TEXT})
+    with pytest.raises(ValueError):
+        ModelRegistry([ModelSpec("a", text, ""), ModelSpec("a", text, "")], {})
+    with pytest.raises(ValueError):
+        ModelRegistry([ModelSpec("a", text, "")], {ModelType.IMAGE: "a"})
+
+def test_suggestion_model_validation():
+    Suggestion(title="t", description="d", model_type=ModelType.IMAGE, selected_model="recraft-ai/recraft-v3")
+    with pytest.raises(ValidationError):
+        Suggestion(title="t", description="d", model_type="text", selected_model="gpt-5")
+    with pytest.raises(ValidationError):
+        Suggestion(title="t", description="d", model_type="image", selected_model="gpt-4.1")
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from app.services.memory import MemoryService, CategoryCache, DEFAULT_CATEGORIES
+
+class FakeProjectClient:
+    """Stand-in for the project endpoints of AsyncMemoryClient."""
+
+    def __init__(self, categories=None):
+        self.categories = categories or []
+        self.get_calls = 0
+        self.update_calls = 0
+
+    async def get_project(self, fields):
+        self.get_calls += 1
+        await asyncio.sleep(0.01)
+        return {"custom_categories": list(self.categories)}
+
+    async def update_project(self, custom_categories):
+        self.update_calls += 1
+        self.categories = custom_categories
+
+@pytest.mark.asyncio
+async def test_categories_are_fetched_once_for_all_users():
+    client = FakeProjectClient([{"work": "Work things"}])
+    service = MemoryService(client=client, categories=CategoryCache())
+
+    results = await asyncio.gather(*(service.get_user_categories(f"user{i}") for i in range(10)))
+    again = await service.get_user_categories("user11")
+
+    assert client.get_calls == 1
+    assert all(result is again for result in results)
+    assert again == [{"name": "work", "description": "Work things", "keywords": [], "goal": ""}]
+
+@pytest.mark.asyncio
+async def test_empty_project_is_initialized_once():
+    client = FakeProjectClient()
+    service = MemoryService(client=client, categories=CategoryCache())
+
+    await asyncio.gather(*(service.get_user_categories("user1") for _ in range(5)))
+    categories = await service.get_user_categories("user2")
+
+    assert client.update_calls == 1
+    # The defaults that were just written are used without reading them back
+    assert client.get_calls == 1
+    assert [c["name"] for c in categories] == [list(c)[0] for c in DEFAULT_CATEGORIES]
+
+@pytest.mark.asyncio
+async def test_stale_categories_refresh_in_the_background():
+    client = FakeProjectClient([{"work": "Work things"}])
+    cache = CategoryCache(ttl=0)
+    service = MemoryService(client=client, categories=cache)
+    first = await service.get_user_categories("user1")
+    assert cache.version == 1
+
+    # Unchanged categories keep the cached list and version
+    assert await service.get_user_categories("user1") is first
+    await asyncio.sleep(0.05)
+    assert client.get_calls == 2
+    assert cache.version == 1
+
+    client.categories = [{"health": "Health things"}]
+    assert await service.get_user_categories("user1") is first
+    await asyncio.sleep(0.05)
+    assert cache.version == 2
+    assert (await service.get_user_categories("user1"))[0]["name"] == "health"
@@ -0,0 +1,61 @@
+from app.services.dedup import collapse_near_duplicates
+
+def test_near_duplicates_are_merged_into_the_newest():
+    memories = [
+        {"id": "3", "memory": "User is working on a graph algorithm.", "categories": ["working_projects"]},
+        {"id": "2", "memory": "Designing a logo for the bakery", "categories": ["working_projects"]},
+        {"id": "1", "memory": "user is working on a Graph Algorithm", "categories": ["technology_and_tools", "working_projects"]},
+    ]
+    kept, merged = collapse_near_duplicates(memories)
+    assert merged == 1
+    assert [memory["id"] for memory in kept] == ["3", "2"]
+    # The categories of merged memories are kept
+    assert kept[0]["categories"] == ["working_projects", "technology_and_tools"]
+    assert memories[0]["categories"] == ["working_projects"]
+
+def test_memories_with_incompatible_categories_are_kept():
+    memories = [
+        {"id": "3", "memory": "Prefers Flux for images", "categories": ["ai_model_preferences"]},
+        {"id": "2", "memory": "prefers Flux for images", "categories": ["image_generation_preferences"]},
+        {"id": "1", "memory": "Prefers flux for images.", "categories": ["entertainment"]},
+        {"id": "0", "memory": "Prefers Flux for images", "categories": []},
+    ]
+    kept, merged = collapse_near_duplicates(memories)
+    # Model preferences never merge with topics, topics need a category in common or none at all
+    assert merged == 1
+    assert [memory["id"] for memory in kept] == ["3", "2", "1"]
+    assert kept[0]["categories"] == ["ai_model_preferences"]
+    assert kept[1]["categories"] == ["image_generation_preferences"]
+
+def test_distinct_memories_are_kept():
+    memories = [
+        {"memory": "User is working on a graph algorithm"},
+        {"memory": "User is working on a graph algorithm in Python for a job interview"},
+        {"memory": ""},
+        {"memory": ""},
+    ]
+    kept, merged = collapse_near_duplicates(memories)
+    assert merged == 0
+    assert kept == memories
+    assert collapse_near_duplicates([]) == ([], 0)
+
+def test_chains_collapse_into_one_group():
+    memories = [{"memory": "Learning jazz piano"} for _ in range(5)]
+    kept, merged = collapse_near_duplicates(memories)
+    assert merged == 4
+    assert len(kept) == 1
+
+def test_memories_are_embedded_once_for_selection(monkeypatch):
+    from app.services import selection
+    from app.services.dedup import collapse_embedded_near_duplicates
+    from app.services.ranking import embed
+    memories = [{"id": str(i), "memory": f"Working on project number {i}"} for i in range(10)]
+    memories.append({"id": "dup", "memory": "working on project number 9"})
+    kept, vectors, merged = collapse_embedded_near_duplicates(memories)
+    assert merged == 1
+    assert (vectors == embed([memory["memory"] for memory in memories])[:10]).all()
+
+    def embed_again(texts):
+        raise AssertionError("memories embedded twice")
+    monkeypatch.setattr(selection, "embed", embed_again)
+    assert len(selection.select_memories(kept, 2, vectors=vectors)) == 4
@@ -0,0 +1,75 @@
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from app.models import ModelType
+from app.services.fallback import FallbackSuggester
+from app.services.generator import SuggestionGenerator
+from app.services.keywords import KeywordMatcher
+
+def test_keyword_matcher_counts_all_categories_in_one_pass():
+    matcher = KeywordMatcher({
+        "image": ["logo", "illustrat"],
+        "vector": ["logo", "svg"],
+        "code": ["api", "code"],
+    })
+    assert matcher.count("Draw a Logo as SVG, then illustrate the API docs") == {
+        "image": 2, "vector": 2, "code": 1
+    }
+    # Short terms are whole words, longer ones are prefixes
+    assert matcher.count("rapid codebase growth") == {"code": 1}
+    assert matcher.count_all(["logo", "", "svg logo"]) == {"image": 2, "vector": 3}
+    assert matcher.rank({"code": 1, "vector": 2, "image": 2}) == ["image", "vector", "code"]
+
+def test_keyword_matcher_phrases():
+    matcher = KeywordMatcher({"code": ["unit test", "c++"], "photo": ["photo"], "photoreal": ["photoreal"]})
+    assert matcher.count("Add unit tests for the C++ parser") == {"code": 2}
+    # The longest term wins
+    assert matcher.count("A photorealistic photo") == {"photoreal": 1, "photo": 1}
+    # Terms do not span texts
+    assert matcher.count_all(["Write a unit", "test the parser"]) == {}
+
+def test_keyword_matcher_whole_words():
+    matcher = KeywordMatcher({"image": ["photo", "photo shoot"]}, whole_words=["photo"])
+    assert matcher.count("A photo of photosynthesis") == {"image": 1}
+    assert matcher.count("Plan the photo shoot") == {"image": 1}
+
+def test_fallbacks_are_ranked_by_matches():
+    suggester = FallbackSuggester()
+    suggestions = suggester.suggest(
+        [{"role": "user", "content": "Can you help me write a blog post?"}],
+        [{"memory": "Designed a logo for the team"}, {"memory": "Writing a story"}]
+    )
+    assert [s.model_type for s in suggestions] == [ModelType.TEXT, ModelType.IMAGE]
+    assert suggestions[0].selected_model == "gpt-4.1"
+    assert suggestions[1].selected_model == "openai/gpt-image-1"
+
+def test_general_fallback():
+    suggester = FallbackSuggester()
+    # Substrings inside other words do not count
+    suggestions = suggester.suggest([], [{"memory": "Read a paragraph about compost"}])
+    assert len(suggestions) == 1
+    assert suggestions[0].title == "Continue the conversation"
+    assert suggestions[0].selected_model == "gpt-4o-mini"
+
+def test_fallbacks_are_copies():
+    suggester = FallbackSuggester()
+    first = suggester.suggest([], [{"memory": "Python code"}])[0]
+    first.title = "Changed"
+    assert suggester.suggest([], [{"memory": "Python code"}])[0].title == "Continue working on coding project"
+
+@pytest.mark.asyncio
+async def test_generation_results_flag_fallbacks():
+    generator = SuggestionGenerator(openai_api_key="test", mem0_api_key="test")
+    generator.llm = AsyncMock()
+    generator.llm.ainvoke.side_effect = RuntimeError("provider down")
+    result = await generator.generate([], "user1", [{"memory": "Writing a parser in Python"}], 1)
+    assert result.is_fallback
+    assert result.suggestions[0].model_type == ModelType.CODE
+
+    generator.llm.ainvoke.side_effect = None
+    generator.llm.ainvoke.return_value = SimpleNamespace(content=json.dumps({"suggestions": [
+        {"title": "Speed up the parser", "description": "Profile the Python parser", "memory": 1}
+    ]}))
+    result = await generator.generate([], "user1", [{"memory": "Writing a parser in Python"}], 1)
+    assert not result.is_fallback
@@ -0,0 +1,83 @@
+import pytest
+from app.services.goals import GoalsIndex
+from app.services.memory import MemoryService
+from app.services.records import MICROSECONDS, parse_timestamp
+
+GOALS = ["milestones_and_goals"]
+
+class FakeMem0:
+    """In-process stand-in for mem0 filtering on user, category and updated_at."""
+
+    def __init__(self):
+        self.memories = {}
+        self.calls = []
+
+    def put(self, memory_id, text, created_at, categories=GOALS, updated_at=None):
+        self.memories[memory_id] = {
+            "id": memory_id, "memory": text, "categories": list(categories),
+            "created_at": created_at, "updated_at": updated_at or created_at
+        }
+
+    def matches(self, memory, condition):
+        if "categories" in condition:
+            return condition["categories"]["contains"] in memory["categories"]
+        if "updated_at" in condition:
+            return parse_timestamp(memory["updated_at"]) >= parse_timestamp(condition["updated_at"]["gte"])
+        return True
+
+    async def get_all(self, version, filters, page=1, page_size=100):
+        self.calls.append(filters)
+        found = [m for m in self.memories.values() if all(self.matches(m, c) for c in filters["AND"])]
+        return {"count": len(found), "next": None, "previous": None, "results": found}
+
+    async def add(self, messages, user_id, output_format):
+        return {"results": []}
+
+@pytest.fixture
+def mem0():
+    mem0 = FakeMem0()
+    mem0.put("g1", "Run a marathon", "2024-03-20T10:00:00Z")
+    # Mixed timezone offsets are ordered by the instant they denote
+    mem0.put("g2", "Learn Rust", "2024-03-20T12:30:00+02:00")
+    mem0.put("g3", "Ship the app", "2024-03-20T11:00:00Z")
+    mem0.put("n1", "Likes jazz", "2024-03-20T13:00:00Z", categories=["music"])
+    return mem0
+
+@pytest.mark.asyncio
+async def test_goals_are_ordered_by_parsed_timestamp(mem0):
+    service = MemoryService(client=mem0)
+    goals = await service.get_user_goals("user1")
+    assert [g["content"] for g in goals] == ["Ship the app", "Learn Rust", "Run a marathon"]
+    # The category is filtered by mem0
+    assert {"categories": {"contains": "milestones_and_goals"}} in mem0.calls[0]["AND"]
+
+@pytest.mark.asyncio
+async def test_goals_are_served_from_the_index(mem0):
+    service = MemoryService(client=mem0)
+    await service.get_user_goals("user1")
+    assert [g["content"] for g in await service.get_user_goals("user1", limit=1)] == ["Ship the app"]
+    assert len(mem0.calls) == 1
+
+def test_recency_window():
+    index = GoalsIndex()
+    index.load("user1", [
+        {"id": "old", "memory": "Old goal", "categories": GOALS, "created_at": "2024-03-01T00:00:00Z"},
+        {"id": "new", "memory": "New goal", "categories": GOALS, "created_at": "2024-03-20T00:00:00Z"},
+    ], checked_at=0)
+    now = parse_timestamp("2024-03-21T00:00:00Z") / MICROSECONDS
+    assert [g["content"] for g in index.query("user1", window=7 * 86400, now=now)] == ["New goal"]
+    assert len(index.query("user1", window=30 * 86400, now=now)) == 2
+
+@pytest.mark.asyncio
+async def test_writes_trigger_a_delta_sync(mem0):
+    service = MemoryService(client=mem0)
+    await service.get_user_goals("user1")
+
+    mem0.put("g4", "Write a book", "2024-03-20T14:00:00Z")
+    # g1 is no longer a goal
+    mem0.put("g1", "Ran a marathon", "2024-03-20T10:00:00Z", categories=["sports"], updated_at="2024-03-20T14:00:00Z")
+    await service.add_memory("user1", [{"role": "user", "content": "I want to write a book"}])
+    goals = await service.get_user_goals("user1")
+
+    assert {"updated_at": {"gte": "2024-03-20T11:00:00Z"}} in mem0.calls[-1]["AND"]
+    assert [g["content"] for g in goals] == ["Write a book", "Ship the app", "Learn Rust"]
@@ -0,0 +1,29 @@
+import pytest
+from app.services.http import HTTPClientPool, create_async_client
+
+@pytest.mark.asyncio
+async def test_one_client_per_backend():
+    pool = HTTPClientPool(max_connections=10, max_keepalive_connections=5, timeout=30, connect_timeout=3)
+    openai = pool.get("openai")
+    assert pool.get("openai") is openai
+    mem0 = pool.get("mem0")
+    assert mem0 is not openai
+    assert "mem0" in pool
+    assert openai.timeout.read == 30
+    assert openai.timeout.connect == 3
+
+    await pool.aclose()
+    assert openai.is_closed and mem0.is_closed
+    assert "openai" not in pool
+    # Closed clients are replaced on next use
+    assert not pool.get("openai").is_closed
+    await pool.aclose()
+
+@pytest.mark.asyncio
+async def test_pool_limits():
+    client = create_async_client(max_connections=7, max_keepalive_connections=3, keepalive_expiry=15)
+    pool = client._transport._pool
+    assert pool._max_connections == 7
+    assert pool._max_keepalive_connections == 3
+    assert pool._keepalive_expiry == 15
+    await client.aclose()
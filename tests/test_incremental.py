@@ -0,0 +1,134 @@
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from app.services.cache import MemorySuggestionStore, hash_memory
+from app.services.generator import SuggestionGenerator
+
+def drafts_response(*drafts):
+    return SimpleNamespace(content=json.dumps({"suggestions": [
+        {"title": title, "description": f"{title} description", "memory": memory}
+        for title, memory in drafts
+    ]}))
+
+@pytest.fixture
+def generator():
+    generator = SuggestionGenerator(openai_api_key="test", mem0_api_key="test", store=MemorySuggestionStore())
+    generator.llm = AsyncMock()
+    return generator
+
+def test_hash_memory_tracks_content():
+    assert hash_memory({"id": "1", "memory": "Working on a parser"}) == hash_memory({"id": "2", "memory": "Working on a parser"})
+    assert hash_memory({"memory": "Working on a parser"}) != hash_memory({"memory": "Working on a compiler"})
+
+@pytest.mark.asyncio
+async def test_only_new_memories_are_sent_to_the_llm(generator):
+    memories = [
+        {"id": "1", "memory": "Refactoring a Python parser"},
+        {"id": "2", "memory": "Writing a fantasy story"},
+    ]
+    generator.llm.ainvoke.return_value = drafts_response(("Speed up the parser", 1), ("Finish the story", 2))
+    first = await generator.generate_from_conversations([], "user1", memories, 2)
+    assert [s.title for s in first] == ["Speed up the parser", "Finish the story"]
+
+    # One memory added and one edited
+    memories = [
+        {"id": "3", "memory": "Designing a logo for the bakery"},
+        {"id": "1", "memory": "Refactoring a Python parser"},
+        {"id": "2", "memory": "Writing a fantasy novel"},
+    ]
+    generator.llm.ainvoke.return_value = drafts_response(("Sketch the logo", 1), ("Outline the novel", 2))
+    second = await generator.generate_from_conversations([], "user1", memories, 3)
+
+    prompt = generator.llm.ainvoke.call_args[0][0][1].content
+    assert "exactly 2 suggestions" in prompt
+    assert "Designing a logo for the bakery" in prompt
+    assert "Writing a fantasy novel" in prompt
+    assert "Refactoring a Python parser" not in prompt
+    # New suggestions first, then the reused ones
+    assert [s.title for s in second] == ["Sketch the logo", "Outline the novel", "Speed up the parser"]
+
+@pytest.mark.asyncio
+async def test_unchanged_memories_need_no_llm_call(generator):
+    memories = [{"id": "1", "memory": "Refactoring a Python parser"}]
+    generator.llm.ainvoke.return_value = drafts_response(("Speed up the parser", 1))
+    await generator.generate_from_conversations([], "user1", memories, 1)
+    generator.llm.ainvoke.reset_mock()
+
+    again = await generator.generate_from_conversations([], "user1", memories, 1)
+    assert generator.llm.ainvoke.call_count == 0
+    assert again[0].title == "Speed up the parser"
+    # Suggestions are kept per user
+    generator.llm.ainvoke.return_value = drafts_response(("Other user", 1))
+    other = await generator.generate_from_conversations([], "user2", memories, 1)
+    assert other[0].title == "Other user"
+
+@pytest.mark.asyncio
+async def test_changed_preferences_regenerate(generator):
+    memories = [{"id": "1", "memory": "Refactoring a Python parser"}]
+    generator.llm.ainvoke.return_value = drafts_response(("Speed up the parser", 1))
+    first = await generator.generate_from_conversations([], "user1", memories, 1)
+    assert first[0].selected_model == "anthropic/claude-3.7-sonnet"
+
+    memories = memories + [{"id": "2", "memory": "Prefers GPT-4.1 for coding", "categories": ["ai_model_preferences"]}]
+    generator.llm.ainvoke.reset_mock()
+    second = await generator.generate_from_conversations([], "user1", memories, 1)
+    assert generator.llm.ainvoke.call_count == 1
+    assert second[0].selected_model == "gpt-4.1"
+
+@pytest.mark.asyncio
+async def test_memories_without_a_suggestion_are_known(generator):
+    # Twice as many memories as suggestions, as select_memories sends
+    memories = [{"id": str(i), "memory": f"Working on project {i}"} for i in range(6)]
+    generator.llm.ainvoke.return_value = drafts_response(("First", 1), ("Third", 3), ("Fifth", 5))
+    first = await generator.generate_from_conversations([], "user1", memories, 3)
+    generator.llm.ainvoke.reset_mock()
+
+    again = await generator.generate_from_conversations([], "user1", memories, 3)
+    assert generator.llm.ainvoke.call_count == 0
+    assert [s.title for s in again] == [s.title for s in first]
+
+@pytest.mark.asyncio
+async def test_a_single_new_memory_gets_all_suggestions(generator):
+    memories = [{"id": "1", "memory": "Refactoring a Python parser"}]
+    generator.llm.ainvoke.return_value = drafts_response(("Profile", 1), ("Speed up", 1), ("Document", 1))
+    suggestions = await generator.generate_from_conversations([], "user1", memories, 3)
+
+    prompt = generator.llm.ainvoke.call_args[0][0][1].content
+    assert "exactly 3 suggestions" in prompt
+    assert [s.title for s in suggestions] == ["Profile", "Speed up", "Document"]
+
+@pytest.mark.asyncio
+async def test_asking_for_more_suggestions_regenerates(generator):
+    memories = [{"id": str(i), "memory": f"Working on project {i}"} for i in range(6)]
+    generator.llm.ainvoke.return_value = drafts_response(("First", 1), ("Third", 3), ("Fifth", 5))
+    await generator.generate_from_conversations([], "user1", memories, 3)
+
+    generator.llm.ainvoke.return_value = drafts_response(
+        ("One", 1), ("Two", 2), ("Three", 3), ("Four", 4), ("Five", 5)
+    )
+    more = await generator.generate_from_conversations([], "user1", memories, 5)
+    prompt = generator.llm.ainvoke.call_args[0][0][1].content
+    assert "exactly 5 suggestions" in prompt
+    assert "Working on project 0" in prompt
+    assert [s.title for s in more] == ["One", "Two", "Three", "Four", "Five"]
+
+    # The regenerated suggestions are kept
+    generator.llm.ainvoke.reset_mock()
+    again = await generator.generate_from_conversations([], "user1", memories, 5)
+    assert generator.llm.ainvoke.call_count == 0
+    assert len(again) == 5
+
+@pytest.mark.asyncio
+async def test_new_memories_make_up_for_too_few_reused_suggestions(generator):
+    memories = [{"id": "1", "memory": "Refactoring a Python parser"}]
+    generator.llm.ainvoke.return_value = drafts_response(("Speed up the parser", 1))
+    await generator.generate_from_conversations([], "user1", memories, 1)
+
+    memories = memories + [{"id": "2", "memory": "Writing a fantasy story"}]
+    generator.llm.ainvoke.return_value = drafts_response(("Outline", 1), ("Name the characters", 1))
+    more = await generator.generate_from_conversations([], "user1", memories, 3)
+    prompt = generator.llm.ainvoke.call_args[0][0][1].content
+    assert "exactly 2 suggestions" in prompt
+    assert "Refactoring a Python parser" not in prompt
+    assert [s.title for s in more] == ["Outline", "Name the characters", "Speed up the parser"]
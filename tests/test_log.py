@@ -0,0 +1,67 @@
+import io
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import log
+
+@pytest.fixture
+def output():
+    stream = io.StringIO()
+    log.start_logging(level="DEBUG", stream=stream)
+    yield stream
+    log.stop_logging()
+    log.set_sample_rate(log.DEFAULT_SAMPLE_RATE)
+
+def lines(stream):
+    log.stop_logging()  # Writes out what is still queued
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_logs_are_json_with_request_id_and_fields(output):
+    logger = log.get_logger("app.services.test")
+    log.set_request_id("req-1")
+    logger.info("Generated suggestions", user_id="user1", count=3)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Failed")
+
+    info, error = lines(output)
+    assert info["level"] == "INFO"
+    assert info["logger"] == "app.services.test"
+    assert info["request_id"] == "req-1"
+    assert info["message"] == "Generated suggestions"
+    assert info["user_id"] == "user1" and info["count"] == 3
+    assert error["level"] == "ERROR"
+    assert "ValueError: boom" in error["exception"]
+
+def test_item_output_is_sampled_per_request(output):
+    logger = log.get_logger("test")
+    log.set_sample_rate(0.0)
+    log.set_request_id("req-unsampled")
+    logger.item("Memory", memory="Building a compiler")
+    log.set_sample_rate(1.0)
+    log.set_request_id("req-sampled")
+    logger.item("Memory", memory="Learning Rust")
+
+    (item,) = lines(output)
+    assert item["request_id"] == "req-sampled"
+    assert item["memory"] == "Learning Rust"
+
+def test_request_id_header():
+    client = TestClient(app)
+    response = client.get("/", headers={"X-Request-ID": "abc123"})
+    assert response.headers["X-Request-ID"] == "abc123"
+    generated = client.get("/").headers["X-Request-ID"]
+    assert len(generated) == 32 and generated != client.get("/").headers["X-Request-ID"]
+
+def test_requests_are_logged(output):
+    TestClient(app).get("/", params={"user_id": "user1", "n": 5}, headers={"X-Request-ID": "req-2"})
+
+    (entry,) = [line for line in lines(output) if line["message"] == "Handled request"]
+    assert entry["request_id"] == "req-2"
+    assert entry["path"] == "/"
+    assert entry["user_id"] == "user1" and entry["n"] == "5"
+    assert entry["status"] == 200
+    # Logged when the request is answered, with when it arrived for replays
+    assert entry["received"] <= entry["time"]
@@ -0,0 +1,100 @@
+import pytest
+from app.services import memory
+from app.services.memory import MemoryService
+
+class FakeMem0Client:
+    """Paginated stand-in for AsyncMemoryClient.get_all."""
+
+    def __init__(self, total):
+        self.memories = [
+            {"memory": f"Memory {i}", "created_at": f"2024-03-20T10:{59 - i % 60:02d}:00Z"}
+            for i in range(total)
+        ]
+        self.calls = []
+
+    async def get_all(self, version, filters, page=1, page_size=100):
+        self.calls.append((page, page_size))
+        start = (page - 1) * page_size
+        results = self.memories[start:start + page_size]
+        has_next = start + page_size < len(self.memories)
+        return {
+            "count": len(self.memories),
+            "next": f"?page={page + 1}" if has_next else None,
+            "previous": None,
+            "results": results
+        }
+
+@pytest.mark.asyncio
+async def test_recent_conversations_are_bounded():
+    client = FakeMem0Client(total=1000)
+    service = MemoryService(client=client)
+
+    memories = await service.get_recent_conversations("test_user", limit=10)
+
+    assert len(memories) == 10
+    # A single page sized to the limit is fetched
+    assert client.calls == [(1, 10)]
+
+@pytest.mark.asyncio
+async def test_iter_memories_stops_after_limit():
+    client = FakeMem0Client(total=1000)
+    service = MemoryService(client=client)
+
+    memories = [m async for m in service.iter_memories({"user_id": "test_user"}, limit=120, page_size=50)]
+
+    assert [m["memory"] for m in memories] == [f"Memory {i}" for i in range(120)]
+    assert client.calls == [(1, 50), (2, 50), (3, 50)]
+
+@pytest.mark.asyncio
+async def test_iter_memories_reads_all_pages_without_limit():
+    client = FakeMem0Client(total=75)
+    service = MemoryService(client=client)
+
+    memories = [m async for m in service.iter_memories({"user_id": "test_user"}, page_size=50)]
+
+    assert len(memories) == 75
+    assert client.calls == [(1, 50), (2, 50)]
+
+@pytest.mark.asyncio
+async def test_iter_memories_accepts_list_responses():
+    class ListClient(FakeMem0Client):
+        async def get_all(self, **kwargs):
+            response = await super().get_all(**kwargs)
+            return response["results"]
+
+    service = MemoryService(client=ListClient(total=30))
+    memories = [m async for m in service.iter_memories({"user_id": "test_user"}, page_size=20)]
+    assert len(memories) == 30
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ids", [True, False])
+async def test_iter_memories_stops_when_pages_repeat(ids):
+    class UnpagedClient(FakeMem0Client):
+        """Returns the full list whatever page is asked for."""
+
+        async def get_all(self, version, filters, page=1, page_size=100):
+            self.calls.append((page, page_size))
+            return self.memories
+
+    client = UnpagedClient(total=60)
+    if ids:
+        for i, memory in enumerate(client.memories):
+            memory["id"] = f"m{i}"
+    service = MemoryService(client=client)
+    memories = [m async for m in service.iter_memories({"user_id": "test_user"}, page_size=50)]
+    assert len(memories) == 60
+    assert len(client.calls) == 2
+
+@pytest.mark.asyncio
+async def test_iter_memories_stops_after_max_pages(monkeypatch):
+    class EndlessClient(FakeMem0Client):
+        async def get_all(self, version, filters, page=1, page_size=100):
+            self.calls.append((page, page_size))
+            return [{"id": f"p{page}-{i}", "memory": f"Memory {i}"} for i in range(page_size)]
+
+    monkeypatch.setattr(memory, "MAX_PAGES", 5)
+    client = EndlessClient(total=0)
+    service = MemoryService(client=client)
+    memories = [m async for m in service.iter_memories({"user_id": "test_user"}, page_size=10)]
+    assert len(memories) == 50
+    assert len(client.calls) == 5
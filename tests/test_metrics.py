@@ -0,0 +1,67 @@
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import metrics
+from app.services.generator import SuggestionGenerator
+from app.services.metrics import MetricsRegistry
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", labelnames=("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, stage="llm")
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{stage="llm",le="0.1"} 2.0' in text
+    assert 'latency_seconds_bucket{stage="llm",le="1.0"} 3.0' in text
+    assert 'latency_seconds_bucket{stage="llm",le="+Inf"} 4.0' in text
+    assert 'latency_seconds_count{stage="llm"} 4.0' in text
+    assert histogram.sum(stage="llm") == pytest.approx(5.65)
+    with pytest.raises(ValueError):
+        histogram.observe(1.0)
+
+def test_counters_and_gauges():
+    registry = MetricsRegistry()
+    hits = registry.counter("hits", "Hits")
+    hits.inc()
+    hits.inc(2)
+    registry.gauge("hit_ratio", "Hit ratio", lambda: metrics.ratio(hits.value(), 4))
+    text = registry.render()
+    assert "hits_total 3.0" in text
+    assert "hit_ratio 0.75" in text
+    assert metrics.ratio(1, 0) == 0.0
+
+def test_metrics_must_have_samples():
+    with pytest.raises(TypeError):
+        metrics.Metric("untyped", "A metric without samples")
+
+@pytest.mark.asyncio
+async def test_generation_stages_are_timed():
+    generator = SuggestionGenerator(openai_api_key="test", mem0_api_key="test")
+    generator.llm = AsyncMock()
+    generator.llm.ainvoke.return_value = SimpleNamespace(content=json.dumps({"suggestions": [
+        {"title": "Speed up the parser", "description": "Profile the Python parser", "memory": 1}
+    ]}))
+    before = {stage: metrics.STAGE_SECONDS.count(stage=stage) for stage in ("prompt_build", "llm", "parse", "fallback")}
+    prompts, fallbacks = metrics.PROMPT_TOKENS.count(), metrics.FALLBACKS.value()
+
+    await generator.generate_from_conversations([], "user1", [{"memory": "Writing a parser in Python"}], 1)
+    for stage in ("prompt_build", "llm", "parse"):
+        assert metrics.STAGE_SECONDS.count(stage=stage) == before[stage] + 1
+    assert metrics.PROMPT_TOKENS.count() == prompts + 1
+
+    generator.llm.ainvoke.side_effect = RuntimeError("provider down")
+    await generator.generate_from_conversations([], "user2", [{"memory": "Opening a bakery"}], 1)
+    assert metrics.FALLBACKS.value() == fallbacks + 1
+    assert metrics.STAGE_SECONDS.count(stage="fallback") == before["fallback"] + 1
+
+def test_metrics_endpoint():
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE suggestion_stage_seconds histogram" in response.text
+    assert "suggestion_fallback_ratio" in response.text
+    assert "suggestion_cache_hit_ratio" in response.text
@@ -0,0 +1,218 @@
+import asyncio
+import pytest
+from app.services.memory import MemoryService
+from app.services.mirror import MemoryMirror
+from app.services.records import parse_timestamp
+
+class FakeMem0:
+    """In-process stand-in for mem0, honours user_id and updated_at filters and pagination."""
+
+    def __init__(self):
+        self.memories = []
+        self.calls = []
+        self.clock = 0
+        self.fail = False
+        # Requests wait for the gate while it is set, to hold back background loads
+        self.gate = None
+
+    def stamp(self):
+        self.clock += 1
+        return f"2024-03-20T10:{self.clock // 60:02d}:{self.clock % 60:02d}Z"
+
+    def put(self, user_id, memory_id, text, categories=()):
+        stamp = self.stamp()
+        for memory in self.memories:
+            if memory["id"] == memory_id:
+                memory.update(memory=text, updated_at=stamp)
+                return memory
+        memory = {
+            "id": memory_id, "user_id": user_id, "memory": text,
+            "categories": list(categories), "created_at": stamp, "updated_at": stamp
+        }
+        self.memories.append(memory)
+        return memory
+
+    def matches(self, memory, condition):
+        if "user_id" in condition:
+            return memory["user_id"] == condition["user_id"]
+        if "updated_at" in condition:
+            return parse_timestamp(memory["updated_at"]) >= parse_timestamp(condition["updated_at"]["gte"])
+        return True
+
+    async def get_all(self, version, filters, page=1, page_size=100):
+        if self.fail:
+            raise ConnectionError("mem0 is down")
+        if self.gate is not None:
+            await self.gate.wait()
+        self.calls.append(filters)
+        found = [m for m in reversed(self.memories) if all(self.matches(m, c) for c in filters["AND"])]
+        start = (page - 1) * page_size
+        return {
+            "count": len(found),
+            "next": "next" if start + page_size < len(found) else None,
+            "previous": None,
+            "results": [dict(m) for m in found[start:start + page_size]]
+        }
+
+    async def add(self, messages, user_id, output_format):
+        memory = self.put(user_id, f"new-{self.clock}", messages[0]["content"], ["working_projects"])
+        return {"results": [{"id": memory["id"], "memory": memory["memory"], "event": "ADD"}]}
+
+@pytest.fixture
+def mem0():
+    mem0 = FakeMem0()
+    for i in range(120):
+        mem0.put("user1", f"m{i}", f"Memory {i}")
+    mem0.put("user2", "other", "Someone else's memory")
+    return mem0
+
+@pytest.fixture
+def service(mem0):
+    return MemoryService(client=mem0, mirror=MemoryMirror(sync_interval=60))
+
+@pytest.mark.asyncio
+async def test_first_read_loads_the_user_then_reads_are_local(service, mem0):
+    memories = await service.get_recent_conversations("user1", limit=10)
+    assert [m["memory"] for m in memories] == [f"Memory {i}" for i in range(119, 109, -1)]
+    # The first read fetches only what it needs, the full load runs in the background
+    assert "user1" not in service.mirror
+    await service.wait_for_mirror()
+    assert "user1" in service.mirror
+    loaded = len(mem0.calls)
+
+    again = await service.get_recent_conversations("user1", limit=5)
+    assert again == memories[:5]
+    assert len(mem0.calls) == loaded
+    assert (service.mirror.hits, service.mirror.misses) == (1, 1)
+    # Syncs and reloads are not reads
+    await service.sync_user("user1")
+    service.mirror.load("user1", [])
+    assert (service.mirror.hits, service.mirror.misses) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_delta_sync_fetches_only_updated_memories(service, mem0):
+    await service.get_recent_conversations("user1", limit=10)
+    await service.wait_for_mirror()
+    mem0.put("user1", "m3", "Memory 3, edited")
+    mem0.put("user1", "m120", "Memory 120")
+    mem0.calls.clear()
+
+    await service.sync_user("user1")
+    assert mem0.calls[0]["AND"][1]["updated_at"]["gte"] == "2024-03-20T10:02:00Z"
+    memories = service.mirror.recent("user1", 200)
+    assert len(memories) == 121
+    assert memories[0]["memory"] == "Memory 120"
+    assert {"id": "m3", "memory": "Memory 3, edited"}.items() <= next(m for m in memories if m["id"] == "m3").items()
+
+@pytest.mark.asyncio
+async def test_add_memory_writes_through(service, mem0):
+    await service.get_recent_conversations("user1", limit=10)
+    await service.wait_for_mirror()
+    await service.add_memory("user1", [{"role": "user", "content": "Building a compiler"}])
+
+    # Visible right away, before any sync
+    assert service.mirror.recent("user1", 1)[0]["memory"] == "Building a compiler"
+    mem0.calls.clear()
+
+    # The next read picks up what mem0 filled in
+    memories = await service.get_recent_conversations("user1", limit=1)
+    assert len(mem0.calls) == 1
+    assert memories[0]["categories"] == ["working_projects"]
+
+@pytest.mark.asyncio
+async def test_stale_mirror_is_served_when_mem0_fails(service, mem0):
+    await service.get_recent_conversations("user1", limit=3)
+    await service.wait_for_mirror()
+    service.mirror.sync_interval = 0
+    mem0.fail = True
+    memories = await service.get_recent_conversations("user1", limit=3)
+    assert len(memories) == 3
+    with pytest.raises(ConnectionError):
+        await service.get_recent_conversations("user2", limit=3)
+
+@pytest.mark.asyncio
+async def test_cold_users_are_evicted(mem0):
+    mirror = MemoryMirror(max_idle=60, max_users=1)
+    service = MemoryService(client=mem0, mirror=mirror)
+    await service.get_recent_conversations("user1", limit=1)
+    await service.wait_for_mirror()
+    await service.get_recent_conversations("user2", limit=1)
+    await service.wait_for_mirror()
+    assert len(mirror) == 2
+
+    # Beyond max_users the least recently read user goes first
+    assert mirror.evict_cold() == 1
+    assert "user1" not in mirror and "user2" in mirror
+
+    # Users idle for max_idle seconds go too
+    state = mirror.sync_state("user2")
+    assert mirror.evict_cold(now=state.accessed_at + 61) == 1
+    assert len(mirror) == 0
+
+@pytest.mark.asyncio
+async def test_sync_mirror_syncs_users_that_are_due(service, mem0):
+    await service.get_recent_conversations("user1", limit=1)
+    await service.get_recent_conversations("user2", limit=1)
+    await service.wait_for_mirror()
+    mem0.calls.clear()
+
+    await service.sync_mirror()
+    assert mem0.calls == []
+
+    service.mirror.sync_interval = 0
+    await service.sync_mirror()
+    assert sorted(c["AND"][0]["user_id"] for c in mem0.calls) == ["user1", "user2"]
+
+@pytest.mark.asyncio
+async def test_memories_deleted_in_mem0_are_dropped_on_reload(service, mem0):
+    await service.get_recent_conversations("user1", limit=200)
+    await service.wait_for_mirror()
+    # Deleted by another client, delta syncs never hear of it
+    mem0.memories = [m for m in mem0.memories if m["id"] != "m119"]
+    await service.sync_user("user1")
+    assert any(m["id"] == "m119" for m in service.mirror.recent("user1", 200))
+
+    accessed_at = service.mirror.sync_state("user1").accessed_at
+    service.mirror.reload_interval = 0
+    await service.sync_user("user1")
+    assert "updated_at" not in mem0.calls[-1]["AND"][-1]
+    # Background reloads don't count as reads, idle users are still evicted
+    assert service.mirror.sync_state("user1").accessed_at == accessed_at
+    assert not any(m["id"] == "m119" for m in service.mirror.recent("user1", 200))
+
+@pytest.mark.asyncio
+async def test_reads_reload_in_the_background(service, mem0):
+    await service.get_recent_conversations("user1", limit=200)
+    await service.wait_for_mirror()
+    mem0.memories = [m for m in mem0.memories if m["id"] != "m119"]
+    service.mirror.reload_interval = 0
+    mem0.gate = asyncio.Event()
+
+    # The read is served from the mirror without waiting for the reload
+    memories = await service.get_recent_conversations("user1", limit=1)
+    assert memories[0]["id"] == "m119"
+    mem0.gate.set()
+    await service.wait_for_mirror()
+    assert service.mirror.recent("user1", 1)[0]["id"] == "m118"
+
+@pytest.mark.asyncio
+async def test_background_sync_runs_ahead_of_reads(service, mem0):
+    await service.get_recent_conversations("user1", limit=1)
+    await service.wait_for_mirror()
+    state = service.mirror.sync_state("user1")
+
+    now = state.checked_at + 40
+    assert not state.is_due(service.mirror.sync_interval, now)
+    assert service.mirror.users_due(now=now) == ["user1"]
+    assert service.mirror.background_interval == 15
+
+@pytest.mark.asyncio
+async def test_background_loads_are_cancelled_on_shutdown(service, mem0):
+    mem0.gate = asyncio.Event()
+    await service.get_recent_conversations("user1", limit=1)
+    await service.cancel_mirror_loads()
+    mem0.gate.set()
+    await asyncio.sleep(0)
+    assert "user1" not in service.mirror
+    # Nothing is left for the app to wait for
+    await asyncio.wait_for(service.wait_for_mirror(), timeout=1)
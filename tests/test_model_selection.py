@@ -0,0 +1,73 @@
+import pytest
+from app.models import ModelType
+from app.services.model_selection import ModelSelector
+
+@pytest.fixture
+def selector():
+    return ModelSelector()
+
+@pytest.mark.parametrize("text,expected", [
+    ("Optimize the depth-first search in your Python graph project", (ModelType.CODE, "anthropic/claude-3.7-sonnet")),
+    ("Write a Python script to resize images", (ModelType.CODE, "anthropic/claude-3.7-sonnet")),
+    ("Design a logo for the Python meetup", (ModelType.IMAGE, "recraft-ai/recraft-v3-svg")),
+    ("Generate a photorealistic cyberpunk street scene", (ModelType.IMAGE, "recraft-ai/recraft-v3")),
+    ("Create an ultra-high-resolution alpine panorama for a gallery print", (ModelType.IMAGE, "black-forest-labs/flux-1.1-pro-ultra")),
+    ("Build an interactive infographic about the greenhouse effect", (ModelType.IMAGE, "google/gemini-2.0-flash-exp-image-generation")),
+    ("Illustrate a medieval dragon siege", (ModelType.IMAGE, "openai/gpt-image-1")),
+    ("Write a short fantasy story about a traveling musician", (ModelType.TEXT, "gpt-4.1")),
+    ("See what is trending on social media about AI layoffs", (ModelType.TEXT, "x-ai/grok-3-beta")),
+    ("Outline a literature review for your thesis", (ModelType.TEXT, "deepseek/deepseek-r1")),
+    ("Quick vegetarian lunch ideas", (ModelType.TEXT, "gpt-4o-mini")),
+    ("Plan your trip to Rome", (ModelType.TEXT, "anthropic/claude-3.5-sonnet")),
+])
+def test_select(selector, text, expected):
+    assert selector.select(text) == expected
+
+def test_explicit_model_requests_win(selector):
+    assert selector.select("Check the population of Switzerland, I prefer to use Grok 3") == (ModelType.TEXT, "x-ai/grok-3-beta")
+    assert selector.select("Refactor the parser using GPT-4.1") == (ModelType.CODE, "gpt-4.1")
+    assert selector.select("Make a poster using Flux") == (ModelType.IMAGE, "black-forest-labs/flux-1.1-pro-ultra")
+    # A text model asked for an image task writes text instead
+    assert selector.select("Use Claude to describe a logo") == (ModelType.TEXT, "anthropic/claude-3.7-sonnet")
+    # Mentioning a model is not asking for it
+    assert selector.requested_model("Read about Claude's release") is None
+
+@pytest.mark.parametrize("text,expected", [
+    ("Explain how photosynthesis works", (ModelType.TEXT, "anthropic/claude-3.5-sonnet")),
+    ("Write an API design doc", (ModelType.CODE, "anthropic/claude-3.7-sonnet")),
+    ("Tip: design a git branching strategy", (ModelType.CODE, "anthropic/claude-3.7-sonnet")),
+    ("Plan the camping trip with Scout troop", (ModelType.TEXT, "anthropic/claude-3.5-sonnet")),
+    ("Go through Maverick's notes in Gemini club", (ModelType.TEXT, "anthropic/claude-3.5-sonnet")),
+    ("Take a photo of the harbor at dusk", (ModelType.IMAGE, "recraft-ai/recraft-v3")),
+])
+def test_ordinary_text_is_not_misrouted(selector, text, expected):
+    assert selector.select(text) == expected
+
+def test_common_word_aliases_need_a_request_cue(selector):
+    assert selector.requested_model("Sketch the trail with Scout") is None
+    assert selector.requested_model("Sketch the trail using Scout") == "meta-llama/llama-4-scout"
+    # Unambiguous aliases are still asked for with weaker cues
+    assert selector.requested_model("Refactor the parser with GPT-4.1") == "gpt-4.1"
+
+def test_preferences(selector):
+    preferences = selector.parse_preferences([
+        "Prefers Claude 3.5 for coding tasks",
+        "Likes Flux for generating images",
+        "Uses GPT-4.1 for writing",
+        "Prefers Claude 3.7 for coding",
+    ])
+    assert preferences == {
+        ModelType.CODE: "anthropic/claude-3.5-sonnet",
+        ModelType.IMAGE: "black-forest-labs/flux-1.1-pro-ultra",
+        ModelType.TEXT: "gpt-4.1",
+    }
+    assert selector.select("Debug the API handler", preferences) == (ModelType.CODE, "anthropic/claude-3.5-sonnet")
+    assert selector.select("Draw a cat", preferences) == (ModelType.IMAGE, "black-forest-labs/flux-1.1-pro-ultra")
+    assert selector.select("Plan your trip to Rome", preferences) == (ModelType.TEXT, "gpt-4.1")
+
+def test_general_preference_covers_text_and_code(selector):
+    preferences = selector.parse_preferences(["Really likes DeepSeek"])
+    assert preferences == {ModelType.TEXT: "deepseek/deepseek-r1", ModelType.CODE: "deepseek/deepseek-r1"}
+
+def test_unknown_models_are_ignored(selector):
+    assert selector.parse_preferences(["Prefers Midjourney for images"]) == {}
@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+from app.models import Suggestion, SuggestionResult, ModelType
+from app.services.precompute import SuggestionPrecomputer
+
+def make_suggestions(n, label="Suggestion"):
+    return [
+        Suggestion(
+            title=f"{label} {i}",
+            description="Continue the conversation",
+            model_type=ModelType.TEXT,
+            selected_model="gpt-4o-mini"
+        )
+        for i in range(n)
+    ]
+
+class FakeCompute:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, user_id, n):
+        self.calls.append(user_id)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return SuggestionResult(suggestions=make_suggestions(n, label=f"{user_id} #{len(self.calls)}"))
+
+async def drain(precomputer):
+    await precomputer._queue.join()
+
+@pytest.mark.asyncio
+async def test_memory_write_triggers_precompute():
+    compute = FakeCompute()
+    precomputer = SuggestionPrecomputer(compute, num_suggestions=5)
+    await precomputer.start()
+    try:
+        assert precomputer.get("user", 3) is None
+        precomputer.on_memory_added("user")
+        await drain(precomputer)
+        suggestions = precomputer.get("user", 3)
+        assert [s.title for s in suggestions] == ["user #1 0", "user #1 1", "user #1 2"]
+        # Asking for more than was precomputed is a miss
+        assert precomputer.get("user", 6) is None
+    finally:
+        await precomputer.stop()
+
+@pytest.mark.asyncio
+async def test_refreshes_are_deduplicated_per_user():
+    compute = FakeCompute()
+    precomputer = SuggestionPrecomputer(compute)
+    await precomputer.start()
+    try:
+        assert precomputer.schedule("user")
+        assert not precomputer.schedule("user")
+        assert precomputer.schedule("other_user")
+        await drain(precomputer)
+        assert sorted(compute.calls) == ["other_user", "user"]
+    finally:
+        await precomputer.stop()
+
+@pytest.mark.asyncio
+async def test_write_during_refresh_runs_another_refresh():
+    compute = FakeCompute(delay=0.05)
+    precomputer = SuggestionPrecomputer(compute)
+    await precomputer.start()
+    try:
+        precomputer.schedule("user")
+        await asyncio.sleep(0.01)
+        precomputer.on_memory_added("user")
+        await drain(precomputer)
+        await asyncio.sleep(0.01)
+        await drain(precomputer)
+        assert compute.calls == ["user", "user"]
+    finally:
+        await precomputer.stop()
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    compute = FakeCompute(delay=0.01)
+    precomputer = SuggestionPrecomputer(compute, concurrency=2)
+    await precomputer.start()
+    try:
+        for i in range(10):
+            precomputer.schedule(f"user_{i}")
+        await drain(precomputer)
+        assert len(compute.calls) == 10
+        assert compute.max_active == 2
+    finally:
+        await precomputer.stop()
+
+@pytest.mark.asyncio
+async def test_stale_results_are_served_and_refreshed(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.precompute.time.monotonic", lambda: now[0])
+    compute = FakeCompute()
+    precomputer = SuggestionPrecomputer(compute, max_age=60)
+    await precomputer.start()
+    try:
+        precomputer.store("user", make_suggestions(3, label="old"))
+        now[0] += 30
+        assert precomputer.get("user", 3)[0].title == "old 0"
+        assert compute.calls == []
+
+        now[0] += 60
+        # The stale list is still returned while a refresh is scheduled
+        assert precomputer.get("user", 3)[0].title == "old 0"
+        await drain(precomputer)
+        assert precomputer.get("user", 3)[0].title == "user #1 0"
+    finally:
+        await precomputer.stop()
+
+@pytest.mark.asyncio
+async def test_schedule_is_a_no_op_when_not_running():
+    precomputer = SuggestionPrecomputer(FakeCompute())
+    assert not precomputer.running
+    assert not precomputer.schedule("user")
+
+@pytest.mark.asyncio
+async def test_fallback_suggestions_are_not_stored():
+    async def compute(user_id, n):
+        return SuggestionResult(suggestions=make_suggestions(n, label="Fallback"), is_fallback=True)
+
+    precomputer = SuggestionPrecomputer(compute)
+    await precomputer.start()
+    try:
+        precomputer.schedule("user")
+        await drain(precomputer)
+        assert precomputer.get("user", 1) is None
+        # Nor are the fallback suggestions of requests
+        precomputer.store("user", make_suggestions(3), is_fallback=True)
+        assert precomputer.get("user", 1) is None
+    finally:
+        await precomputer.stop()
+
+def test_request_results_do_not_replace_larger_lists():
+    precomputer = SuggestionPrecomputer(FakeCompute())
+    precomputer.store("user", make_suggestions(5, label="precomputed"))
+    precomputer.store("user", make_suggestions(2, label="request"), keep_larger=True)
+    assert len(precomputer.get("user", 5)) == 5
+    precomputer.store("user", make_suggestions(5, label="request"), keep_larger=True)
+    assert precomputer.get("user", 5)[0].title == "request 0"
+    # Refreshes always replace the stored list
+    precomputer.store("user", make_suggestions(3, label="refresh"))
+    assert precomputer.get("user", 3)[0].title == "refresh 0"
@@ -0,0 +1,47 @@
+import pytest
+from app.services.prompts import PromptBuilder, count_tokens
+
+@pytest.fixture
+def builder():
+    return PromptBuilder()
+
+def test_system_prompt_is_a_stable_prefix(builder):
+    first = builder.build([{"memory": "Writing a blog post about Python"}], 3)
+    second = builder.build([{"memory": "Refactoring a Python script"}, {"memory": "Designing a logo"}], 5)
+    # The very same system message is reused for every request
+    assert first.messages[0] is second.messages[0]
+    assert first.messages[1].content != second.messages[1].content
+
+def test_system_prompt_does_not_carry_the_model_catalogue(builder):
+    system = builder.build([{"memory": "Designing a logo"}], 3).messages[0].content
+    assert "recraft-ai/recraft-v3-svg" not in system
+    assert "anthropic/claude-3.7-sonnet" not in system
+
+def test_user_message_carries_the_request(builder):
+    memories = [
+        {"memory": "Working on a graph algorithm"},
+        {"memory": "Designing a logo for the new app"}
+    ]
+    prompt = builder.build(memories, 4, messages="user: hello")
+    user = prompt.messages[1].content
+    assert "exactly 4 suggestions" in user
+    assert "1. Working on a graph algorithm" in user
+    assert "2. Designing a logo for the new app" in user
+    assert "user: hello" in user
+
+def test_token_counts(builder):
+    prompt = builder.build([{"memory": "Working on a graph algorithm"}], 3)
+    assert prompt.system_tokens == count_tokens(prompt.messages[0].content)
+    assert prompt.user_tokens == count_tokens(prompt.messages[1].content)
+    assert prompt.total_tokens == prompt.system_tokens + prompt.user_tokens
+
+def test_batch_prompt_numbers_the_requests(builder):
+    prompt = builder.build_batch([
+        ([{"memory": "Working on a graph algorithm"}], 2, ""),
+        ([{"memory": "Designing a logo for the new app"}], 3, "user: hi"),
+    ])
+    assert prompt.messages[0] is builder.batch_system_message
+    user = prompt.messages[1].content
+    assert user.index("Request 1:") < user.index("exactly 2 suggestions") < user.index("Request 2:")
+    assert "exactly 3 suggestions" in user
+    assert "1. Designing a logo for the new app" in user
@@ -0,0 +1,44 @@
+import numpy as np
+from app.services.ranking import embed, cosine_similarities, novelty, mmr
+from app.services.selection import select_memories
+
+def test_embeddings_are_normalized_and_comparable():
+    vectors = embed([
+        "User is working on a graph algorithm in Python",
+        "Working on the Python graph algorithm again",
+        "Loves baking sourdough bread",
+        "",
+    ])
+    assert vectors.dtype == np.float32
+    norms = np.linalg.norm(vectors, axis=1)
+    assert np.allclose(norms[:3], 1.0)
+    assert norms[3] == 0
+    similarities = cosine_similarities(vectors)
+    assert similarities[0, 1] > 0.5
+    assert similarities[0, 2] < 0.1
+
+def test_novelty_compares_with_older_items():
+    vectors = embed(["Python graph algorithm", "Baking bread", "Python graph algorithm"])
+    scores = novelty(cosine_similarities(vectors))
+    # The newest item repeats the oldest one, the others are new
+    assert scores[0] < 0.01
+    assert scores[1] > 0.99 and scores[2] > 0.99
+
+def test_mmr_trades_relevance_for_diversity():
+    vectors = embed(["Python graph algorithm", "Python graph algorithm tuning", "Baking bread"])
+    similarities = cosine_similarities(vectors)
+    relevance = np.array([1.0, 0.9, 0.6], dtype=np.float32)
+    assert mmr(relevance, similarities, 2, diversity=0.0) == [0, 1]
+    assert mmr(relevance, similarities, 2, diversity=0.8) == [0, 2]
+
+def test_selection_skips_near_duplicate_memories():
+    memories = [
+        {"memory": "User is working on a graph algorithm in Python", "categories": []},
+        {"memory": "User is working on a graph algorithm in Python", "categories": []},
+        {"memory": "User is working on the graph algorithm in Python", "categories": []},
+        {"memory": "Planning a trip to Lisbon", "categories": []},
+        {"memory": "Learning to play jazz piano", "categories": []},
+    ]
+    selected = [memory["memory"] for memory in select_memories(memories, 1, k=3)]
+    assert "Planning a trip to Lisbon" in selected
+    assert "Learning to play jazz piano" in selected
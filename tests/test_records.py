@@ -0,0 +1,71 @@
+import pytest
+from app.services.memory import MemoryService
+from app.services.records import MemoryBatch, MemoryRecord, as_records, parse_timestamp, MICROSECONDS
+
+def test_timestamps_compare_by_instant():
+    assert parse_timestamp("2024-03-20T12:30:00+02:00") < parse_timestamp("2024-03-20T11:00:00Z")
+    assert parse_timestamp("2024-03-20T10:00:00") == parse_timestamp("2024-03-20T10:00:00Z")
+    assert parse_timestamp("1970-01-01T00:00:01.000002Z") == MICROSECONDS + 2
+    assert parse_timestamp(None) == parse_timestamp("") == parse_timestamp("yesterday") == 0
+
+def test_z_suffixed_timestamps_parse_before_python_3_11(monkeypatch):
+    from datetime import datetime
+    from app.services import records
+
+    class OldDatetime(datetime):
+        @classmethod
+        def fromisoformat(cls, value):
+            if value.endswith("Z"):
+                raise ValueError(f"Invalid isoformat string: {value!r}")
+            return super().fromisoformat(value)
+
+    monkeypatch.setattr(records, "datetime", OldDatetime)
+    assert parse_timestamp("2024-03-20T10:00:00Z") == 1710928800 * MICROSECONDS
+    assert parse_timestamp("2024-03-20T10:00:00.5Z") == 1710928800 * MICROSECONDS + 500000
+
+def test_record_is_normalized_once():
+    raw = {"id": "1", "memory": "Learning Rust", "categories": ["technology_and_tools"], "created_at": "2024-03-20T10:00:00Z"}
+    record = MemoryRecord.from_mem0(raw)
+    assert record.categories == ("technology_and_tools",)
+    assert record.created == parse_timestamp("2024-03-20T10:00:00Z")
+    assert record.updated == 0
+    assert record.raw is raw
+    assert not hasattr(record, "__dict__")
+
+@pytest.mark.asyncio
+async def test_recent_conversations_order_by_parsed_time():
+    class Client:
+        async def get_all(self, version, filters, page=1, page_size=100):
+            return {"next": None, "results": [
+                {"memory": "no time"},
+                {"memory": "noon in Berlin", "created_at": "2024-03-20T12:00:00+01:00"},
+                {"memory": "half past eleven", "created_at": "2024-03-20T11:30:00Z"},
+            ]}
+
+    memories = await MemoryService(client=Client()).get_recent_conversations("user1", limit=3)
+    assert [m["memory"] for m in memories] == ["half past eleven", "noon in Berlin", "no time"]
+
+def test_records_flow_through_dedup_and_selection():
+    from app.services.dedup import collapse_near_duplicates
+    from app.services.selection import select_memories
+    records = as_records([
+        {"id": "3", "memory": "User is working on a graph algorithm.", "categories": ["working_projects"]},
+        {"id": "2", "memory": "Designing a logo for the bakery", "categories": ["working_projects"]},
+        {"id": "1", "memory": "user is working on a Graph Algorithm", "categories": ["technology_and_tools", "working_projects"]},
+    ])
+    kept, merged = collapse_near_duplicates(records)
+    assert merged == 1
+    assert all(isinstance(record, MemoryRecord) for record in kept)
+    assert kept[0].categories == ("working_projects", "technology_and_tools")
+    assert records[0].categories == ("working_projects",)
+    assert select_memories(kept, 3) == kept
+
+def test_batch_columns_line_up_with_records():
+    records = as_records([{"memory": "a", "categories": ["music"]}, {"memory": "b"}])
+    batch = MemoryBatch(records)
+    assert len(batch) == 2
+    assert batch.texts == ["a", "b"]
+    assert batch.categories == [("music",), ()]
+    # Records read like the mem0 dicts they came from
+    assert records[0]["memory"] == "a" and records[0].get("categories") == ["music"]
+    assert as_records(records)[0] is records[0]
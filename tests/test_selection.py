@@ -0,0 +1,48 @@
+import pytest
+from app.services.selection import select_memories, memories_for_suggestions, MAX_SELECTED_MEMORIES
+
+def make_memory(text, categories=None):
+    return {"memory": text, "categories": categories or []}
+
+@pytest.fixture
+def many_memories():
+    # Newest first, the way MemoryService returns them
+    return [
+        make_memory(f"Memory number {i}", ["working_projects"] if i % 2 else ["personal_information"])
+        for i in range(200)
+    ]
+
+def test_selection_is_scaled_to_n(many_memories):
+    """The number of selected memories depends on n, not on the history size."""
+    assert len(select_memories(many_memories, 3)) == memories_for_suggestions(3)
+    assert len(select_memories(many_memories, 1)) == memories_for_suggestions(1)
+    assert memories_for_suggestions(1000) == MAX_SELECTED_MEMORIES
+
+def test_selection_returns_everything_for_small_histories():
+    memories = [make_memory("Designing a logo"), make_memory("Writing a blog post")]
+    assert select_memories(memories, 3) == memories
+
+def test_selection_prefers_recent_and_actionable_memories(many_memories):
+    selected = select_memories(many_memories, 2)
+    texts = [memory["memory"] for memory in selected]
+    # The newest working project memory always makes the cut
+    assert "Memory number 1" in texts
+    # Old memories do not
+    assert "Memory number 199" not in texts
+
+def test_selection_keeps_categories_diverse():
+    memories = [make_memory(f"Project {i}", ["working_projects"]) for i in range(10)]
+    memories.append(make_memory("Loves jazz", ["music"]))
+    selected = select_memories(memories, 2)
+    assert any("music" in memory["categories"] for memory in selected)
+
+def test_selection_always_keeps_model_preferences(many_memories):
+    preference = make_memory("Prefers Claude for coding", ["ai_model_preferences"])
+    memories = many_memories + [preference]
+    selected = select_memories(memories, 1)
+    assert preference in selected
+    assert len(selected) == memories_for_suggestions(1) + 1
+
+def test_selection_skips_empty_memories():
+    memories = [make_memory(""), make_memory("Designing a logo")]
+    assert select_memories(memories, 1) == [memories[1]]
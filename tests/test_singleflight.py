@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.models import Suggestion, SuggestionResult, ModelType
+from app.services.singleflight import SingleFlight
+
+class SlowCall:
+    """Records how often it runs and returns a list of `size` items after a delay."""
+
+    def __init__(self, delay=0.01, error=None):
+        self.delay = delay
+        self.error = error
+        self.runs = 0
+
+    async def __call__(self, size):
+        self.runs += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return list(range(size))
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_coalesced():
+    flights = SingleFlight()
+    call = SlowCall()
+    results = await asyncio.gather(*[
+        flights.do("user", lambda: call(5), size=5) for _ in range(4)
+    ])
+    assert call.runs == 1
+    assert results == [[0, 1, 2, 3, 4]] * 4
+    assert flights.calls == 1 and flights.joins == 3
+    assert flights.in_flight("user") == 0
+
+@pytest.mark.asyncio
+async def test_only_compatible_calls_are_joined():
+    flights = SingleFlight()
+    call = SlowCall()
+    small, large, smaller, other = await asyncio.gather(
+        flights.do("user", lambda: call(3), size=3),
+        flights.do("user", lambda: call(10), size=10),
+        flights.do("user", lambda: call(2), size=2),
+        flights.do("other", lambda: call(3), size=3),
+    )
+    # The larger request can't be served by the smaller one and the other user is separate
+    assert call.runs == 3
+    assert len(small) == 3 and len(large) == 10 and len(other) == 3
+    assert smaller == small
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller_and_are_not_kept():
+    flights = SingleFlight()
+    failing = SlowCall(error=RuntimeError("LLM down"))
+    results = await asyncio.gather(
+        flights.do("user", lambda: failing(3)),
+        flights.do("user", lambda: failing(3)),
+        return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert failing.runs == 1
+    # The next call starts fresh
+    assert await flights.do("user", lambda: SlowCall()(2)) == [0, 1]
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_call():
+    flights = SingleFlight()
+    call = SlowCall(delay=0.05)
+    first = asyncio.ensure_future(flights.do("user", lambda: call(3)))
+    second = asyncio.ensure_future(flights.do("user", lambda: call(3)))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == [0, 1, 2]
+    assert call.runs == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_memory_fetch_and_generation():
+    from app.routers import suggestions
+
+    async def get_recent_conversations(user_id):
+        await asyncio.sleep(0.01)
+        return [{"memory": "Working on a Python project", "categories": ["technical_skills"]}]
+
+    async def generate(conversations, user_id, memories, num_suggestions):
+        await asyncio.sleep(0.01)
+        return SuggestionResult(suggestions=[
+            Suggestion(
+                title=f"Suggestion {i}",
+                description="Description",
+                model_type=ModelType.CODE,
+                selected_model="anthropic/claude-3.7-sonnet"
+            )
+            for i in range(num_suggestions)
+        ])
+
+    memory_service = AsyncMock()
+    memory_service.get_recent_conversations.side_effect = get_recent_conversations
+    generator = AsyncMock()
+    generator.generate.side_effect = generate
+
+    with patch("app.routers.suggestions.memory_service", memory_service), \
+         patch("app.routers.suggestions.suggestion_generator", generator):
+        five, three, eight = await asyncio.gather(
+            suggestions.compute_suggestions("coalesced_user", 5),
+            suggestions.compute_suggestions("coalesced_user", 3),
+            suggestions.compute_suggestions("coalesced_user", 8),
+        )
+
+    assert len(five.suggestions) == 5 and len(three.suggestions) == 3 and len(eight.suggestions) == 8
+    assert three.suggestions == five.suggestions[:3]
+    assert memory_service.get_recent_conversations.call_count == 1
+    # n=8 needs more suggestions than the in-flight n=5 generation makes
+    assert generator.generate.call_count == 2
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+from app.services.generator import SuggestionGenerator
+from app.services.http import create_async_client
+from app.services.memory import MemoryService
+
+def test_importing_the_app_creates_no_clients():
+    # A fresh interpreter, the test session has long imported everything
+    code = (
+        "import sys\n"
+        "import app.main\n"
+        "print(sorted(m for m in ('mem0', 'langchain_openai', 'langchain.memory', 'langchain_core', 'tiktoken', 'sqlalchemy') if m in sys.modules))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == "[]"
+
+def test_llm_client_is_created_on_the_pooled_client():
+    generator = SuggestionGenerator(openai_api_key="test")
+    http_client = create_async_client()
+    generator.use_http_client(http_client)
+    assert generator._llm is None
+
+    generator.connect()
+    llm = generator.llm
+    assert llm.http_async_client is http_client
+    generator.connect()
+    assert generator.llm is llm
+
+def test_memory_client_is_created_on_first_use():
+    client = object()
+    assert MemoryService(client=client).client is client
+
+    service = MemoryService()
+    service.use_http_client(create_async_client())
+    assert service._client is None
@@ -0,0 +1,92 @@
+import json
+import pytest
+from types import SimpleNamespace
+from app.services.generator import SuggestionGenerator
+from app.services.streaming import SuggestionStreamParser
+
+SUGGESTIONS = [
+    {
+        "title": "Optimize Graph Algorithm",
+        "description": "Enhance the depth-first search {with memoization}",
+        "model_type": "code",
+        "selected_model": "anthropic/claude-3.7-sonnet"
+    },
+    {
+        "title": "Create \"Modern\" Logo",
+        "description": "Design a minimalist [tech] startup logo",
+        "model_type": "image",
+        "selected_model": "recraft-ai/recraft-v3-svg"
+    },
+    {
+        "title": "Write a Story",
+        "description": "Write a short fantasy story}]",
+        "model_type": "text",
+        "selected_model": "gpt-4.1"
+    }
+]
+
+def document(fenced=False):
+    text = json.dumps({"suggestions": SUGGESTIONS}, indent=2)
+    return f"```json\n{text}\n```" if fenced else text
+
+def feed_in_chunks(parser, text, size):
+    results = []
+    for i in range(0, len(text), size):
+        results.append(parser.feed(text[i:i + size]))
+    return results
+
+@pytest.mark.parametrize("size", [1, 3, 17, 10000])
+def test_parser_yields_every_suggestion(size):
+    parser = SuggestionStreamParser()
+    suggestions = [s for chunk in feed_in_chunks(parser, document(), size) for s in chunk]
+    assert [s.model_dump() for s in suggestions] == SUGGESTIONS
+    assert parser.errors == 0
+
+def test_parser_yields_suggestions_before_document_ends():
+    parser = SuggestionStreamParser()
+    text = document()
+    first_end = text.index("}", text.index("claude-3.7-sonnet")) + 1
+    assert [s.title for s in parser.feed(text[:first_end])] == ["Optimize Graph Algorithm"]
+    assert parser.feed(text[first_end:first_end + 5]) == []
+
+def test_parser_ignores_code_fences():
+    parser = SuggestionStreamParser()
+    suggestions = [s for chunk in feed_in_chunks(parser, document(fenced=True), 7) for s in chunk]
+    assert len(suggestions) == 3
+
+def test_parser_skips_invalid_suggestions():
+    parser = SuggestionStreamParser()
+    text = '{"suggestions": [{"title": "Missing fields"}, ' + json.dumps(SUGGESTIONS[0]) + "]}"
+    suggestions = parser.feed(text)
+    assert [s.title for s in suggestions] == ["Optimize Graph Algorithm"]
+    assert parser.errors == 1
+
+def test_parser_only_keeps_the_current_object():
+    parser = SuggestionStreamParser()
+    text = document()
+    second_start = text.index("{", text.index("claude-3.7-sonnet"))
+    parser.feed(text[:second_start + 10])
+    assert len(parser._buffer) == 10
+
+@pytest.mark.asyncio
+async def test_llm_stream_is_closed_when_the_caller_stops():
+    closed = []
+
+    class FakeLLM:
+        async def astream(self, messages):
+            try:
+                document = json.dumps({"suggestions": [
+                    {"title": f"Suggestion {i}", "description": "Keep going", "memory": 1} for i in range(3)
+                ]})
+                for start in range(0, len(document), 16):
+                    yield SimpleNamespace(content=document[start:start + 16])
+            finally:
+                closed.append(True)
+
+    generator = SuggestionGenerator(openai_api_key="test")
+    generator.llm = FakeLLM()
+    stream = generator.stream_from_conversations([], "user1", [{"memory": "Writing a parser in Python"}], 3)
+    first = await stream.__anext__()
+    assert first.title == "Suggestion 0"
+    await stream.aclose()
+    assert closed == [True]
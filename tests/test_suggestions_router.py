@@ -1,10 +1,11 @@
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock, patch
-from app.models import Suggestion, ModelType
+from app.models import Suggestion, SuggestionResult, ModelType
 from app.main import app
 from app.services.memory import MemoryService
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -33,7 +34,7 @@ def mock_memory_service():
 @pytest.fixture
 def mock_suggestion_generator():
     with patch('app.routers.suggestions.suggestion_generator') as mock:
-        mock.generate_from_conversations = AsyncMock(return_value=[
+        mock.generate = AsyncMock(return_value=SuggestionResult(suggestions=[
             Suggestion(
                 title="Optimize your algorithm",
                 description="Improve the time complexity of your graph traversal algorithm",
@@ -52,7 +53,7 @@ def mock_suggestion_generator():
                 model_type=ModelType.TEXT,
                 selected_model="gpt-4.1"
             )
-        ])
+        ]))
         yield mock
 
 @pytest.mark.asyncio
@@ -102,7 +103,7 @@ async def test_get_suggestions_endpoint(mock_memory_service, mock_suggestion_gen
     
     # Verify service calls
     mock_memory_service.get_recent_conversations.assert_called_with("test_user_123")
-    mock_suggestion_generator.generate_from_conversations.assert_called()
+    mock_suggestion_generator.generate.assert_called()
 
 @pytest.mark.asyncio
 async def test_suggestions_error_handling(mock_memory_service, mock_suggestion_generator):
@@ -115,10 +116,68 @@ async def test_suggestions_error_handling(mock_memory_service, mock_suggestion_g
     
     # Test suggestion generator error
     mock_memory_service.get_recent_conversations.side_effect = None
-    mock_suggestion_generator.generate_from_conversations.side_effect = Exception("Generator error")
+    mock_suggestion_generator.generate.side_effect = Exception("Generator error")
     response = client.get("/api/v1/suggestions?user_id=test_user_123")
     assert response.status_code == 500
 
+@pytest.fixture
+def mock_streaming_generator(mock_suggestion_generator):
+    async def stream(conversations, user_id, memories, num_suggestions=None):
+        for suggestion in mock_suggestion_generator.generate.return_value.suggestions:
+            yield suggestion
+    mock_suggestion_generator.stream_from_conversations = stream
+    yield mock_suggestion_generator
+
+@pytest.mark.asyncio
+async def test_stream_suggestions_ndjson(mock_memory_service, mock_streaming_generator):
+    """Test the GET /suggestions/stream endpoint with newline delimited JSON"""
+    response = client.get("/api/v1/suggestions/stream?user_id=test_user_123&n=2")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    
+    suggestions = [json.loads(line) for line in response.text.splitlines()]
+    assert [s["title"] for s in suggestions] == ["Optimize your algorithm", "Create a modern logo"]
+    mock_memory_service.get_recent_conversations.assert_called_with("test_user_123")
+
+@pytest.mark.asyncio
+async def test_stream_suggestions_sse(mock_memory_service, mock_streaming_generator):
+    """Test the GET /suggestions/stream endpoint with Server-Sent Events"""
+    response = client.get("/api/v1/suggestions/stream?user_id=test_user_123&format=sse")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [event[0] for event in events] == ["event: suggestion"] * 3 + ["event: done"]
+    first = json.loads(events[0][1][len("data: "):])
+    assert first["selected_model"] == "anthropic/claude-3.7-sonnet"
+    
+    # Test with invalid format
+    response = client.get("/api/v1/suggestions/stream?user_id=test_user_123&format=xml")
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_stream_is_closed_after_n_suggestions(mock_suggestion_generator):
+    """The generator's stream is closed once n suggestions are sent, not left to the garbage collector"""
+    from app.routers.suggestions import _stream_suggestions
+    closed = []
+    async def stream():
+        try:
+            for suggestion in mock_suggestion_generator.generate.return_value.suggestions:
+                yield suggestion
+        finally:
+            closed.append(True)
+    source = stream()
+    events = [event async for event in _stream_suggestions(source, 1, "ndjson")]
+    assert len(events) == 1
+    assert closed == [True]
+
+@pytest.mark.asyncio
+async def test_stream_suggestions_memory_error(mock_memory_service, mock_streaming_generator):
+    """Memory errors are reported before the stream starts"""
+    mock_memory_service.get_recent_conversations.side_effect = Exception("Memory service error")
+    response = client.get("/api/v1/suggestions/stream?user_id=test_user_123")
+    assert response.status_code == 500
+
 @pytest.mark.asyncio
 async def test_suggestions_with_real_memory():
     """Integration test for suggestions endpoint with real memory service."""